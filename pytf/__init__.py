@@ -1,5 +1,7 @@
 from .time_frequency.spectrogram import Spectrogram
 from .filter.filterbank import FilterBank
+from .filter.iirbank import IIRFilterBank
+from .filter.polyphase import PolyphaseFilterBank
 # Authors : David C.C. Lu <davidlu89@gmail.com>
 #
 # License : BSD (3-clause)
@@ -8,5 +10,7 @@ __version__ = '0.1'
 
 __all__ = [
     'FilterBank',
+    'IIRFilterBank',
+    'PolyphaseFilterBank',
     'Spectrogram'
 ]
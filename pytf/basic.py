@@ -3,27 +3,26 @@ import numpy as np
 #
 # License : BSD (3-clause)
 
-def reshape_data(data):
+def reshape_data(data, axis=-1):
     """
-    Reshaping the data such that the data has the shape of (nch x nsamp).
+    Reshaping the data such that the data has the shape of (... x nch x nsamp).
 
     Parameters:
     -----------
     data: ndarray
-        The data of interest. It can currenly be 1d or 2d ndarray.
+        The data of interest. Any leading dimensions (e.g. trials) are kept as batch dimensions.
+
+    axis: int (default: -1)
+        The time axis of the data, moved to the last axis.
 
     Returns:
     --------
     data: ndarray
         The reshaped data.
     """
-    if data.ndim > 2:
-        raise ValueError("The data should only be in 2 dimensional. \
-                The support for 3 dimensional have not been implemented yet.")
+    data = np.asarray(data)
     if data.ndim == 1:
         data = np.atleast_2d(data)
+        axis = -1
 
-    if axis != 0:
-        return data
-    else:
-        return data.T
+    return np.moveaxis(data, axis, -1)
@@ -0,0 +1,310 @@
+from __future__ import division
+""" Command line entry point of pytf.
+
+Example:
+--------
+    pytf analyze --bank config.json --jobs 8 in_dir out_dir
+
+The bank configuration is a JSON file holding the key-word arguments of the engine. The
+'type' entry selects the engine ('FilterBank' by default, or 'Spectrogram'), e.g.
+
+    {"type": "FilterBank", "sample_rate": 1000, "binsize": 1024, "order": 256,
+     "center_freqs": [10, 14, 18, 22], "bandwidth": 4, "hilbert": true}
+"""
+# Authors : David C.C. Lu <davidlu89@gmail.com>
+#
+# License : BSD (3-clause)
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import multiprocessing as mp
+
+import numpy as np
+
+from .filter.filterbank import FilterBank
+from .time_frequency.spectrogram import Spectrogram
+from .core import (_block_edges, _grid_size)
+from .time_frequency.stft import _get_geometry
+
+# The engine constructed once per worker process. See _init_worker().
+_engine = None
+
+def load_bank_config(filename):
+    """ Load the JSON configuration of a bank.
+
+    Parameters:
+    -----------
+    filename: str
+        The path to the JSON file.
+
+    Return:
+    -------
+    config: dict
+        The key-word arguments of the engine, with the 'type' entry.
+    """
+    with open(filename, 'r') as f:
+        config = json.load(f)
+
+    config.setdefault('type', 'FilterBank')
+    if config['type'] not in ['FilterBank', 'Spectrogram']:
+        raise ValueError("'type' must be either 'FilterBank' or 'Spectrogram'! "
+                         "Given type={}".format(config['type']))
+
+    for key in ['center_freqs', 'freq_bands']:
+        if config.get(key) is not None:
+            config[key] = np.asarray(config[key], dtype=np.float64)
+
+    return config
+
+def build_engine(config, nch=1, nsamp=2**14):
+    """ Construct the engine described by the configuration.
+
+    The 'nprocs' of a FilterBank is passed through, for filtering the bands over processes.
+    A Spectrogram does not take 'nprocs' or 'mprocs'.
+    """
+    kwargs = dict(config)
+    engine_type = kwargs.pop('type', 'FilterBank')
+
+    if engine_type == 'FilterBank':
+        return FilterBank(nch=nch, nsamp=nsamp, **kwargs)
+
+    for key in ['nprocs', 'mprocs']:
+        if key in kwargs:
+            raise ValueError("'{}' is not a parameter of the Spectrogram.".format(key))
+    return Spectrogram(nch=nch, nsamp=nsamp, **kwargs)
+
+def _init_worker(config, block_size):
+    global _engine
+    _engine = build_engine(config, nsamp=block_size)
+
+def _output_filename(filename, out_dir):
+    return os.path.join(out_dir, os.path.basename(filename))
+
+def _blocks(nsamp, block_size, binsize, hopsize, margin, resample_by):
+    """ The blocks of the signal, with their pads, in samples of the input.
+
+    binsize, hopsize and margin (the samples that the filters of the engine read beyond a window)
+    are at the rate of the engine, i.e. after resampling. The blocks start on a grid of
+    lcm(binsize, hopsize) * resample_by input samples, a multiple of hopsize * resample_by, so the
+    windows of each block fall on the ones of the whole signal, and the pads cover a window plus
+    the margin.
+
+    Return:
+    -------
+    blocks: list of (start, stop, l_pad, r_pad)
+    """
+    grid = _grid_size(binsize, hopsize)
+    pad = -(-(binsize + margin) // grid) * grid * resample_by
+
+    blocks = []
+    for start, stop in _block_edges(nsamp, block_size, grid * resample_by):
+        blocks += [(start, stop, min(pad, start), min(pad, nsamp - stop))]
+    return blocks
+
+def _analyze_filterbank(bank, x, out_file, block_size):
+    """ Stream the signal through a FilterBank block by block.
+
+    Each block is padded with (at least) 'binsize' samples of the neighbouring blocks, plus the
+    margin of the resampling filter. As the blocks and the pad are multiples of the hopsize, the STFT
+    windows of the block fall on the same grid as the ones of the whole signal, and the samples kept
+    are the same as the ones from a single call. The output is at the rate of the bank, with
+    ceil(nsamp / resample_by) // decimate_by samples.
+    """
+    nch, nsamp = x.shape
+    R = bank.resample_by
+    dec = bank.decimate_by
+    margin = 0 if bank.resampler is None else bank.resampler.delay // R
+    ndtype = np.complex64 if bank.hilbert else np.float32
+
+    out = np.lib.format.open_memmap(out_file, mode='w+', dtype=ndtype,
+                                    shape=(nch, bank.nfreqs, -(-nsamp // R) // dec))
+    for start, stop, l_pad, r_pad in _blocks(nsamp, block_size, bank.binsize, bank.hopsize, margin, R):
+        x_ = np.asarray(x[:, start-l_pad:stop+r_pad], dtype=np.float64)
+
+        y_ = bank.analysis(x_)
+
+        # The output samples of the block, at the rate of the bank
+        s_, e_, l_ = start // R // dec, -(-stop // R) // dec, l_pad // R // dec
+        out[:,:,s_:e_] = y_[:,:,l_:l_ + e_ - s_]
+
+    out.flush()
+    del out
+
+def _analyze_spectrogram(spec, x, out_file, block_size):
+    """ Stream the signal through a Spectrogram block by block.
+
+    Same as _analyze_filterbank(), the blocks are padded such that the STFT windows of each
+    block are a subset of the ones of the whole signal. The pad also covers the filters of the
+    resampling and of the zoom (fmin, fmax), and the number of frequencies is the one of the first block.
+    """
+    nch, nsamp = x.shape
+    R = spec.resample_by
+    binsize, hopsize, nwin, padsize = _get_geometry(-(-nsamp // R), spec.binsize, spec.overlap_factor, spec.hopsize)
+
+    out = None
+    blocks = _blocks(nsamp, block_size, binsize, hopsize, spec._margin(binsize, hopsize, padsize), R)
+    for ix, (start, stop, l_pad, r_pad) in enumerate(blocks):
+        x_ = np.asarray(x[:, start-l_pad:stop+r_pad], dtype=np.float64)
+
+        X_ = spec.analysis(x_)
+        if out is None:
+            out = np.lib.format.open_memmap(out_file, mode='w+', dtype=np.complex64,
+                                            shape=(nch, nwin, X_.shape[-1]))
+
+        # Global window indices kept from this block
+        w0 = start // R // hopsize
+        w1 = nwin if ix == len(blocks) - 1 else stop // R // hopsize
+        offset = (start - l_pad) // R // hopsize
+        out[:,w0:w1,:] = X_[:,w0-offset:w1-offset,:]
+
+    out.flush()
+    del out
+
+def _process_file(args):
+    """ Process a single recording with the engine of the worker.
+
+    Return:
+    -------
+    filename, number of samples processed (nch x nsamp), elapsed time in seconds.
+    """
+    filename, out_dir, block_size = args
+
+    t0 = time.time()
+    x = np.load(filename, mmap_mode='r')
+    x = x[np.newaxis,:] if x.ndim == 1 else x
+
+    out_file = _output_filename(filename, out_dir)
+    tmp_file = out_file + '.partial'
+
+    try:
+        if isinstance(_engine, FilterBank):
+            _analyze_filterbank(_engine, x, tmp_file, block_size)
+        else:
+            _analyze_spectrogram(_engine, x, tmp_file, block_size)
+    except BaseException:
+        # A failed run leaves no partial output behind
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+
+    # Only finished outputs carry the final name, which allows resuming.
+    os.rename(tmp_file, out_file)
+
+    return filename, x.size, time.time() - t0
+
+def analyze(config, in_dir, out_dir, jobs=1, block_size=2**20, pattern='*.npy',
+            overwrite=False, verbose=True):
+    """ Process a directory of recordings over a pool of processes.
+
+    Parameters:
+    -----------
+    config: dict
+        The configuration of the engine. See load_bank_config().
+
+    in_dir: str
+        The directory of the recordings, as .npy files of (nch x nsamp).
+
+    out_dir: str
+        The directory for the outputs, which are saved with the same file names.
+
+    jobs: int (default: 1)
+        The number of worker processes. A FilterBank with nprocs > 1 runs with a single job.
+
+    block_size: int (default: 2**20)
+        The number of samples processed at a time. It is rounded up to a multiple of both
+        the binsize and the hopsize.
+
+    pattern: str (default: '*.npy')
+        The pattern for selecting the recordings in in_dir.
+
+    overwrite: bool (default: False)
+        If False, the recordings with an existing output are skipped.
+
+    Return:
+    -------
+    stats: dict
+        The number of processed and skipped files, the number of samples, the elapsed time
+        and the throughput in samples per second.
+    """
+    if jobs > 1 and config.get('nprocs', 1) > 1:
+        # The workers of the pool are daemonic, and cannot start the processes of the bank
+        raise ValueError("'nprocs' of the bank cannot be combined with more than one job. "
+                         "Given jobs={}, nprocs={}".format(jobs, config['nprocs']))
+
+    if not os.path.isdir(out_dir):
+        os.makedirs(out_dir)
+
+    filenames = sorted(glob.glob(os.path.join(in_dir, pattern)))
+    todo = [f for f in filenames if overwrite or not os.path.exists(_output_filename(f, out_dir))]
+
+    # Largest first, so that the long recordings do not end up as the tail of the job.
+    todo = sorted(todo, key=os.path.getsize, reverse=True)
+
+    t0 = time.time()
+    nsamples = 0
+    tasks = [(f, out_dir, block_size) for f in todo]
+    if jobs > 1:
+        pool = mp.Pool(jobs, initializer=_init_worker, initargs=(config, block_size))
+        try:
+            # chunksize=1 lets idle workers pick up the next file as soon as they are done.
+            for filename, n, elapsed in pool.imap_unordered(_process_file, tasks, chunksize=1):
+                nsamples += n
+                if verbose:
+                    print("{}: {:.2f} s".format(filename, elapsed))
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        _init_worker(config, block_size)
+        try:
+            for task in tasks:
+                filename, n, elapsed = _process_file(task)
+                nsamples += n
+                if verbose:
+                    print("{}: {:.2f} s".format(filename, elapsed))
+        finally:
+            if isinstance(_engine, FilterBank):
+                _engine.kill()
+
+    elapsed = time.time() - t0
+    stats = {'processed': len(todo),
+             'skipped': len(filenames) - len(todo),
+             'samples': nsamples,
+             'elapsed': elapsed,
+             'throughput': nsamples / elapsed if elapsed > 0 else 0.}
+
+    if verbose:
+        print("Processed {processed} files ({skipped} skipped), {samples} samples in {elapsed:.2f} s: "
+              "{throughput:.3e} samples/s".format(**stats))
+
+    return stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='pytf', description="pytf is a tool for time-frequency analysis")
+    subparsers = parser.add_subparsers(dest='command')
+
+    p = subparsers.add_parser('analyze', help="Process a directory of .npy recordings.")
+    p.add_argument('--bank', required=True, help="The JSON configuration of the bank.")
+    p.add_argument('--jobs', type=int, default=1, help="The number of worker processes.")
+    p.add_argument('--block-size', type=int, default=2**20, help="The number of samples processed at a time.")
+    p.add_argument('--pattern', default='*.npy', help="The pattern for selecting the recordings.")
+    p.add_argument('--overwrite', action='store_true', help="Reprocess the recordings with an existing output.")
+    p.add_argument('--quiet', action='store_true')
+    p.add_argument('in_dir')
+    p.add_argument('out_dir')
+
+    args = parser.parse_args(argv)
+    if args.command != 'analyze':
+        parser.print_help()
+        return 1
+
+    analyze(load_bank_config(args.bank), args.in_dir, args.out_dir,
+            jobs=args.jobs, block_size=args.block_size, pattern=args.pattern,
+            overwrite=args.overwrite, verbose=not args.quiet)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
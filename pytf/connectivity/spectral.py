@@ -0,0 +1,184 @@
+from __future__ import division
+""" Spectral connectivity between all pairs of channels.
+
+The cross-spectral density (CSD), the magnitude-squared coherence and the phase-locking value
+(PLV) are computed from the complex time-frequency representation of the signal, either the
+output of FilterBank(hilbert=True), (nch x nfreqs x nsamp), or the output of stft,
+(nch x nwin x nfreqs). For each frequency, the sums over time of all the channel pairs are a
+single matrix product, (nch x ntimes) x (ntimes x nch), batched over the frequencies.
+"""
+# Authors : David C.C. Lu <davidlu89@gmail.com>
+#
+# License : BSD (3-clause)
+import numpy as np
+
+class CrossSpectra(object):
+    """ Accumulate the cross-spectra of all channel pairs over chunks of a recording.
+
+    Only the upper triangle (i < j) of the cross-spectral matrices is kept, along with the
+    auto-spectra, so the memory does not depend on the length of the recording.
+
+    Parameters:
+    -----------
+    nch: int
+        The number of channels.
+
+    nfreqs: int
+        The number of frequencies (bands or bins).
+
+    time_axis: int (default: -1)
+        The time axis of the inputs of update(). -1 for the output of FilterBank,
+        (nch x nfreqs x nsamp), -2 for the output of stft, (nch x nwin x nfreqs).
+    """
+    def __init__(self, nch, nfreqs, time_axis=-1):
+
+        if time_axis not in [-1, -2, 1, 2]:
+            raise ValueError("'time_axis' must be either -1 or -2! Given time_axis={}".format(time_axis))
+
+        self._nch = nch
+        self._nfreqs = nfreqs
+        self._time_axis = time_axis
+        self._pairs = np.triu_indices(nch, k=1)
+
+        self.reset()
+
+    def reset(self):
+        """ Clear the accumulated spectra.
+        """
+        self._csd = np.zeros((self.npairs, self.nfreqs), dtype=np.complex128)
+        self._psd = np.zeros((self.nch, self.nfreqs), dtype=np.float64)
+        self._plv = np.zeros((self.npairs, self.nfreqs), dtype=np.complex128)
+        self._count = 0
+
+    def update(self, X, mask=None):
+        """ Add a chunk of the time-frequency representation.
+
+        Parameters:
+        -----------
+        X: ndarray, complex, (nch x nfreqs x ntimes) or (nch x ntimes x nfreqs)
+            The chunk, see time_axis.
+
+        mask: ndarray of bool, (ntimes,) (default: None)
+            The samples or the windows flagged as artifacts (see FilterBank.analysis and
+            Spectrogram.analysis), which are not added.
+        """
+        X = np.asarray(X)
+        if not np.iscomplexobj(X):
+            raise ValueError("The cross-spectra require a complex input, e.g. FilterBank(hilbert=True).")
+
+        # (nfreqs x nch x ntimes)
+        X = np.moveaxis(X, self._time_axis, -1).swapaxes(0, 1)
+        if X.shape[:2] != (self.nfreqs, self.nch):
+            raise ValueError("The shape of X does not match! Given X.shape={}".format(X.shape))
+
+        if mask is not None:
+            keep = ~np.asarray(mask, dtype=bool)
+            if keep.shape != X.shape[-1:]:
+                raise ValueError("The mask must have one value per time! Given mask.shape={}".format(keep.shape))
+            X = X[...,keep]
+
+        i, j = self._pairs
+
+        S = np.matmul(X, X.conj().swapaxes(1, 2))                    # (nfreqs x nch x nch)
+        self._csd += S[:,i,j].T
+        self._psd += np.real(np.diagonal(S, axis1=1, axis2=2)).T
+
+        # The unit phasors, zero where the amplitude is zero
+        amp = np.abs(X)
+        U = np.divide(X, amp, out=np.zeros_like(X), where=amp > 0)
+        P = np.matmul(U, U.conj().swapaxes(1, 2))
+        self._plv += P[:,i,j].T
+
+        self._count += X.shape[-1]
+
+    def csd(self):
+        """ The cross-spectral density of the pairs, (npairs x nfreqs), averaged over time.
+        """
+        return self._csd / max(self._count, 1)
+
+    def psd(self):
+        """ The auto-spectral density of the channels, (nch x nfreqs), averaged over time.
+        """
+        return self._psd / max(self._count, 1)
+
+    def coherence(self):
+        """ The magnitude-squared coherence of the pairs, (npairs x nfreqs).
+        """
+        i, j = self._pairs
+        denom = self._psd[i] * self._psd[j]
+        return np.divide(np.abs(self._csd)**2, denom, out=np.zeros(denom.shape), where=denom > 0)
+
+    def plv(self):
+        """ The phase-locking value of the pairs, (npairs x nfreqs).
+        """
+        return np.abs(self._plv) / max(self._count, 1)
+
+    def to_matrix(self, values, diagonal=None):
+        """ Expand the values of the pairs into the full (nch x nch x nfreqs) matrices.
+
+        Parameters:
+        -----------
+        values: ndarray, (npairs x nfreqs)
+            The values of the pairs, e.g. from csd() or coherence().
+
+        diagonal: ndarray, (nch x nfreqs) (default: None)
+            The values of the diagonal, e.g. psd(). If None, the diagonal is zero.
+
+        Return:
+        -------
+        M: ndarray, (nch x nch x nfreqs)
+            The lower triangle is the complex conjugate of the upper triangle.
+        """
+        i, j = self._pairs
+        M = np.zeros((self.nch, self.nch, values.shape[-1]), dtype=values.dtype)
+        M[i,j] = values
+        M[j,i] = np.conj(values)
+        if diagonal is not None:
+            M[np.arange(self.nch), np.arange(self.nch)] = diagonal
+        return M
+
+    @property
+    def pairs(self):
+        """ The channel indices (i, j) of the pairs.
+        """
+        return self._pairs
+
+    @property
+    def npairs(self):
+        return self._pairs[0].size
+
+    @property
+    def nch(self):
+        return self._nch
+
+    @property
+    def nfreqs(self):
+        return self._nfreqs
+
+    @property
+    def count(self):
+        """ The number of samples (or windows) accumulated.
+        """
+        return self._count
+
+def _cross_spectra(X, time_axis):
+    X = np.asarray(X)
+    nfreqs = X.shape[1] if time_axis in [-1, 2] else X.shape[2]
+    cs = CrossSpectra(X.shape[0], nfreqs, time_axis=time_axis)
+    cs.update(X)
+    return cs
+
+def csd(X, time_axis=-1):
+    """ The cross-spectral density of all channel pairs, (npairs x nfreqs). See CrossSpectra.
+    """
+    return _cross_spectra(X, time_axis).csd()
+
+def coherence(X, time_axis=-1):
+    """ The magnitude-squared coherence of all channel pairs, (npairs x nfreqs). See CrossSpectra.
+    """
+    return _cross_spectra(X, time_axis).coherence()
+
+def plv(X, time_axis=-1):
+    """ The phase-locking value of all channel pairs, (npairs x nfreqs). See CrossSpectra.
+    """
+    return _cross_spectra(X, time_axis).plv()
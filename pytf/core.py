@@ -1,13 +1,134 @@
 import numpy as np
 from numpy.lib.stride_tricks import as_strided
 
-def frame(x, binsize, hopsize):
+_pad_modes = {'zero': 'constant', 'reflect': 'reflect', 'edge': 'edge'}
+
+def _check_frame_input(x, hopsize):
+    x = np.atleast_2d(np.asarray(x))
+
+    if hopsize < 1:
+        raise ValueError('Invalid hopsize. Must be greater than 1.')
+
+    return x
+
+def _check_mask(mask, shape):
+    """ The boolean mask of the input samples. It has the samples of the input along the last axis,
+    and its other axes broadcast to the ones of the input.
+    """
+    mask = np.asarray(mask, dtype=bool)
+
+    lead, lead_ = mask.shape[:-1], tuple(shape[:-1])[len(shape) - mask.ndim:]
+    if mask.ndim < 1 or mask.ndim > len(shape) or mask.shape[-1] != shape[-1] \
+            or any(m not in (1, n) for m, n in zip(lead, lead_)):
+        raise ValueError("The mask must broadcast to the input, with one value per sample! "
+                         "Given mask.shape={}, x.shape={}".format(mask.shape, tuple(shape)))
+
+    return mask
+
+def _as_frames(x, binsize, hopsize, nwin):
+    """ A strided view of nwin frames of x along the last axis, starting at the first sample.
+    """
+    return as_strided(
+                x,
+                shape=x.shape[:-1] + (nwin, binsize),
+                strides=x.strides[:-1] + (x.strides[-1]*hopsize, x.strides[-1]),
+                writeable=False
+            )
+
+def _edge_pad(x, l_pad, r_pad, mode):
+    """ The samples padded before and after x, computed from the ends of x only.
+    """
+    nsamp = x.shape[-1]
+    mode_ = _pad_modes[mode]
+    lead = [(0,0)] * (x.ndim - 1)
+
+    left = np.pad(x[...,:l_pad+1], lead + [(l_pad,0)], mode=mode_)[...,:l_pad]
+    right = np.pad(x[...,max(nsamp-r_pad-1,0):], lead + [(0,r_pad)], mode=mode_)[...,-r_pad:] if r_pad \
+                else x[...,:0]
+    return left, right
+
+def frame_segments(x, binsize, hopsize, padsize=0, nwin=None, mode='zero'):
+    """ Slice a time series into overlapping frames, padded at both ends, without copying the signal.
+
+    Frame m starts at sample m * hopsize - padsize. The frames lying entirely within the signal
+    are a strided view of x. Only the frames overlapping with the padding at the ends are built,
+    from small padded copies of the ends of the signal.
+
+    Parameters:
+    -----------
+    x: ndarray, (..., n_ch, n_samp)
+        Multi-channel signal, with any leading batch dimensions (e.g. trials).
+
+    binsize: int
+        Window size for processing FFT on.
+
+    hopsize: int
+        The sample size required to jump to the next row.
+
+    padsize: int (default: 0)
+        The number of samples padded before the signal.
+
+    nwin: int (default: None)
+        The number of frames. If None, the frames that fit within the padded signal, with
+        padsize samples padded after the signal as well.
+
+    mode: str (default: 'zero')
+        The padding, 'zero', 'reflect' or 'edge'.
+
+    Return:
+    -------
+    segments: list of (slice, frames)
+        The slice of frame indices, and the frames (..., n_ch, n_win_segment, binsize) of each segment,
+        in order.
+    """
+    x = _check_frame_input(x, hopsize)
+    if mode not in _pad_modes:
+        raise ValueError("'mode' must be one of {}.".format(list(_pad_modes.keys())))
+
+    nsamps = x.shape[-1]
+    if nwin is None:
+        nwin = 1 + int((nsamps + 2 * padsize - binsize) / hopsize)
+
+    # The padding after the signal needed by the last frame
+    r_pad = max(0, (nwin - 1) * hopsize - padsize + binsize - nsamps)
+
+    # The frames entirely within the signal: [m0, m1)
+    m0 = min(nwin, -(-padsize // hopsize))
+    m1 = min(nwin, (nsamps - binsize + padsize) // hopsize + 1)
+
+    if padsize == 0 and r_pad == 0:
+        return [(slice(0, nwin), _as_frames(x, binsize, hopsize, nwin))]
+
+    left, right = _edge_pad(x, padsize, r_pad, mode)
+
+    if m1 <= m0:
+        # The signal is shorter than the frames: pad it all.
+        _x = np.concatenate([left, x, right], axis=-1)
+        return [(slice(0, nwin), _as_frames(_x, binsize, hopsize, nwin))]
+
+    segments = []
+    if m0 > 0:
+        stop = (m0 - 1) * hopsize - padsize + binsize
+        _x = np.concatenate([left, x[...,:stop]], axis=-1)
+        segments += [(slice(0, m0), _as_frames(_x, binsize, hopsize, m0))]
+
+    start = m0 * hopsize - padsize
+    segments += [(slice(m0, m1), _as_frames(x[...,start:], binsize, hopsize, m1 - m0))]
+
+    if m1 < nwin:
+        start = m1 * hopsize - padsize
+        _x = np.concatenate([x[...,start:], right], axis=-1)
+        segments += [(slice(m1, nwin), _as_frames(_x, binsize, hopsize, nwin - m1))]
+
+    return segments
+
+def frame(x, binsize, hopsize, padsize=0, nwin=None, mode='zero'):
     """ Slice a time series into overlapping frames.
 
     Parameters:
     -----------
-    x: 2d-ndarray, (n_ch, n_samp)
-        Multi-channel signal.
+    x: ndarray, (..., n_ch, n_samp)
+        Multi-channel signal, with any leading batch dimensions (e.g. trials).
 
     binsize: int
         Window size for processing FFT on.
@@ -15,34 +136,100 @@ def frame(x, binsize, hopsize):
     hopsize: int
         The sample size required to jump to the next row.
 
+    padsize: int (default: 0)
+        The number of samples padded before the signal. See frame_segments.
+
+    nwin: int (default: None)
+        The number of frames. See frame_segments.
+
+    mode: str (default: 'zero')
+        The padding, 'zero', 'reflect' or 'edge'.
+
     Return:
     -------
-    frames: ndarray, (n_ch, n_win, binsize / 2)
+    frames: ndarray, (..., n_ch, n_win, binsize)
+        A read-only view of x without padding. With padding, the frames are copied; use
+        frame_segments to process the frames within the signal without copying them.
     """
-    x = np.asarray(x)
+    if padsize == 0 and nwin is None:
+        x = _check_frame_input(x, hopsize)
+        nsamps = x.shape[-1]
 
-    # Sanity check
-    if x.ndim > 2:
-        raise ValueError("The dimension of the ndarray must be less than or equal to 2! "
-                             "Given x.ndim={}".format(x.ndim))
-    else:
-        x = np.atleast_2d(x)
+        # Compute the number of windows that will fit the length of the data.
+        # The end may get truncated.
+        nwin = 1 + int((nsamps - binsize) / hopsize)
 
-    if hopsize < 1:
-        raise ValueError('Invalid hopsize. Must be greater than 1.')
+    segments = frame_segments(x, binsize, hopsize, padsize=padsize, nwin=nwin, mode=mode)
+    if len(segments) == 1:
+        return segments[0][1]
 
-    nch, nsamps = x.shape
+    return np.concatenate([frames for _, frames in segments], axis=-2)
 
-    # Compute the number of windows that will fit the length of the data.
-    # The end may get truncated.
-    nwin = 1 + int((nsamps - binsize) / hopsize)
+def _grid_size(binsize, hopsize):
+    """ The smallest multiple of both the binsize and the hopsize.
+    """
+    a, b = binsize, hopsize
+    while b:
+        a, b = b, a % b
+    return binsize * hopsize // a
 
-    # Process
-    return as_strided(
-                x,
-                shape=(nch, nwin, binsize),
-                strides=(x.strides[0], x.strides[1]*hopsize, x.strides[1])
-            )
+def _block_edges(nsamp, block_size, grid):
+    """ The (start, stop) sample indices of each block. The block size is rounded up to the grid.
+    """
+    block_size = int(np.ceil(block_size / grid) * grid)
+    starts = np.arange(0, nsamp, block_size)
+    return [(int(s), int(min(s + block_size, nsamp))) for s in starts]
+
+def _mask_runs(mask):
+    """ The (start, stop) indices of the runs of True of a 1d boolean array.
+    """
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], np.asarray(mask, dtype=np.int8), [0]])))
+    return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+def _frames_any(mask, binsize, hopsize, padsize, nwin):
+    """ Whether each frame, starting at m * hopsize - padsize, covers a True sample of mask (..., nsamp).
+
+    Return:
+    -------
+    covered: ndarray, (..., nwin)
+    """
+    mask = np.asarray(mask, dtype=bool)
+    nsamp = mask.shape[-1]
+    csum = np.concatenate([np.zeros(mask.shape[:-1] + (1,), dtype=np.int64), np.cumsum(mask, axis=-1)], axis=-1)
+
+    starts = np.arange(nwin) * hopsize - padsize
+    lo, hi = np.clip(starts, 0, nsamp), np.clip(starts + binsize, 0, nsamp)
+    return csum[...,hi] > csum[...,lo]
+
+def _event_segments(x, starts, length, nbatch, scale=None, offset=None):
+    """ Copy the segments x[..., start:start+length] of each event, in batches of nbatch events.
+
+    The samples beyond the ends of x are zeros. The segments are converted to x * scale + offset
+    (per channel), the zeros excepted.
+
+    Return:
+    -------
+    segments: generator of (slice, segments)
+        The slice of the events, and their segments (nevents_ x ... x nch x length).
+    """
+    lead, nsamp = x.shape[:-1], x.shape[-1]
+    scale = None if scale is None else np.broadcast_to(np.asarray(scale, dtype=np.float64), lead)[...,np.newaxis]
+    offset = None if offset is None else np.broadcast_to(np.asarray(offset, dtype=np.float64), lead)[...,np.newaxis]
+
+    for i0 in range(0, len(starts), nbatch):
+        starts_ = starts[i0:i0+nbatch]
+        segs = np.zeros((len(starts_),) + lead + (length,), dtype=np.float64)
+        for seg, start in zip(segs, starts_):
+            a, b = max(start, 0), min(start + length, nsamp)
+            if a >= b:
+                continue
+            seg[...,a-start:b-start] = x[...,a:b]
+            if scale is not None:
+                seg[...,a-start:b-start] *= scale
+            if offset is not None:
+                seg[...,a-start:b-start] += offset
+
+        yield slice(i0, i0 + len(starts_)), segs
 
 def frames_to_samples(frames, hopsize):
 
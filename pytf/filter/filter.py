@@ -1,6 +1,6 @@
 
 import numpy as np
-from scipy.signal import firwin
+from scipy.signal import (firwin, iirfilter, sosfilt, sosfreqz)
 
 try:
     import pyfftw.interfaces.numpy_fft as fft
@@ -10,8 +10,8 @@ except ImportError:
 #
 # License : BSD (3-clause)
 
-def create_filter(order, cutoff, nyquist, N, ftype='fir', output='freq', shift=True):
-    """ Create a lowpass FIR filter. This function is meant to create only the prototype filter,
+def create_filter(order, cutoff, nyquist, N, ftype='fir', output='freq', shift=True, iir_type='butter'):
+    """ Create a lowpass FIR or IIR filter. This function is meant to create only the prototype filter,
     where highpass, bandpass, or bandstop can all be transformed from the lowpass filter.
 
     Parameters:
@@ -30,10 +30,14 @@ def create_filter(order, cutoff, nyquist, N, ftype='fir', output='freq', shift=T
 
     output: str
         Declare the return of the function to be in 'time' domain or 'freq' domain.
+        For an IIR filter, 'sos' returns the second-order sections.
 
     shift: bool
         Declare if fftshift is applied to the FFT filter coeffiecients or not.
 
+    iir_type: str (default: 'butter')
+        The type of the IIR filter. See scipy.signal.iirfilter.
+
     Returns:
     --------
     If output is 'freq'
@@ -47,6 +51,10 @@ def create_filter(order, cutoff, nyquist, N, ftype='fir', output='freq', shift=T
     if output is 'time'
         h: ndarray
             The values of the filter coefficients
+
+    if output is 'sos'
+        sos: ndarray, (n_sections x 6)
+            The second-order sections of the IIR filter.
     """
     if order > N:
         raise ValueError("The order of the filter should not be longer than the length for FFT (binsize).")
@@ -54,6 +62,12 @@ def create_filter(order, cutoff, nyquist, N, ftype='fir', output='freq', shift=T
     if cutoff >= nyquist:
         raise ValueError("The cutoff frequency must be at least 2 times smaller than the Nyquist rate.")
 
+    if ftype not in ['fir', 'iir']:
+        raise ValueError("'ftype' must be either 'fir' or 'iir'!")
+
+    if ftype == 'iir':
+        return _create_iir_filter(order, cutoff, nyquist, N, output=output, shift=shift, iir_type=iir_type)
+
     if output not in ['time', 'freq']:
         raise ValueError("'output' must be either 'time' or 'freq'!")
 
@@ -72,3 +86,30 @@ def create_filter(order, cutoff, nyquist, N, ftype='fir', output='freq', shift=T
 
     elif output == 'time':
         return 1, h
+
+def _create_iir_filter(order, cutoff, nyquist, N, output='sos', shift=True, iir_type='butter'):
+    """ Create a lowpass IIR filter as second-order sections. See create_filter.
+    """
+    if output not in ['time', 'freq', 'sos']:
+        raise ValueError("'output' must be either 'time', 'freq' or 'sos'!")
+
+    sos = iirfilter(order, cutoff / nyquist, btype='lowpass', ftype=iir_type, output='sos')
+
+    if output == 'sos':
+        return sos
+
+    elif output == 'freq':
+        w = fft.fftfreq(N)
+        _, H = sosfreqz(sos, worN=w * 2 * np.pi)
+        w *= (nyquist*2)
+
+        if shift:
+            return fft.fftshift(w), fft.fftshift(H)
+        else:
+            return w, H
+
+    elif output == 'time':
+        # The impulse response, truncated to N samples.
+        h = np.zeros(N)
+        h[0] = 1.
+        return 1, sosfilt(sos, h)
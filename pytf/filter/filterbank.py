@@ -7,7 +7,7 @@ from __future__ import division
 # import logging
 
 import numpy as np
-from scipy.signal import group_delay
+from scipy.signal import (get_window, group_delay)
 
 try:
     import pyfftw.interfaces.numpy_fft as fft
@@ -17,11 +17,19 @@ except ImportError:
 import matplotlib.pyplot as plt
 
 from .filter import create_filter
+from .resample import Resampler
 from ..reconstruction.overlap import overlap_add
-from ..time_frequency.stft import (_check_winsize, stft)
+from ..core import (_block_edges, _check_mask, _event_segments, _frames_any, _grid_size)
+from ..time_frequency.stft import (STFT, _block_nelem, _check_winsize, _get_nwin, _get_padsize, stft)
 from ..utilities.process import (Parallel, Serial)
 # from ..viz.filter_plot import (_plot_filter)
 
+# The number of samples of the segments of the events analysed at once by analyze_events
+_events_nelem = 2**22
+
+# The fraction of the bandwidth kept on each side of the center of a band
+_factor = .6
+
 def _is_uniform_distributed_cf(cf):
     """ Check if the provided center frequencies are uniformly distributed.
     """
@@ -39,6 +47,14 @@ class FilterBank(object):
     binsize: int (default: 1024)
         The number of samples used for each analysis window for STFT.
 
+    overlap_factor: float (default: 0.5)
+        The ratio of overlapping between consecutive analysis windows, larger than 0.
+
+    hopsize: int (default: None)
+        The number of samples between consecutive analysis windows, less than binsize. If given,
+        it takes precedence over overlap_factor. A new block of output is produced every hopsize samples, while the
+        cost per sample grows with binsize / hopsize. See the README for benchmarks.
+
     decimate_by: int (default: 1)
         The decimating factor.
 
@@ -70,21 +86,58 @@ class FilterBank(object):
     hilbert: bool (default: False)
         If False, the output signal is real.
         If True, the output signal is analytical (real and imaginary).
+
+    planner_effort: str (default: 'FFTW_ESTIMATE')
+        The planner effort of the FFTs (pyfftw). See pytf.tune.autotune for choosing it.
+
+    max_memory: int (default: None)
+        The largest number of bytes allocated by analysis, output included (see estimate_memory).
+        Beyond it, analysis is split over channels, and over time blocks if a single channel does
+        not fit. The results are the same as without splitting.
+
+    scale, offset: ndarray, (nch,) (default: None)
+        The conversion of the input to physical units, x * scale + offset, for each channel, e.g.
+        the gain and the offset of an ADC. Integer inputs (e.g. int16) are then converted frame by
+        frame along with the window, without a floating point copy of the whole signal.
+
+    resample_by: int (default: 1)
+        If larger than 1, the signal is first decimated by resample_by with an anti-aliasing
+        filter (see Resampler.resample, without delay), and the bank runs at sample_rate / resample_by.
+        The nsamp, binsize, hopsize and order are given at the input rate and divided by
+        resample_by, so the frequency resolution is the same while the STFT is resample_by times
+        shorter. The properties of the bank (sample_rate, binsize, delay, ...) are at the reduced
+        rate, and the output is decimated by resample_by * decimate_by.
     """
-    def __init__(self, nch=1, nsamp=2**14, binsize=2**10, decimate_by=1, \
+    def __init__(self, nch=1, nsamp=2**14, binsize=2**10, overlap_factor=.5, hopsize=None, decimate_by=1, \
                  bandwidth=None, center_freqs=None, freq_bands=None, order=None, sample_rate=None, \
-                 hilbert=False, domain='time', nprocs=1, mprocs=False,
-                 logger=None):
+                 hilbert=False, domain='time', nprocs=1, mprocs=False, planner_effort='FFTW_ESTIMATE',
+                 max_memory=None, scale=None, offset=None, resample_by=1, logger=None):
 
         # self.logger = logging.getLogger("%s" % self.__class__)
         # self.logger.info("Creating the FilterBank class.")
         # Pre-defined Parameters
-        self._factor = .6
-        _overlap_factor = 0.5
+        self._factor = _factor
 
         # Filter Output Parameters
         self.hilbert = hilbert
         self.domain = domain
+        self._planner_effort = planner_effort
+        self._max_memory = max_memory
+        self._scale = None if scale is None else np.asarray(scale, dtype=np.float64)
+        self._offset = None if offset is None else np.asarray(offset, dtype=np.float64)
+
+        # The resampling front-end: the bank runs at the reduced rate
+        self._resampler = None
+        if resample_by > 1:
+            if binsize % resample_by or (hopsize is not None and hopsize % resample_by):
+                raise ValueError("The binsize and the hopsize must be multiples of resample_by. "
+                                 "Given resample_by={}".format(resample_by))
+            self._resampler = Resampler(nch, down=resample_by, sample_rate=sample_rate, scale=scale, offset=offset)
+            sample_rate = self._resampler.sample_rate_
+            nsamp = -(-nsamp // resample_by)
+            binsize = binsize // resample_by
+            hopsize = None if hopsize is None else hopsize // resample_by
+            order = None if order is None else (order - 1) // resample_by + 1
 
         # Signal Parameters
         self._nch = nch
@@ -92,8 +145,14 @@ class FilterBank(object):
         self._nsamp = nsamp
 
         # Overlap-Window Parameters
-        self._binsize = binsize
-        self._nwin = int((self.nsamp / self._binsize) / _overlap_factor + 1)
+        self._binsize, self._overlap_factor, self._hopsize = _check_winsize(binsize, \
+                        overlap_factor=None if hopsize is not None else overlap_factor, hopsize=hopsize)
+        if not 0 < self._hopsize < self._binsize:
+            # Without overlap, stft frames the signal without padding, which the overlap-add does not expect
+            raise ValueError("The hopsize must be between 1 and binsize - 1. Given hopsize={}".format(self._hopsize))
+        if self._hopsize % self.decimate_by:
+            raise ValueError("The hopsize must be a multiple of decimate_by. Given hopsize={}".format(self._hopsize))
+        self._nwin = _get_nwin(self.nsamp, self._binsize, self._hopsize)
 
         # Frequency Parameters
         self._sample_rate = sample_rate
@@ -102,8 +161,13 @@ class FilterBank(object):
         self._nfreqs = self.freq_bands.shape[0]
         self._interval_per_hz = self._binsize / self.sample_rate # interval per Hz
 
+        if self._resampler is not None and self.freq_bands.max() + self.bandwidth * self._factor > self._resampler.cutoff:
+            raise ValueError("The frequency bands must be below the cutoff frequency of the resampling, "
+                             "{} Hz. Given resample_by={}".format(self._resampler.cutoff, self.resample_by))
+
         # The decimated sample size
         self._binsize_ = self._binsize // self.decimate_by
+        self._hopsize_ = self._hopsize // self.decimate_by
 
         # Create indices for efficiently filtering the signal
         self._get_indices_for_frequency_shifts()
@@ -111,11 +175,15 @@ class FilterBank(object):
         # Create a prototype filter
         self._order = order
         self._filts = self._create_prototype_filter(shift=True, output='freq')[1]
+        self._gains, self._band_bins = self._get_band_gains()
         # self.logger.info("Created the prototype filter.")
 
         self._delay = self.delayed_samples()
         self._delay_ = self.delay // self.decimate_by
 
+        # The STFT of the blocks of nch x nsamp samples, set up at the first call of analysis
+        self._plan = None
+
         # Initializing for multiprocessing
         self._nprocs = nprocs
         self._mprocs = True if self.nprocs > 1 else mprocs
@@ -134,9 +202,9 @@ class FilterBank(object):
                         ins_dtype = [np.complex64, np.int32, np.int32, np.int32],
                         out_dtype = ndtype,
                         dtype = ndtype,
-                        filts = self._filts,
+                        filts = self._gains,
                         nfreqs = self.nfreqs
-                    ) if self.mprocs else Serial(self._fft_procs, dtype=ndtype, filts=self._filts, nfreqs=self.nfreqs)
+                    ) if self.mprocs else Serial(self._fft_procs, dtype=ndtype, filts=self._gains, nfreqs=self.nfreqs)
 
         # self.logger.info("Initialized FilterBank.")
 
@@ -146,37 +214,365 @@ class FilterBank(object):
     # def __repr__(self):
     #     return self
 
+    @classmethod
+    def from_tuning(cls, tuning, **kwargs):
+        """ Create the filter bank from the result of pytf.tune.autotune.
+
+        Parameters:
+        -----------
+        tuning: dict or str
+            The result of autotune, or the JSON file it was saved to.
+
+        kwargs:
+            The parameters overriding the ones of the tuning.
+        """
+        from ..tune import load_tuning
+
+        tuning = load_tuning(tuning) if isinstance(tuning, str) else tuning
+        params = dict(tuning['params'])
+        if params.get('freq_bands') is not None:
+            params['freq_bands'] = np.asarray(params['freq_bands'], dtype=np.float64)
+        params.update(kwargs)
+
+        return cls(**params)
+
     def kill(self, opt=None): # kill the multiprocess
         """ Killing all the multiprocessing processes.
         """
         self._pfunc.kill(opt=opt)
 
-    def analysis(self, x, window='hamming'):
+    def analysis(self, x, window='hamming', mask=None, fill=np.nan):
         """ Generate the analysis bank.
 
+        Parameters:
+        -----------
+        x: ndarray, (... x nch x nsamp)
+            The input signal. Any leading dimensions (e.g. trials) are processed in one pass.
+            Integer types are converted with scale and offset.
+
+        window: str (default: 'hamming')
+            The window used to create overlapping slices of the time domain signal.
+
+        mask: ndarray of bool, (nsamp,) or (... x nch x nsamp) (default: None)
+            The samples flagged as artifacts, e.g. from pytf.preprocessing.artifact_mask. The STFT
+            windows covering only flagged output samples (of all the rows) are dropped before the
+            filtering and the inverse FFTs, so the cost falls with the masked fraction. The other
+            output samples are the same as without mask.
+
+        fill: float (default: np.nan)
+            The value of the flagged output samples, e.g. np.nan or 0.
+
+        Return:
+        -------
+        x_: ndarray, (... x nch x nfreqs x nsamp_)
+            The filtered signal, with nsamp_ = ceil(nsamp / resample_by) // decimate_by.
+        """
+        x = np.asarray(x)
+        need = None
+        if mask is not None:
+            flagged = self._output_mask(mask, x.shape)
+            need = np.zeros(-(-x.shape[-1] // self.resample_by), dtype=bool)
+            need[:flagged.shape[-1] * self.decimate_by:self.decimate_by] = ~flagged.reshape(-1, flagged.shape[-1]).all(axis=0)
+
+        x = self._resample_stage(x)
+        if self.max_memory is not None and self.estimate_memory(x.shape[-1], nrows=x.size // x.shape[-1]) > self.max_memory:
+            y = self._analysis_blocks(x, window=window, need=need)
+        else:
+            y = self._analysis_block(x, window=window, need=need)
+
+        if mask is not None:
+            np.copyto(y, fill, where=flagged[...,np.newaxis,:])
+        return y
+
+    def _output_mask(self, mask, shape):
+        """ The flagged output samples, (... x nch x nsamp_) or (nsamp_,), from the mask of the input samples.
+        """
+        nsamp_ = -(-shape[-1] // self.resample_by) // self.decimate_by
+        mask = _check_mask(mask, shape)
+        return mask[...,::self.resample_by * self.decimate_by][...,:nsamp_]
+
+    def analyze_events(self, x, event_samples, tmin, tmax, window='hamming'):
+        """ Generate the analysis bank in epochs around events only.
+
+        Each epoch is analysed as a segment of the signal aligned on the hops of the STFT, with a
+        margin of one window (plus the delay of the resampling) on each side, so that the output
+        is the same as the one of analysis on the whole signal. The segments of the events go
+        through the filter bank in batches, and the cost depends on the number of events, not on
+        the length of the signal.
+
         Parameters:
         -----------
         x: ndarray, (nch x nsamp)
-            The input signal.
+            The whole recording. Integer types are converted with scale and offset.
+
+        event_samples: ndarray, (nevents,)
+            The sample indices of the events.
+
+        tmin, tmax: float
+            The start and the end of the epochs relative to the events, in seconds (e.g. -1., 1.).
 
         window: str (default: 'hamming')
             The window used to create overlapping slices of the time domain signal.
+
+        Return:
+        -------
+        epochs: ndarray, (nevents x nch x nfreqs x ntimes)
+            The output samples k from ceil((event + tmin * sample_rate) / step) on, with
+            step = resample_by * decimate_by samples of the input, and ntimes = (tmax - tmin) * sample_rate // step + 1.
+            The samples beyond the ends of the recording are the ones of the signal extended with zeros.
         """
+        x = np.asarray(x)
+        nsamp = x.shape[-1]
+        rows = x.size // nsamp
+        events = np.asarray(event_samples, dtype=np.int64).ravel()
+
+        R, dec = self.resample_by, self.decimate_by
+        step = R * dec
+        rate = self.sample_rate * R
+        n0, n1 = int(np.round(tmin * rate)), int(np.round(tmax * rate))
+        if n1 < n0:
+            raise ValueError("'tmax' must not be before 'tmin'. Given tmin={}, tmax={}".format(tmin, tmax))
+        ntimes = (n1 - n0) // step + 1
+
+        # The segments, in samples of the input, starting on the hops of the STFT
+        hop, margin = self._hopsize * R, self._binsize * R + (self._resampler.delay if R > 1 else 0)
+        k0 = -(-(events + n0) // step)
+        starts = (k0 * step - margin) // hop * hop
+        length = hop * -(-(ntimes * step + 2 * margin + hop) // hop)
+
+        # The events at once, within the memory budget
+        nbatch = max(1, _events_nelem // (rows * length))
+        if self.max_memory is not None:
+            nbatch = 1
+            while nbatch < events.size and self.estimate_memory(length // R, nrows=(nbatch + 1) * rows) <= self.max_memory:
+                nbatch += 1
+
         ndtype = np.complex64 if self.hilbert else np.float32
+        epochs = np.empty((events.size,) + x.shape[:-1] + (self.nfreqs, ntimes), dtype=ndtype)
+        for ev, segs in _event_segments(x, starts, length, nbatch, self._scale, self._offset):
+            segs = self._resample_stage(segs, convert=False)
+            if R > 1:
+                # Beyond the ends of the signal, the resampled signal is zero as well
+                for seg, start in zip(segs, starts[ev] // R):
+                    seg[...,:max(0, -start)] = 0
+                    seg[...,max(0, -(-nsamp // R) - start):] = 0
+
+            y = self._analysis_block(segs, window=window, convert=False)
+            for i, (k, start) in enumerate(zip(k0[ev], starts[ev])):
+                offset = k - start // step
+                epochs[ev.start + i] = y[i,...,offset:offset+ntimes]
+
+        return epochs
+
+    def estimate_memory(self, nsamp=None, nrows=None):
+        """ Estimate the peak number of bytes allocated by analysis, output included.
+
+        The peak is reached while filtering the bands, when the STFT of the signal, the spectra of
+        the bands and the outputs of the inverse FFTs (nrows x nwin x nfreqs x binsize_) are alive
+        at the same time. Each stage counts its arrays, such that the estimate bounds the allocations
+        of analysis up to the few kilobytes of the Python objects and of the FFT plans.
+
+        Parameters:
+        -----------
+        nsamp: int (default: None)
+            The number of samples of the input, at the rate of the bank (see resample_by).
+            Default: the nsamp of the filter bank.
+
+        nrows: int (default: None)
+            The number of rows of the input, i.e. the number of channels times any leading
+            dimensions. Default: the nch of the filter bank.
 
-        nch, nsamp = x.shape
-        nsamp //= self.decimate_by
+        Return:
+        -------
+        nbytes: int
+            Not included are the input, and the shared buffers of the processes when nprocs > 1,
+            which are allocated once at construction (see shared_memory).
+        """
+        nsamp = self.nsamp if nsamp is None else nsamp
+        nrows = self.nch if nrows is None else nrows
+        itemsize = np.dtype(np.complex64 if self.hilbert else np.float32).itemsize
+
+        nwin = _get_nwin(nsamp, self._binsize, self._hopsize)
+        spec = nrows * nwin * (self._binsize // 2 + 1) * np.dtype(np.complex128).itemsize
+        half = nrows * nwin * self.nfreqs * (self._binsize_ // 2) * np.dtype(np.complex64).itemsize
+        bands = nrows * nwin * self.nfreqs * self._binsize_ * itemsize
+        ola = nrows * self.nfreqs * ((nwin - 1) * self._hopsize_ + self._binsize_) * itemsize
+
+        # The STFT runs over blocks of frames (see stft), while its spectra are filled. A block holds the
+        # windowed frames in float64, the two copies of them made by the pyfftw interface (planning may
+        # destroy its input), their copy into the aligned input of the plan, and their spectra in complex128.
+        nblock = min(nwin, max(1, _block_nelem // (nrows * self._binsize)))
+        framing = nrows * nblock * (4 * self._binsize * np.dtype(np.float64).itemsize +
+                                    (self._binsize // 2 + 1) * np.dtype(np.complex128).itemsize)
+
+        # The inverse FFTs copy their padded input: a complex spectrum of twice the size of the output for irfft.
+        nifft = 3 if self.hilbert else 4
+        stages = [spec + framing,
+                  2 * spec,
+                  spec + half + nifft * bands,
+                  spec + 2 * bands,
+                  spec + bands + ola]
+
+        return int(max(stages))
+
+    def shared_memory(self):
+        """ The number of bytes of the buffers shared with the processes, when nprocs > 1.
+        """
+        if self.nprocs <= 1:
+            return 0
+
+        itemsize = np.dtype(np.complex64 if self.hilbert else np.float32).itemsize
+        return (self.nch * self._nwin * (self._binsize // 2 + 1) * np.dtype(np.complex64).itemsize +
+                self.nch * self._nwin * self.nfreqs * self._binsize_ * itemsize)
 
-        X = stft(x, binsize=self._binsize, window=window, axis=-1, \
-                    planner_effort='FFTW_ESTIMATE') / self.decimate_by
+    def _analysis_blocks(self, x, window='hamming', need=None):
+        """ analysis split over rows and time blocks, such that each call fits in max_memory.
 
-        x_ = self._pfunc.result(X, self._idx1, self._idx2, self._fidx)
-        x_ = np.concatenate([x_[:,:,:,self.delay_:], x_[:,:,:,:self.delay_]], axis=-1)\
+        Each time block is padded with a multiple of both the binsize and the hopsize on each side,
+        so that its STFT windows are the same as the ones of the whole signal, and only the samples
+        of the block are kept.
+        """
+        ndtype = np.complex64 if self.hilbert else np.float32
+
+        nsamp = x.shape[-1]
+        x2 = x.reshape(-1, nsamp)
+        nrows = x2.shape[0]
+
+        # The conversion of each row
+        scale, offset = [None if c is None else np.broadcast_to(c, x.shape[:-1]).reshape(-1)
+                         for c in self._conversion()]
+        rows = lambda r0, r1: dict(scale=None if scale is None else scale[r0:r1],
+                                   offset=None if offset is None else offset[r0:r1])
+        nsamp_ = nsamp // self.decimate_by
+
+        out = np.empty((nrows, self.nfreqs, nsamp_), dtype=ndtype)
+        # A margin for the Python objects and the FFT plans, which the estimate leaves out
+        budget = .95 * self.max_memory - out.nbytes
+        if budget <= 0:
+            raise ValueError("max_memory is smaller than the output of {} bytes. "
+                             "Given max_memory={}".format(out.nbytes, self.max_memory))
+
+        # The rows at once, in groups of nch with the parallel processes
+        step = self.nch if self.nprocs > 1 else 1
+        nrows_ = 0
+        while nrows_ + step <= nrows and self.estimate_memory(nsamp, nrows=nrows_ + step) <= budget:
+            nrows_ += step
+
+        if nrows_:
+            for r0 in range(0, nrows, nrows_):
+                out[r0:r0+nrows_] = self._analysis_block(x2[r0:r0+nrows_], window=window, need=need, **rows(r0, r0+nrows_))
+            return out.reshape(x.shape[:-1] + out.shape[-2:])
+
+        if self.nprocs > 1:
+            raise ValueError("max_memory is too small for nch channels with the parallel processes. "
+                             "Given max_memory={}".format(self.max_memory))
+
+        # A single row does not fit: split the time as well
+        pad = _grid_size(self._binsize, self._hopsize)
+        block_size = pad * (nsamp // pad)
+        while block_size > pad and self.estimate_memory(block_size + 2 * pad, nrows=1) > budget:
+            block_size = pad * max(1, block_size // (2 * pad))
+
+        if self.estimate_memory(block_size + 2 * pad, nrows=1) > budget:
+            raise ValueError("max_memory is too small for a single block of {} samples. "
+                             "Given max_memory={}".format(block_size + 2 * pad, self.max_memory))
+
+        dec = self.decimate_by
+        for r in range(nrows):
+            for start, stop in _block_edges(nsamp, block_size, pad):
+                l_pad = min(pad, start)
+                r_pad = min(pad, nsamp - stop)
+                need_ = None if need is None else need[start-l_pad:stop+r_pad]
+                y_ = self._analysis_block(x2[r:r+1, start-l_pad:stop+r_pad], window=window, need=need_, **rows(r, r+1))
+                out[r, :, start//dec:stop//dec] = y_[0, :, l_pad//dec:(l_pad + stop - start)//dec]
+
+        return out.reshape(x.shape[:-1] + out.shape[-2:])
+
+    def _analysis_block(self, x, window='hamming', scale=None, offset=None, convert=True, need=None):
+        if need is None:
+            X = self._stft_stage(x, window=window, scale=scale, offset=offset, convert=convert)
+            return self._overlap_add_stage(self._filter_stage(X), x.shape, window=window)
+
+        # Only the windows covering the needed samples are transformed and filtered
+        nwin = _get_nwin(x.shape[-1], self._binsize, self._hopsize)
+        keep = _frames_any(need, self._binsize, self._hopsize, _get_padsize(self._binsize, self._hopsize), nwin)
+        X = self._stft_stage(x, window=window, scale=scale, offset=offset, convert=convert, windows=keep)
+
+        ndtype = np.complex64 if self.hilbert else np.float32
+        x_ = np.zeros(X.shape[:2] + (self.nfreqs, self._binsize_), dtype=ndtype)
+        if np.any(keep):
+            x_[:,keep] = self._filter_stage(X[:,keep])
+        return self._overlap_add_stage(x_, x.shape, window=window)
+
+    def _conversion(self):
+        """ The scale and the offset applied by the STFT. The resampling applies them first otherwise.
+        """
+        return (self._scale, self._offset) if self._resampler is None else (None, None)
+
+    def _resample_stage(self, x, convert=True):
+        """ The decimation of the signal to the rate of the bank, if resample_by > 1.
+        """
+        return x if self._resampler is None else self._resampler.resample(x, convert=convert)
+
+    def _stft_stage(self, x, window='hamming', scale=None, offset=None, convert=True, windows=None):
+        """ The first stage of analysis: the STFT of the signal, (nbatch x nwin x nbins).
+
+        The scale and the offset of the rows of x default to the ones of the filter bank. If convert
+        is False, x is already in physical units. Only the given windows are computed, see stft.
+        The blocks of nch x nsamp samples go through the STFT plan of the filter bank.
+        """
+        if convert and scale is None and offset is None and windows is None and x.shape == (self.nch, self.nsamp):
+            if self._plan is None or self._plan.window != window:
+                scale, offset = self._conversion()
+                self._plan = STFT(self.nch, self.nsamp, binsize=self._binsize, hopsize=self._hopsize, window=window,
+                                  scale=scale, offset=offset, planner_effort=self.planner_effort)
+            return self._plan.forward(x) / self.decimate_by
+
+        if not convert:
+            scale = offset = None
+        elif scale is None and offset is None:
+            scale, offset = self._conversion()
+
+        X = stft(x, binsize=self._binsize, hopsize=self._hopsize, window=window, axis=-1, \
+                    scale=scale, offset=offset, windows=windows, planner_effort=self.planner_effort) / self.decimate_by
+        return X.reshape((-1,) + X.shape[-2:])
+
+    def _filter_stage(self, X):
+        """ The second stage of analysis: the filtered windows of each band, (nbatch x nwin x nfreqs x binsize_).
+        """
+        if self.nprocs > 1 and X.shape[1] == self._nwin and X.shape[0] % self.nch == 0:
+            # The shared buffers of the processes hold nch rows, so the batch goes through in groups.
+            x_ = np.concatenate([np.array(self._pfunc.result(X[ix:ix+self.nch], self._idx1, self._idx2, self._fidx))
+                                 for ix in range(0, X.shape[0], self.nch)], axis=0)
+        elif self.nprocs > 1:
+            # The windows are filtered independently: they are packed into the shape of the shared buffers.
+            nbatch, nwin, nbins = X.shape
+            size = self.nch * self._nwin
+            X2 = X.reshape(-1, nbins)
+            X2 = np.concatenate([X2, np.zeros((-X2.shape[0] % size, nbins), dtype=X2.dtype)], axis=0)
+            X2 = X2.reshape(-1, self.nch, self._nwin, nbins)
+            x_ = np.concatenate([np.array(self._pfunc.result(X_, self._idx1, self._idx2, self._fidx)).reshape((size,) + self._pfunc.out_shape[2:])
+                                 for X_ in X2], axis=0)
+            x_ = x_[:nbatch * nwin].reshape((nbatch, nwin) + x_.shape[1:])
+        else:
+            x_ = self._pfunc.result(X, self._idx1, self._idx2, self._fidx)
+
+        return np.concatenate([x_[:,:,:,self.delay_:], x_[:,:,:,:self.delay_]], axis=-1)\
                 if self._filts is not None else x_
 
+    def _overlap_add_stage(self, x_, shape, window='hamming'):
+        """ The last stage of analysis: the overlap-add of the filtered windows, for an input of the given shape.
+        """
+        ndtype = np.complex64 if self.hilbert else np.float32
+        nsamp = shape[-1] // self.decimate_by
+
         # Reconstructing the signal using overlap-add
-        _x = overlap_add(x_, self._binsize_, overlap_factor=.5, dtype=ndtype)
-        return _x[:,:,self._binsize_//2:nsamp+self._binsize_//2]
+        _x = overlap_add(x_, self._binsize_, hopsize=self._hopsize_, dtype=ndtype,
+                         window=get_window(window, self._binsize)[::self.decimate_by])
+        padsize_ = _get_padsize(self._binsize, self._hopsize) // self.decimate_by
+        _x = _x[:,:,padsize_:nsamp+padsize_]
+
+        return _x.reshape(tuple(shape[:-1]) + _x.shape[-2:])
 
     def synthesis(self, x, **kwargs):
         """ TODO: Reconstruct the signal from the analysis bank.
@@ -193,15 +589,16 @@ class FilterBank(object):
             The STFT of the signal to be analyzed.
 
         idx1: ndarray
-            The fancy index on X. This demodulates the signal. See self._get_indices_for_frequency_shifts().
+            The bins of X of each band. See self._get_indices_for_frequency_shifts().
 
         idx2: ndarray
-            The fancy index for reconstructing X_. This modulates
-            the demodulated signal. See self._get_indices_for_frequency_shifts().
+            The index of each band, i.e. of the bands processed by this call. See self._get_indices_for_frequency_shifts().
 
         fidx: ndarray
-            The fancy index for slicing the specific frequency components from the frequency
-            response of the filter coefficients. See self._get_indices_for_frequency_shifts().
+            The bins of the filter of each band. The filter is gathered once, see self._get_band_gains().
+
+        filts: ndarray, (nfreqs x width)
+            The gains of the bins of each band, from self._get_band_gains().
 
         slices_idx: list
             This argument is only needed when implementing in the Parallel class.
@@ -212,25 +609,28 @@ class FilterBank(object):
         """
         nch, nwin, nsamp = X.shape
         X_ = np.zeros((nch, nwin, nfreqs, self._binsize_//2), dtype=np.complex64)
-        X_[:,:,idx2,idx1] = X[:,:,idx1] * filts[fidx]
 
-        if dtype == np.float32:
-            _ifft = fft.irfft
-        else:
-            X_[:,:,:,1:] *= 2
-            _ifft = fft.ifft
+        # The bins of each band are contiguous: one multiply per band, from the slice of X into the slice of X_
+        for f in idx2[:,0]:
+            lo, hi = self._band_bins[f]
+            np.multiply(X[:,:,lo:hi], filts[f,:hi-lo], out=X_[:,:,f,lo:hi], casting='same_kind')
+
+        _ifft = fft.irfft if dtype == np.float32 else fft.ifft
 
         if self.domain == 'freq':
             return X_
 
         elif self.domain == 'time':
-            return _ifft(X_[slices_idx], n=self._binsize_, axis=-1, planner_effort='FFTW_ESTIMATE')
+            return _ifft(X_[tuple(slices_idx)], n=self._binsize_, axis=-1, planner_effort=self.planner_effort)
 
     def delayed_samples(self):
         """ The group delay from the prototype filter.
+
+        The half sample of an even order is truncated. The tolerance absorbs the numerical error
+        of group_delay, e.g. 127.99999996 for an order of 257, which must not truncate to 127.
         """
         filt = self._create_prototype_filter(output='time')[1]
-        return int(np.mean(group_delay([filt,1])[1]))
+        return int(np.mean(group_delay([filt,1])[1]) + 1e-3)
 
     def plot_filter(self, xlim=None, ylim=None,
                     label=False, xlabel=False, ylabel=False,
@@ -310,9 +710,34 @@ class FilterBank(object):
         self._idx1 = np.asarray(index1, dtype=np.int32)
         self._idx2 = np.asarray(index2, dtype=np.int32)
 
+    def _get_band_gains(self):
+        """ The frequency response of the prototype filter over the bins of each band, gathered once.
+
+        With hilbert=True, the gains of the positive frequencies are doubled for the analytic
+        signal. The bins of a band beyond DC or beyond the spectra are left out.
+
+        Return:
+        -------
+        gains: ndarray, (nfreqs x width)
+            The gains of the bins idx1[f, 0] + k of the band f, from the first valid bin on.
+
+        bins: list of (lo, hi)
+            The valid bins of each band, the slice of X and of the filtered spectra.
+        """
+        gains = np.zeros(self._fidx.shape, dtype=self._filts.dtype)
+        bins = []
+        nbins = min(self._binsize // 2 + 1, self._binsize_ // 2)
+        for f in range(self.nfreqs):
+            lo, hi = max(self._idx1[f,0], 0), min(self._idx1[f,-1] + 1, nbins)
+            k = np.arange(lo, hi) - self._idx1[f,0]
+            gains[f,:hi-lo] = self._filts[self._fidx[f,k]] * np.where(np.arange(lo, hi) > 0, 1 + self.hilbert, 1)
+            bins += [(int(lo), int(max(lo, hi)))]
+        return gains, bins
+
     @staticmethod
     def get_center_frequencies(fois):
         """ Convert an array of frequency bands into center frequencies and a bandwidth.
+        The bands must have the same width, a ValueError is raised otherwise.
         TODO: Support for varying bandwidths.
 
         Parameters:
@@ -329,14 +754,15 @@ class FilterBank(object):
         bw: float
             The bandwidth. The width between the upper and lower cutoff frequencies.
         """
-        foi = np.asarray(fois)
+        fois = np.asarray(fois)
         if fois.shape[0] == 2 and fois.shape[1] != 2:
             fois = fois.T
 
         cf = np.atleast_2d(fois.mean(axis=-1)).T
         bw = np.diff(fois, axis=-1)
-        bw = bw[0] if np.diff(bw) else bw.mean()
-        return cf, float(bw)
+        if np.ptp(bw) != 0:
+            raise ValueError("The frequency bands must have the same width! Given widths={}".format(bw.ravel()))
+        return cf, float(bw[0,0])
 
     @staticmethod
     def get_frequency_bands(cf, bw):
@@ -431,6 +857,46 @@ class FilterBank(object):
     def order(self):
         return self._order
 
+    @property
+    def max_memory(self):
+        return self._max_memory
+
+    @max_memory.setter
+    def max_memory(self, value):
+        self._max_memory = value
+
+    @property
+    def scale(self):
+        return self._scale
+
+    @property
+    def offset(self):
+        return self._offset
+
+    @property
+    def resample_by(self):
+        return 1 if self._resampler is None else self._resampler.down
+
+    @property
+    def resampler(self):
+        return self._resampler
+
+    @property
+    def planner_effort(self):
+        return self._planner_effort
+
+    @property
+    def binsize(self):
+        return self._binsize
+
+    @property
+    def hopsize(self):
+        return self._hopsize
+
+    @property
+    def overlap_factor(self):
+        return self._overlap_factor
+
     @property
     def interval_per_hz(self):
         return self._interval_per_hz
@@ -0,0 +1,186 @@
+from __future__ import division
+""" A module for the IIR filter bank, for low-latency streaming.
+"""
+# Authors : David C.C. Lu <davidlu89@gmail.com>
+#
+# License : BSD (3-clause)
+import numpy as np
+from scipy.signal import (group_delay, sos2tf, sosfilt)
+
+from .filter import create_filter
+from .filterbank import FilterBank
+
+class IIRFilterBank(object):
+    """ Create an IIR filter bank object for sample-by-sample signal processing.
+
+    Each band is shifted to DC by a complex oscillator at its center frequency, lowpass filtered by
+    the prototype IIR filter (second-order sections), and shifted back. All channels and bands go
+    through a single call of sosfilt, and the filter states are carried over between calls of
+    analysis, so the signal can be fed in chunks of any size. The output of the lowpass filter is
+    complex, which gives the analytic signal of each band without a Hilbert transform.
+
+    Compared with FilterBank, there is no block latency: the delay is only the group delay of the
+    prototype filter (see delay), at the cost of a non-linear phase.
+
+    Parameters:
+    -----------
+    nch: int (default: 1)
+        The number of channels.
+
+    decimate_by: int (default: 1)
+        The decimating factor.
+
+    bandwidth: float (default: None)
+        The bandwidth of the filter. In this case, it's twice the cutoff frequency of the lowpass filter.
+
+    center_freqs: ndarray (default: None)
+        The center frequencies of each frequency bands of interest.
+
+    freq_bands: ndarray (default: None)
+        The frequency bands of interest.
+
+    order: int (default: 4)
+        The order of the prototype IIR filter.
+
+    sample_rate: int (default: None)
+        The sample rate of the signal and the filter.
+
+    hilbert: bool (default: False)
+        If False, the output signal is real.
+        If True, the output signal is analytical (real and imaginary).
+
+    iir_type: str (default: 'butter')
+        The type of the IIR filter. See scipy.signal.iirfilter.
+    """
+    def __init__(self, nch=1, decimate_by=1, bandwidth=None, center_freqs=None, freq_bands=None,
+                 order=4, sample_rate=None, hilbert=False, iir_type='butter'):
+
+        self.hilbert = hilbert
+
+        # Signal Parameters
+        self._nch = nch
+        self._decimate_by = decimate_by
+
+        # Frequency Parameters
+        self._sample_rate = sample_rate
+        self._center_freqs, self._bandwidth, self._freq_bands = \
+                FilterBank.get_all_frequencies(center_freqs, bandwidth, freq_bands)
+        self._nfreqs = self.freq_bands.shape[0]
+
+        if np.any(self.center_freqs.ravel() < self.bandwidth / 2.):
+            raise ValueError("The lower bound of each frequency band must be above 0.")
+
+        # Create the prototype filter
+        self._order = order
+        self._iir_type = iir_type
+        self._sos = self._create_prototype_filter(output='sos')
+
+        self._delay = self.delayed_samples()
+        self._delay_ = self.delay // self.decimate_by
+
+        # The phase increment of the oscillator of each band, per sample.
+        self._omega = 2 * np.pi * self.center_freqs.ravel() / self.sample_rate
+
+        self.reset()
+
+    def reset(self):
+        """ Clear the filter states, as if no signal has been processed.
+        """
+        self._zi = np.zeros((self._sos.shape[0], self.nch, self.nfreqs, 2), dtype=np.complex128)
+        self._phase = np.zeros(self.nfreqs)
+        self._offset = 0 # The index of the next kept sample when decimating.
+
+    def analysis(self, x):
+        """ Generate the analysis bank for a chunk of the signal.
+
+        Parameters:
+        -----------
+        x: ndarray, (nch x nsamp)
+            The input signal. Consecutive calls are treated as a continuous signal.
+
+        Return:
+        -------
+        x_: ndarray, (nch x nfreqs x nsamp_)
+            The filtered signal. nsamp_ is about nsamp // decimate_by, depending on the samples
+            kept in the previous chunks.
+        """
+        ndtype = np.complex64 if self.hilbert else np.float32
+
+        x = np.atleast_2d(x)
+        nch, nsamp = x.shape
+        if nch != self.nch:
+            raise ValueError("The number of channels does not match! Given x.shape={}".format(x.shape))
+
+        # The oscillators, continuous across the chunks.
+        phase = self._phase[:,np.newaxis] + self._omega[:,np.newaxis] * np.arange(nsamp)
+        osc = np.exp(1j * phase)                                        # (nfreqs x nsamp)
+        self._phase = np.mod(phase[:,-1] + self._omega, 2 * np.pi)
+
+        X = x[:,np.newaxis,:] * osc.conj()                              # (nch x nfreqs x nsamp)
+        X, self._zi = sosfilt(self._sos, X, axis=-1, zi=self._zi)
+
+        # Decimate after filtering, the prototype filter being the anti-aliasing filter.
+        idx = slice(self._offset, None, self.decimate_by)
+        self._offset = (self._offset - nsamp) % self.decimate_by
+
+        x_ = X[:,:,idx] * osc[:,idx]
+        x_ *= 2
+
+        return np.asarray(x_ if self.hilbert else x_.real, dtype=ndtype)
+
+    def synthesis(self, x, **kwargs):
+        """ TODO: Reconstruct the signal from the analysis bank.
+        """
+        return
+
+    def delayed_samples(self):
+        """ The group delay of the prototype filter at DC, i.e. at the center of each band.
+        """
+        b, a = sos2tf(self._sos)
+        return int(np.round(group_delay([b, a], w=[0])[1][0]))
+
+    def _create_prototype_filter(self, **kwargs):
+        """ Create the prototype filter, which is a lowpass filter.
+        """
+        return create_filter(self.order, self.bandwidth/2., self.sample_rate/2., self.order,
+                             ftype='iir', iir_type=self._iir_type, **kwargs)
+
+    @property
+    def freq_bands(self):
+        return self._freq_bands
+
+    @property
+    def center_freqs(self):
+        return self._center_freqs
+
+    @property
+    def bandwidth(self):
+        return self._bandwidth
+
+    @property
+    def nfreqs(self):
+        return self._nfreqs
+
+    @property
+    def sample_rate(self):
+        return self._sample_rate
+
+    @property
+    def order(self):
+        return self._order
+
+    @property
+    def delay(self):
+        return self._delay
+
+    @property
+    def delay_(self):
+        return self._delay_
+
+    @property
+    def nch(self):
+        return self._nch
+
+    @property
+    def decimate_by(self):
+        return self._decimate_by
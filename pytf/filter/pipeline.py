@@ -0,0 +1,177 @@
+from __future__ import division
+""" An asyncio front-end of the FilterBank for acquisition loops.
+
+Example:
+--------
+    pipe = FilterBankPipeline(bank, maxsize=2)
+
+    async def acquire():
+        async for chunk in source:
+            await pipe.submit(chunk)    # waits when the pipeline is full
+        await pipe.close()
+
+    async def consume():
+        async for y in pipe.results():  # in the order of submission
+            ...
+
+    async def main():
+        await asyncio.gather(acquire(), consume())
+
+    asyncio.run(main())
+"""
+# Authors : David C.C. Lu <davidlu89@gmail.com>
+#
+# License : BSD (3-clause)
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Marks the end of the stream in the queues
+_END = object()
+
+class _StageError(object):
+    """ Carries the exception of a stage down to the consumer.
+    """
+    def __init__(self, error):
+        self.error = error
+
+class FilterBankPipeline(object):
+    """ Run FilterBank.analysis on a stream of chunks as a pipeline of three stages: the STFT
+    (after the resampling of the bank, if any), the filtering of the bands and the overlap-add.
+
+    Each stage runs in its own thread, outside of the event loop, and the stages are connected
+    by bounded queues. While the overlap-add of a chunk runs, the filtering of the next chunk and
+    the STFT of the one after can run as well (the FFTs and most of numpy release the GIL). When the
+    consumer lags, the queues fill up and submit() waits, which bounds the memory and the latency.
+    Each stage processes the chunks one at a time, so the outputs come in the order of submission.
+
+    Each chunk is analysed on its own, as with FilterBank.analysis.
+
+    Parameters:
+    -----------
+    bank: FilterBank
+        The filter bank.
+
+    maxsize: int (default: 2)
+        The number of chunks that can wait between two stages.
+
+    window: str (default: 'hamming')
+        The window of FilterBank.analysis.
+    """
+    def __init__(self, bank, maxsize=2, window='hamming'):
+
+        self._bank = bank
+        self._maxsize = maxsize
+        self._window = window
+        self._loop = None
+
+        self._stages = [
+            lambda item: self._stft_stage(item[0]),
+            lambda item: (bank._filter_stage(item[0]), item[1]),
+            lambda item: bank._overlap_add_stage(item[0], item[1], window=window),
+        ]
+
+        self._queues = None
+        self._tasks = None
+        self._executors = None
+        self._closed = False
+
+    def _stft_stage(self, x):
+        x = self._bank._resample_stage(x)
+        return self._bank._stft_stage(x, window=self._window), x.shape
+
+    def _start(self):
+        # Called from a coroutine, so the loop is running
+        self._loop = asyncio.get_running_loop()
+
+        nstages = len(self._stages)
+        self._queues = [asyncio.Queue(maxsize=self._maxsize) for _ in range(nstages + 1)]
+        self._executors = [ThreadPoolExecutor(max_workers=1) for _ in range(nstages)]
+        self._tasks = [self._loop.create_task(self._run_stage(ix)) for ix in range(nstages)]
+
+    async def _run_stage(self, ix):
+        q_in, q_out = self._queues[ix], self._queues[ix + 1]
+        func, executor = self._stages[ix], self._executors[ix]
+
+        while True:
+            item = await q_in.get()
+            if item is not _END and not isinstance(item, _StageError):
+                try:
+                    item = await self._loop.run_in_executor(executor, func, item)
+                except Exception as error:
+                    item = _StageError(error)
+
+            await q_out.put(item)
+            if item is _END:
+                executor.shutdown(wait=False)
+                return
+
+    async def submit(self, x):
+        """ Queue a chunk of the signal, (... x nch x nsamp). Waits while the pipeline is full.
+        """
+        if self._closed:
+            raise RuntimeError("The pipeline is closed.")
+
+        if self._queues is None:
+            self._start()
+
+        x = np.asarray(x)
+        await self._queues[0].put((x, x.shape))
+
+    async def get(self):
+        """ The output of the next chunk, (... x nch x nfreqs x nsamp_), in the order of submission.
+
+        Raises StopAsyncIteration once the pipeline is closed and all the outputs are consumed,
+        and the exception of a stage if the chunk failed.
+        """
+        if self._queues is None:
+            self._start()
+
+        item = await self._queues[-1].get()
+        if item is _END:
+            # Leave the marker for the other consumers
+            self._queues[-1].put_nowait(_END)
+            raise StopAsyncIteration
+
+        if isinstance(item, _StageError):
+            raise item.error
+
+        return item
+
+    async def results(self):
+        """ Iterate over the outputs until the pipeline is closed.
+        """
+        while True:
+            try:
+                y = await self.get()
+            except StopAsyncIteration:
+                return
+            yield y
+
+    async def close(self):
+        """ Mark the end of the stream. The chunks already submitted still go through the stages,
+        and their outputs are returned by get() before it raises StopAsyncIteration.
+        """
+        if self._closed:
+            return
+        self._closed = True
+
+        if self._queues is None:
+            self._start()
+
+        await self._queues[0].put(_END)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    @property
+    def bank(self):
+        return self._bank
+
+    @property
+    def maxsize(self):
+        return self._maxsize
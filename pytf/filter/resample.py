@@ -0,0 +1,192 @@
+from __future__ import division
+""" Anti-aliased decimation of the signal, as the front-end of the banks analysing low frequencies.
+"""
+# Authors : David C.C. Lu <davidlu89@gmail.com>
+#
+# License : BSD (3-clause)
+import numpy as np
+from scipy.signal import upfirdn
+
+from .filter import create_filter
+
+# The number of samples of the blocks filtered at once by resample
+_block_nelem = 2**22
+
+class Resampler(object):
+    """ Decimate the signal by an integer factor with a polyphase anti-aliasing FIR filter.
+
+    The filter is the lowpass of create_filter, with 2 * K * down + 1 taps, and only the kept
+    samples are computed (scipy.signal.upfirdn). Its group delay is K * down samples, i.e. a whole
+    number K of output samples.
+
+    process() filters a stream of chunks: the last samples of each chunk and the phase of the
+    decimation are carried over, so consecutive calls give the same output as a single call, with
+    the delay of the filter. resample() filters a whole signal, centered, without delay: the
+    output sample m is at the input sample m * down.
+
+    Parameters:
+    -----------
+    nch: int (default: 1)
+        The number of channels, for process().
+
+    down: int (default: 2)
+        The decimating factor.
+
+    sample_rate: int
+        The sample rate of the input. Required, for the design of the filter.
+
+    order: int (default: None)
+        The number of taps of the filter, rounded up to 2 * K * down + 1. Default: 16 * down + 1.
+
+    cutoff: float (default: None)
+        The cutoff frequency of the filter. Default: 0.8 times the Nyquist rate of the output.
+
+    scale, offset: ndarray, (nch,) (default: None)
+        The conversion of the input to physical units, x * scale + offset, e.g. for int16 samples.
+    """
+    def __init__(self, nch=1, down=2, sample_rate=None, order=None, cutoff=None, scale=None, offset=None):
+
+        if down < 1 or int(down) != down:
+            raise ValueError("'down' must be a positive integer. Given down={}".format(down))
+
+        if sample_rate is None:
+            raise ValueError("The 'sample_rate' is required to design the anti-aliasing filter.")
+
+        self._nch = nch
+        self._down = int(down)
+        self._sample_rate = sample_rate
+
+        order = 16 * self.down + 1 if order is None else order
+        self._K = max(1, -(-(order - 1) // (2 * self.down)))
+        self._order = 2 * self._K * self.down + 1
+        self._cutoff = .8 * sample_rate / (2. * self.down) if cutoff is None else cutoff
+
+        self._scale = None if scale is None else np.asarray(scale, dtype=np.float64)
+        self._offset = None if offset is None else np.asarray(offset, dtype=np.float64)
+
+        self._taps = create_filter(self.order, self.cutoff, sample_rate / 2., self.order, output='time')[1]
+
+        self.reset()
+
+    def reset(self):
+        """ Clear the state of process(), as if no signal has been processed.
+        """
+        self._tail = np.zeros((self.nch, self.order - 1), dtype=np.float64)
+        self._phase = 0 # The index in the next chunk of the next kept sample
+
+    def _convert(self, x, lead, convert=True):
+        """ The samples as floats, in physical units.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        if not convert:
+            return x
+        if self._scale is not None:
+            x = x * np.broadcast_to(self._scale, lead)[...,np.newaxis]
+        if self._offset is not None:
+            x = x + np.broadcast_to(self._offset, lead)[...,np.newaxis]
+        return x
+
+    def process(self, x):
+        """ Decimate a chunk of the stream.
+
+        Parameters:
+        -----------
+        x: ndarray, (nch x nsamp)
+            The chunk. Consecutive calls are treated as a continuous signal.
+
+        Return:
+        -------
+        y: ndarray, (nch x nsamp_)
+            The decimated chunk, delayed by the group delay of the filter (see delay). nsamp_ is
+            about nsamp // down, depending on the samples kept in the previous chunks.
+        """
+        x = np.atleast_2d(x)
+        nch, nsamp = x.shape
+        if nch != self.nch:
+            raise ValueError("The number of channels does not match! Given x.shape={}".format(x.shape))
+
+        ext = np.concatenate([self._tail, self._convert(x, (nch,))], axis=-1)
+        nout = len(range(self._phase, nsamp, self.down))
+
+        # ext[i + order - 1] is the sample i of the chunk
+        y = upfirdn(self._taps, ext[:,self._phase:], down=self.down, axis=-1)[:,2*self._K:2*self._K+nout]
+
+        self._tail = ext[:,ext.shape[-1]-(self.order-1):]
+        self._phase = (self._phase - nsamp) % self.down
+
+        return y
+
+    def resample(self, x, convert=True):
+        """ Decimate a whole signal, without delay. The signal is zero beyond its ends.
+
+        Parameters:
+        -----------
+        x: ndarray, (... x nch x nsamp)
+            The signal, processed in blocks of samples.
+
+        convert: bool (default: True)
+            If False, x is already in physical units and scale and offset are not applied.
+
+        Return:
+        -------
+        y: ndarray, (... x nch x ceil(nsamp / down))
+        """
+        x = np.asarray(x)
+        lead, nsamp = x.shape[:-1], x.shape[-1]
+        if self.down == 1:
+            return self._convert(x, lead, convert)
+
+        D, K = self.down, self._K
+        nout = -(-nsamp // D)
+        step = max(1, _block_nelem // (max(1, int(np.prod(lead))) * D))
+
+        y = np.empty(lead + (nout,), dtype=np.float64)
+        for m0 in range(0, nout, step):
+            m1 = min(nout, m0 + step)
+
+            # The input samples of the block, with the zeros beyond the ends of the signal
+            lo = (m0 - K) * D
+            hi = lo + (m1 - m0 - 1) * D + 2 * K * D + 1
+            xb = np.zeros(lead + (hi - lo,), dtype=np.float64)
+            a, b = max(lo, 0), min(hi, nsamp)
+            xb[...,a-lo:b-lo] = self._convert(x[...,a:b], lead, convert)
+
+            y[...,m0:m1] = upfirdn(self._taps, xb, down=D, axis=-1)[...,2*K:2*K+m1-m0]
+
+        return y
+
+    @property
+    def nch(self):
+        return self._nch
+
+    @property
+    def down(self):
+        return self._down
+
+    @property
+    def order(self):
+        return self._order
+
+    @property
+    def cutoff(self):
+        return self._cutoff
+
+    @property
+    def taps(self):
+        return self._taps
+
+    @property
+    def sample_rate(self):
+        return self._sample_rate
+
+    @property
+    def sample_rate_(self):
+        """ The sample rate of the output.
+        """
+        return self.sample_rate / self.down
+
+    @property
+    def delay(self):
+        """ The group delay of process(), in samples of the input.
+        """
+        return self._K * self.down
@@ -0,0 +1,294 @@
+from __future__ import division
+""" A compact, chunked on-disk format for the outputs of the filter bank.
+
+The outputs are stored in a directory:
+    header.json     The shape, the chunk size and the quantization parameters.
+    amplitude.npy   (nchunks x nch x nfreqs x chunk_size), uint16 (envelopes) or int16 (real signals).
+    phase.npy       (nchunks x nch x nfreqs x chunk_size), int16 fixed point, only for analytic signals.
+    scale.npy       (2 x nch x nfreqs), the scale and offset of the amplitudes.
+
+The arrays are laid out chunk by chunk along time, so each chunk of a channel and band is
+contiguous on disk. Reading a time window for a subset of channels and bands from the
+memory-mapped arrays only touches those chunks.
+"""
+# Authors : David C.C. Lu <davidlu89@gmail.com>
+#
+# License : BSD (3-clause)
+import os
+import json
+
+import numpy as np
+
+_HEADER = 'header.json'
+_AMPLITUDE = 'amplitude.npy'
+_PHASE = 'phase.npy'
+_SCALE = 'scale.npy'
+
+_PHASE_SCALE = np.pi / np.iinfo(np.int16).max
+
+def _amplitude_limits(x):
+    """ The (min, max) over time of the amplitudes of x, (nch x nfreqs x 2).
+    """
+    a = np.abs(x) if np.iscomplexobj(x) else x
+    return np.stack([a.min(axis=-1), a.max(axis=-1)], axis=-1)
+
+class QuantizedWriter(object):
+    """ Write the output of the filter bank block by block into the quantized format.
+
+    Parameters:
+    -----------
+    dirname: str
+        The directory of the output. It is created if it does not exist.
+
+    nch: int
+        The number of channels.
+
+    nfreqs: int
+        The number of frequency bands.
+
+    nsamp: int
+        The total number of samples to be written.
+
+    amp_range: ndarray, (nch x nfreqs x 2) or (nfreqs x 2)
+        The (min, max) of the amplitudes for each band. The values outside the range are clipped.
+        For analytic signals the amplitudes are the envelopes.
+
+    analytic: bool (default: True)
+        If True, the input is analytic and the envelopes (uint16) and the phases (int16) are stored.
+        If False, the input is real and only the amplitudes (int16) are stored.
+
+    chunk_size: int (default: 4096)
+        The number of samples in each chunk.
+    """
+    def __init__(self, dirname, nch, nfreqs, nsamp, amp_range, analytic=True, chunk_size=4096):
+
+        self._dirname = dirname
+        self._nch = nch
+        self._nfreqs = nfreqs
+        self._nsamp = nsamp
+        self._complex = analytic
+        self._chunk_size = chunk_size
+        self._nchunks = int(np.ceil(nsamp / chunk_size))
+
+        amp_range = np.asarray(amp_range, dtype=np.float64)
+        amp_range = np.broadcast_to(amp_range, (nch, nfreqs, 2))
+
+        # Quantization: amp = q * scale + offset
+        qdtype = np.uint16 if analytic else np.int16
+        qinfo = np.iinfo(qdtype)
+        self._qdtype = qdtype
+        self._qmin, self._qmax = qinfo.min, qinfo.max
+
+        span = amp_range[:,:,1] - amp_range[:,:,0]
+        self._scale = np.where(span > 0, span, 1.) / (qinfo.max - qinfo.min)
+        self._offset = amp_range[:,:,0] - qinfo.min * self._scale
+
+        if not os.path.isdir(dirname):
+            os.makedirs(dirname)
+
+        shape = (self._nchunks, nch, nfreqs, chunk_size)
+        self._amp = np.lib.format.open_memmap(os.path.join(dirname, _AMPLITUDE), mode='w+',
+                                              dtype=qdtype, shape=shape)
+        self._phase = np.lib.format.open_memmap(os.path.join(dirname, _PHASE), mode='w+',
+                                                dtype=np.int16, shape=shape) if analytic else None
+
+        np.save(os.path.join(dirname, _SCALE), np.stack([self._scale, self._offset]))
+        with open(os.path.join(dirname, _HEADER), 'w') as f:
+            json.dump({'nch': nch, 'nfreqs': nfreqs, 'nsamp': nsamp, 'analytic': analytic,
+                       'chunk_size': chunk_size, 'amplitude_dtype': np.dtype(qdtype).name}, f)
+
+        self._pos = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, x):
+        """ Append a block of the output of the filter bank.
+
+        Parameters:
+        -----------
+        x: ndarray, (nch x nfreqs x n)
+            The block of signal. Consecutive calls fill the file along time.
+        """
+        nch, nfreqs, n = x.shape
+        if (nch, nfreqs) != (self.nch, self.nfreqs):
+            raise ValueError("The shape of x does not match the file! "
+                             "Given x.shape={}".format(x.shape))
+
+        if self._pos + n > self.nsamp:
+            raise ValueError("Writing beyond the number of samples of the file.")
+
+        if self._complex:
+            amp = np.abs(x)
+            phase = np.angle(x)
+        else:
+            amp = x
+
+        amp = np.rint((amp - self._offset[:,:,np.newaxis]) / self._scale[:,:,np.newaxis])
+        amp = np.clip(amp, self._qmin, self._qmax).astype(self._qdtype)
+        if self._complex:
+            phase = np.rint(phase / _PHASE_SCALE).astype(np.int16)
+
+        # Fill the chunks overlapping with the block
+        start = self._pos
+        while start < self._pos + n:
+            c, i = divmod(start, self.chunk_size)
+            stop = min(self._pos + n, (c + 1) * self.chunk_size)
+            j = i + stop - start
+            self._amp[c,:,:,i:j] = amp[:,:,start-self._pos:stop-self._pos]
+            if self._complex:
+                self._phase[c,:,:,i:j] = phase[:,:,start-self._pos:stop-self._pos]
+            start = stop
+
+        self._pos += n
+
+    def close(self):
+        self._amp.flush()
+        if self._phase is not None:
+            self._phase.flush()
+
+    @property
+    def nch(self):
+        return self._nch
+
+    @property
+    def nfreqs(self):
+        return self._nfreqs
+
+    @property
+    def nsamp(self):
+        return self._nsamp
+
+    @property
+    def chunk_size(self):
+        return self._chunk_size
+
+class QuantizedReader(object):
+    """ Random access to the quantized format through memory-mapped arrays.
+
+    Parameters:
+    -----------
+    dirname: str
+        The directory written by QuantizedWriter or save_quantized.
+    """
+    def __init__(self, dirname):
+
+        with open(os.path.join(dirname, _HEADER), 'r') as f:
+            header = json.load(f)
+
+        self._nch = header['nch']
+        self._nfreqs = header['nfreqs']
+        self._nsamp = header['nsamp']
+        self._complex = header['analytic']
+        self._chunk_size = header['chunk_size']
+
+        self._scale, self._offset = np.load(os.path.join(dirname, _SCALE))
+        self._amp = np.load(os.path.join(dirname, _AMPLITUDE), mmap_mode='r')
+        self._phase = np.load(os.path.join(dirname, _PHASE), mmap_mode='r') if self._complex else None
+
+    def read(self, start=0, stop=None, chans=None, bands=None, output=None):
+        """ Read a time window for a subset of channels and bands.
+
+        Parameters:
+        -----------
+        start, stop: int
+            The sample indices of the time window.
+
+        chans: list of int (default: None)
+            The channels to read. If None, all channels are read.
+
+        bands: list of int (default: None)
+            The frequency bands to read. If None, all bands are read.
+
+        output: str (default: None)
+            'amplitude', 'phase' or 'complex'. If None, the data is returned as stored, i.e.
+            'complex' for analytic signals and 'amplitude' for real signals.
+
+        Return:
+        -------
+        x: ndarray, (len(chans) x len(bands) x (stop - start))
+        """
+        stop = self.nsamp if stop is None else min(stop, self.nsamp)
+        if not 0 <= start <= stop:
+            raise ValueError("Invalid time window! Given start={}, stop={}".format(start, stop))
+
+        output = ('complex' if self._complex else 'amplitude') if output is None else output
+        if output not in ['amplitude', 'phase', 'complex']:
+            raise ValueError("'output' must be either 'amplitude', 'phase' or 'complex'!")
+        if output != 'amplitude' and not self._complex:
+            raise ValueError("The file does not store phases.")
+
+        chans = np.arange(self.nch) if chans is None else np.atleast_1d(chans)
+        bands = np.arange(self.nfreqs) if bands is None else np.atleast_1d(bands)
+
+        # Only the chunks in the window are read, and within them only the selected rows.
+        c0 = start // self.chunk_size
+        c1 = max(c0 + 1, int(np.ceil(stop / self.chunk_size)))
+        i0 = start - c0 * self.chunk_size
+        idx = (slice(c0, c1), chans[:,np.newaxis], bands[np.newaxis,:])
+
+        def _gather(arr):
+            y = arr[idx] # (nchunks x len(chans) x len(bands) x chunk_size)
+            y = np.moveaxis(y, 0, 2).reshape(chans.size, bands.size, -1)
+            return y[:,:,i0:i0 + stop - start]
+
+        if output != 'phase':
+            scale = self._scale[chans[:,np.newaxis], bands][:,:,np.newaxis]
+            offset = self._offset[chans[:,np.newaxis], bands][:,:,np.newaxis]
+            amp = _gather(self._amp) * scale.astype(np.float32) + offset.astype(np.float32)
+            if output == 'amplitude':
+                return amp
+
+        phase = _gather(self._phase) * np.float32(_PHASE_SCALE)
+        if output == 'phase':
+            return phase
+
+        return amp * np.exp(1j * phase).astype(np.complex64)
+
+    @property
+    def shape(self):
+        return (self.nch, self.nfreqs, self.nsamp)
+
+    @property
+    def nch(self):
+        return self._nch
+
+    @property
+    def nfreqs(self):
+        return self._nfreqs
+
+    @property
+    def nsamp(self):
+        return self._nsamp
+
+    @property
+    def chunk_size(self):
+        return self._chunk_size
+
+def save_quantized(dirname, x, chunk_size=4096):
+    """ Save the output of the filter bank into the quantized format.
+
+    Parameters:
+    -----------
+    dirname: str
+        The directory of the output.
+
+    x: ndarray, (nch x nfreqs x nsamp)
+        The output of FilterBank.analysis. If complex (hilbert=True), the envelopes and the
+        phases are stored. The range of the amplitudes of each band is taken from x.
+
+    chunk_size: int (default: 4096)
+        The number of samples in each chunk.
+    """
+    nch, nfreqs, nsamp = x.shape
+    with QuantizedWriter(dirname, nch, nfreqs, nsamp, _amplitude_limits(x),
+                         analytic=np.iscomplexobj(x), chunk_size=chunk_size) as writer:
+        writer.write(x)
+
+def load_quantized(dirname, **kwargs):
+    """ Load the data of the quantized format. See QuantizedReader.read for the arguments.
+    """
+    return QuantizedReader(dirname).read(**kwargs)
@@ -23,3 +23,27 @@ def artifact_burst_idx(x, condition, hopsize, duration=3):
             idx_slices += [slice(*tmp)]
 
     return idx_slices
+
+def artifact_mask(idx_slices, nsamp):
+    """ The boolean mask of the samples within the slices, e.g. from artifact_burst_idx.
+
+    The mask is the input of FilterBank.analysis, Spectrogram.analysis and the statistics
+    (pytf.stats) to skip the flagged samples.
+
+    Parameters:
+    -----------
+    idx_slices: list of slice
+        The slices of the flagged samples.
+
+    nsamp: int
+        The number of samples of the signal.
+
+    Return:
+    -------
+    mask: ndarray of bool, (nsamp,)
+        True for the flagged samples.
+    """
+    mask = np.zeros(nsamp, dtype=bool)
+    for idx in idx_slices:
+        mask[idx] = True
+    return mask
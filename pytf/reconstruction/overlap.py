@@ -3,20 +3,58 @@ import six
 # Authors : David C.C. Lu <davidlu89@gmail.com>
 #
 # License : BSD (3-clause)
-def overlap_add(x, binsize, overlap_factor=.5, dtype=np.float32):
+def overlap_add(x, binsize, overlap_factor=.5, hopsize=None, window=None, dtype=np.float32):
+    """ Reconstruct a signal from overlapping frames using overlap-add.
 
-    _nfreqs = 1
+    Parameters:
+    -----------
+    x: ndarray, (nch x nwin x binsize) or (nch x nwin x nfreqs x binsize)
+        The frames of the signal.
+
+    binsize: int
+        The length of each frame.
+
+    overlap_factor: float (default: 0.5)
+        The ratio of overlapping between frames. Ignored if hopsize is given.
+
+    hopsize: int (default: None)
+        The number of samples between consecutive frames.
+
+    window: ndarray (default: None)
+        The analysis window of the frames. If given, the output is divided by the window-sum
+        of the overlap-add, sum(window) / hopsize, such that the overlapping windows add up to one.
+
+    dtype: ndarray type (default: np.float32)
+
+    Return:
+    -------
+    x_: ndarray, (nch x nfreqs x (nwin-1) * hopsize + binsize)
+    """
     if x.ndim == 3:
-        _nch, _nwin, _ = x.shape
-    elif x.ndim == 4:
-        _nch, _nwin, _nfreqs, _ = x.shape
+        x = x[:,:,np.newaxis,:]
+
+    _nch, _nwin, _nfreqs, _ = x.shape
+    hopsize = int(binsize * (1 - overlap_factor)) if hopsize is None else int(hopsize)
+    if hopsize < 1:
+        raise ValueError('Invalid hopsize. Must be greater than 1.')
 
     # Reconstructing the signal using overlap-add
-    x_= np.zeros((_nch, _nfreqs, _nwin * binsize), dtype=dtype)
-    for ix in range(_nwin):
-        jx = (1-overlap_factor) * ix
-        if int((jx+1)*binsize) <= binsize * _nwin * (1-overlap_factor):
-            x_[:,:,int(jx*binsize):int((jx+1)*binsize)] += x[:,ix,:,:]
+    nsamp = (_nwin - 1) * hopsize + binsize
+    if binsize % hopsize == 0:
+        # Each frame spans 'ratio' hops: add the frames hop by hop, one slice per hop
+        # offset rather than one slice per frame.
+        ratio = binsize // hopsize
+        x_ = np.zeros((_nch, _nfreqs, _nwin + ratio - 1, hopsize), dtype=dtype)
+        for r in range(ratio):
+            x_[:,:,r:r+_nwin,:] += np.swapaxes(x[:,:,:,r*hopsize:(r+1)*hopsize], 1, 2)
+        x_ = x_.reshape(_nch, _nfreqs, nsamp)
+    else:
+        x_ = np.zeros((_nch, _nfreqs, nsamp), dtype=dtype)
+        for ix in range(_nwin):
+            x_[:,:,ix*hopsize:ix*hopsize+binsize] += x[:,ix,:,:]
+
+    if window is not None:
+        x_ /= np.sum(window) / hopsize
 
     return x_
 
@@ -0,0 +1,294 @@
+from __future__ import division
+""" Online statistics of the outputs of the filter bank, per channel and band, without storing the outputs.
+"""
+# Authors : David C.C. Lu <davidlu89@gmail.com>
+#
+# License : BSD (3-clause)
+import numpy as np
+
+class QuantileSketch(object):
+    """ A streaming sketch of the distribution of positive values, for each channel and band.
+
+    The values are counted in logarithmic buckets, such that any quantile is returned with a
+    relative error below 'accuracy'. The memory is nch x nfreqs x nbuckets counts, independent
+    of the number of values. The values below the range fall in the first bucket, the values above
+    it in the last one.
+
+    Parameters:
+    -----------
+    nch, nfreqs: int
+        The number of channels and bands.
+
+    accuracy: float (default: 0.01)
+        The relative accuracy of the quantiles.
+
+    value_range: tuple (default: (1e-6, 1e6))
+        The (min, max) of the values resolved by the buckets.
+    """
+    def __init__(self, nch, nfreqs, accuracy=.01, value_range=(1e-6, 1e6)):
+
+        self._nch = nch
+        self._nfreqs = nfreqs
+        self._gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = np.log(self._gamma)
+
+        self._kmin = int(np.floor(np.log(value_range[0]) / self._log_gamma))
+        self._nbuckets = int(np.ceil(np.log(value_range[1]) / self._log_gamma)) - self._kmin + 1
+
+        self.reset()
+
+    def reset(self):
+        self._counts = np.zeros((self.nch * self.nfreqs, self._nbuckets), dtype=np.float64)
+
+    def decay(self, factor):
+        """ Scale the counts by factor, e.g. for the time passed without values.
+        """
+        if factor != 1.:
+            self._counts *= factor
+
+    def update(self, x, weights=None, decay=1.):
+        """ Add the values x, (nch x nfreqs x nsamp).
+
+        Parameters:
+        -----------
+        weights: ndarray, (nsamp,) (default: None)
+            The weight of each sample.
+
+        decay: float (default: 1.)
+            The factor applied to the previous counts.
+        """
+        nsamp = x.shape[-1]
+
+        k = np.ceil(np.log(np.maximum(x, np.finfo(np.float64).tiny)) / self._log_gamma) - self._kmin
+        k = np.clip(k, 0, self._nbuckets - 1).astype(np.int64).reshape(-1, nsamp)
+
+        # A single bincount over all channels and bands
+        k += np.arange(k.shape[0])[:,np.newaxis] * self._nbuckets
+        w = None if weights is None else np.broadcast_to(weights, k.shape).ravel()
+
+        self.decay(decay)
+        self._counts += np.bincount(k.ravel(), weights=w, minlength=self._counts.size).reshape(self._counts.shape)
+
+    def quantile(self, q):
+        """ The quantiles q (scalar or 1d) of each channel and band, (nch x nfreqs) or (nch x nfreqs x nq).
+        """
+        q_ = np.atleast_1d(q)
+        cum = np.cumsum(self._counts, axis=-1)
+        total = cum[:,-1:]
+
+        # The first bucket where the cumulated count reaches q * total
+        k = np.stack([np.argmax(cum >= qi * total - 1e-12 * total, axis=-1) for qi in q_], axis=-1)
+        values = 2 * self._gamma ** (k + self._kmin) / (self._gamma + 1)
+        values[total[:,0] == 0] = np.nan
+
+        values = values.reshape(self.nch, self.nfreqs, q_.size)
+        return values[:,:,0] if np.ndim(q) == 0 else values
+
+    @property
+    def nch(self):
+        return self._nch
+
+    @property
+    def nfreqs(self):
+        return self._nfreqs
+
+    @property
+    def nbuckets(self):
+        return self._nbuckets
+
+class OnlineStats(object):
+    """ Running mean, variance, min, max and quantiles for each channel and band.
+
+    The mean and the variance are updated with the Welford algorithm, merged chunk by chunk
+    (Chan et al.) and vectorized over the channels and the bands. With a decay, each sample is
+    weighted by exp(-age / decay), the age being in samples, such that the statistics follow the
+    last ~decay samples; the min and the max are not decayed.
+
+    Parameters:
+    -----------
+    nch, nfreqs: int
+        The number of channels and bands.
+
+    decay: float (default: None)
+        The time constant of the exponential window in samples. If None, all the samples have the same weight.
+
+    envelope: bool (default: True)
+        If True, the statistics are of the envelopes of complex inputs (hilbert=True).
+        If False, complex inputs are not accepted.
+
+    quantiles: bool (default: False)
+        If True, a QuantileSketch of the (positive) values is kept, see quantile().
+
+    kwargs:
+        The parameters of QuantileSketch.
+
+    Example:
+    --------
+        stats = OnlineStats(bank.nch, bank.nfreqs, decay=60 * sample_rate)
+        for chunk in stream:
+            y = bank.analysis(chunk)
+            stats.update(y)
+            z = stats.zscore(np.abs(y))     # or stats.zscore(y_real, out=y_real), in place
+    """
+    def __init__(self, nch, nfreqs, decay=None, envelope=True, quantiles=False, **kwargs):
+
+        self._nch = nch
+        self._nfreqs = nfreqs
+        self._decay = decay
+        self._alpha = 1. if decay is None else np.exp(-1. / decay)
+        self._envelope = envelope
+
+        self._sketch = QuantileSketch(nch, nfreqs, **kwargs) if quantiles else None
+
+        self.reset()
+
+    def reset(self):
+        """ Clear the statistics.
+        """
+        shape = (self.nch, self.nfreqs)
+        self._weight = np.zeros(shape, dtype=np.float64)
+        self._mean = np.zeros(shape, dtype=np.float64)
+        self._m2 = np.zeros(shape, dtype=np.float64)
+        self._min = np.full(shape, np.inf)
+        self._max = np.full(shape, -np.inf)
+        self._count = 0
+
+        if self._sketch is not None:
+            self._sketch.reset()
+
+    def _values(self, x):
+        x = np.asarray(x)
+        if np.iscomplexobj(x):
+            if not self._envelope:
+                raise ValueError("Complex inputs require envelope=True.")
+            x = np.abs(x)
+        return x
+
+    def update(self, x, mask=None):
+        """ Add a chunk of the output of the filter bank.
+
+        Parameters:
+        -----------
+        x: ndarray, (nch x nfreqs x nsamp)
+            The chunk. If complex, its envelope is used.
+
+        mask: ndarray of bool, (nsamp,) (default: None)
+            The samples flagged as artifacts (see FilterBank.analysis), which are not added. With
+            a decay, they still count in the age of the previous samples.
+        """
+        x = self._values(x)
+        if x.shape[:2] != (self.nch, self.nfreqs):
+            raise ValueError("The shape of x does not match! Given x.shape={}".format(x.shape))
+
+        nsamp = x.shape[-1]
+        if nsamp == 0:
+            return
+
+        keep = None
+        if mask is not None:
+            keep = ~np.asarray(mask, dtype=bool)
+            if keep.shape != (nsamp,):
+                raise ValueError("The mask must have one value per sample! Given mask.shape={}".format(keep.shape))
+
+        # The statistics of the chunk
+        if self._alpha == 1. and keep is None:
+            w = None
+            w_b = float(nsamp)
+            mean_b = x.mean(axis=-1, dtype=np.float64)
+            m2_b = np.sum((x - mean_b[:,:,np.newaxis])**2, axis=-1)
+            decay = 1.
+        else:
+            w = self._alpha ** np.arange(nsamp - 1, -1, -1)
+            decay = self._alpha ** nsamp
+            if keep is not None:
+                # The flagged samples (e.g. NaN) are left out, their time passes
+                x, w = x[...,keep], w[keep]
+                if not w.size:
+                    self._weight *= decay
+                    self._m2 *= decay
+                    if self._sketch is not None:
+                        self._sketch.decay(decay)
+                    return
+            w_b = w.sum()
+            mean_b = np.dot(x, w) / w_b
+            m2_b = np.dot((x - mean_b[:,:,np.newaxis])**2, w)
+
+        # Merge with the previous samples, decayed by the length of the chunk
+        w_a = self._weight * decay
+        weight = w_a + w_b
+        delta = mean_b - self._mean
+
+        self._mean += delta * (w_b / weight)
+        self._m2 = self._m2 * decay + m2_b + delta**2 * (w_a * w_b / weight)
+        self._weight = weight
+
+        self._min = np.minimum(self._min, x.min(axis=-1))
+        self._max = np.maximum(self._max, x.max(axis=-1))
+        self._count += x.shape[-1]
+
+        if self._sketch is not None:
+            self._sketch.update(x, weights=w, decay=decay)
+
+    def zscore(self, x, out=None):
+        """ Standardize x with the current mean and standard deviation.
+
+        Parameters:
+        -----------
+        x: ndarray, (nch x nfreqs x nsamp)
+            If complex, its envelope is standardized.
+
+        out: ndarray (default: None)
+            The output array. With out=x, a real x is standardized in place.
+
+        Return:
+        -------
+        z: ndarray, (nch x nfreqs x nsamp)
+        """
+        x = self._values(x)
+        mean = self._mean[:,:,np.newaxis].astype(x.dtype)
+        std = self.std()[:,:,np.newaxis].astype(x.dtype)
+
+        out = np.subtract(x, mean, out=out)
+        return np.divide(out, std, out=out)
+
+    def mean(self):
+        return self._mean.copy()
+
+    def var(self, ddof=0):
+        """ The variance. ddof=1 gives the unbiased estimate without decay.
+        """
+        return self._m2 / np.maximum(self._weight - ddof, np.finfo(np.float64).tiny)
+
+    def std(self, ddof=0):
+        return np.sqrt(self.var(ddof=ddof))
+
+    def min(self):
+        return self._min.copy()
+
+    def max(self):
+        return self._max.copy()
+
+    def quantile(self, q):
+        """ The quantiles q of each channel and band, from the QuantileSketch. Requires quantiles=True.
+        """
+        if self._sketch is None:
+            raise ValueError("The quantiles are not tracked. Use quantiles=True.")
+        return self._sketch.quantile(q)
+
+    @property
+    def nch(self):
+        return self._nch
+
+    @property
+    def nfreqs(self):
+        return self._nfreqs
+
+    @property
+    def decay(self):
+        return self._decay
+
+    @property
+    def count(self):
+        """ The number of samples seen.
+        """
+        return self._count
@@ -0,0 +1,272 @@
+from __future__ import division
+""" Phase-amplitude coupling (PAC) with surrogate statistics.
+
+The coupling is measured by the modulation index (Tort et al. 2010): the amplitude is averaged
+within bins of the phase, and the index is the normalized Kullback-Leibler distance of this
+distribution from the uniform one.
+
+Its significance is tested against surrogates where the amplitude is decoupled from the phase.
+The surrogates are not built as arrays. The sums of the amplitude in each phase bin are
+computed for all of them at once:
+    'circular': the amplitude is circularly shifted by a random lag. The sums for every lag are
+        the circular cross-correlation of the amplitude with the indicator of each phase bin,
+        computed with FFTs, from which the lags of the surrogates are picked.
+    'block': the amplitude is cut into nblocks blocks, which are permuted. The sums of every
+        block of amplitude against every block of phase are a single batched matrix product, and
+        each surrogate adds up the entries given by its permutation.
+"""
+# Authors : David C.C. Lu <davidlu89@gmail.com>
+#
+# License : BSD (3-clause)
+import multiprocessing as mp
+
+import numpy as np
+
+try:
+    import pyfftw.interfaces.numpy_fft as fft
+except ImportError:
+    import numpy.fft as fft
+
+# The largest number of elements of the cross-correlations computed at a time
+_block_nelem = 2**24
+
+# The data of the worker processes. See _init_worker().
+_data = None
+
+def _phase_bins(phase, nbins):
+    """ The index of the phase bin of each sample, from phases in [-pi, pi] or analytic signals.
+    """
+    phase = np.angle(phase) if np.iscomplexobj(phase) else np.asarray(phase)
+    bins = np.floor((phase + np.pi) / (2 * np.pi) * nbins).astype(np.int64)
+    return np.clip(bins, 0, nbins - 1)
+
+def _amplitude(amp):
+    return np.abs(amp) if np.iscomplexobj(amp) else np.asarray(amp, dtype=np.float64)
+
+def _unmasked(phase, amp, mask):
+    """ The samples of phase and amp that are not flagged by the mask, (nsamp,).
+    """
+    if mask is None:
+        return phase, amp
+
+    keep = ~np.asarray(mask, dtype=bool)
+    if keep.shape != (np.shape(phase)[-1],):
+        raise ValueError("The mask must have one value per sample! Given mask.shape={}".format(keep.shape))
+    return np.asarray(phase)[...,keep], np.asarray(amp)[...,keep]
+
+def _bin_sums(bins, amp, nbins):
+    """ The sums of each amplitude, (namp x nsamp), within each phase bin, (namp x nbins).
+    """
+    namp = amp.shape[0]
+    idx = bins[np.newaxis,:] + np.arange(namp)[:,np.newaxis] * nbins
+    return np.bincount(idx.ravel(), weights=amp.ravel(), minlength=namp * nbins).reshape(namp, nbins)
+
+def _mi(sums, counts):
+    """ The modulation index from the sums of the amplitude in each phase bin (last axis).
+    """
+    nbins = sums.shape[-1]
+    mean = np.divide(sums, counts, out=np.zeros(sums.shape), where=counts > 0)
+    p = mean / np.maximum(mean.sum(axis=-1, keepdims=True), np.finfo(np.float64).tiny)
+    plogp = np.where(p > 0, p * np.log(np.where(p > 0, p, 1.)), 0.)
+    return 1 + plogp.sum(axis=-1) / np.log(nbins)
+
+def modulation_index(phase, amp, nbins=18, mask=None):
+    """ The modulation index of each phase and amplitude band of each channel.
+
+    Parameters:
+    -----------
+    phase: ndarray, (nch x nphase x nsamp)
+        The phases in radians, or the analytic signals (e.g. FilterBank(hilbert=True)) of the phase bands.
+
+    amp: ndarray, (nch x namp x nsamp)
+        The amplitudes, or the analytic signals of the amplitude bands.
+
+    nbins: int (default: 18)
+        The number of phase bins.
+
+    mask: ndarray of bool, (nsamp,) (default: None)
+        The samples flagged as artifacts, which are left out (see FilterBank.analysis).
+
+    Return:
+    -------
+    mi: ndarray, (nch x nphase x namp)
+    """
+    phase, amp = _unmasked(phase, amp, mask)
+    bins = _phase_bins(phase, nbins)
+    amp = _amplitude(amp)
+    nch, nphase, _ = bins.shape
+
+    mi = np.empty((nch, nphase, amp.shape[1]))
+    for c in range(nch):
+        for p in range(nphase):
+            counts = np.bincount(bins[c,p], minlength=nbins)
+            mi[c,p] = _mi(_bin_sums(bins[c,p], amp[c], nbins), counts)
+    return mi
+
+def _circular_sums(bins, amp, nbins, shifts):
+    """ The bin sums of the amplitudes circularly shifted by each lag, (namp x nsurr x nbins).
+
+    sums[a, s, j] = sum_t amp[a, t] * (bins[(t + shifts[s]) % nsamp] == j)
+    """
+    namp, nsamp = amp.shape
+
+    onehot = np.zeros((nbins, nsamp))
+    onehot[bins, np.arange(nsamp)] = 1.
+    B = fft.rfft(onehot, axis=-1)                                   # (nbins x nr)
+    A = np.conj(fft.rfft(amp, axis=-1))                             # (namp x nr)
+
+    sums = np.empty((namp, shifts.size, nbins))
+    step = max(1, _block_nelem // (nbins * nsamp))
+    for a in range(0, namp, step):
+        corr = fft.irfft(A[a:a+step,np.newaxis,:] * B, n=nsamp, axis=-1)    # (step x nbins x nsamp)
+        sums[a:a+step] = np.swapaxes(corr[:,:,shifts], 1, 2)
+    return sums
+
+def _block_sums(bins, amp, nbins, perms):
+    """ The bin sums of the amplitudes with their blocks permuted, (namp x nsurr x nbins).
+
+    The block d of the phase is paired with the block perms[s, d] of the amplitude.
+    """
+    namp = amp.shape[0]
+    nsurr, nblocks = perms.shape
+    L = bins.size // nblocks
+
+    onehot = np.zeros((nblocks * L, nbins))
+    onehot[np.arange(nblocks * L), bins[:nblocks * L]] = 1.
+
+    # G[a, d, b, j]: the amplitude block b against the phase block d
+    A_ = amp[:,:nblocks * L].reshape(namp, 1, nblocks, L)
+    B_ = onehot.reshape(nblocks, L, nbins)
+    G = np.matmul(A_, B_)                                           # (namp x nblocks x nblocks x nbins)
+
+    return G[:, np.arange(nblocks)[np.newaxis,:], perms, :].sum(axis=2)
+
+def _surrogate_mi(bins, amp, nbins, method, lags):
+    """ The observed and the surrogate modulation indices of one phase band against all the amplitude bands.
+    """
+    if method == 'block':
+        nblocks = lags.shape[1]
+        L = bins.size // nblocks
+        bins, amp = bins[:nblocks * L], amp[:,:nblocks * L]
+        sums = _block_sums(bins, amp, nbins, lags)
+    else:
+        sums = _circular_sums(bins, amp, nbins, lags)
+
+    counts = np.bincount(bins, minlength=nbins)
+    return _mi(_bin_sums(bins, amp, nbins), counts), _mi(sums, counts)
+
+def _init_worker(data):
+    global _data
+    _data = data
+
+def _worker(task):
+    c, p = task
+    bins, amp, nbins, method, lags = _data
+    return _surrogate_mi(bins[c,p], amp[c], nbins, method, lags)
+
+def _draw_lags(nsamp, nsurrogates, method, nblocks, min_shift, rng):
+    if method == 'circular':
+        min_shift = nsamp // 10 if min_shift is None else min_shift
+        if 2 * min_shift >= nsamp:
+            raise ValueError("'min_shift' must be less than half the number of samples.")
+        return rng.randint(min_shift, nsamp - min_shift + 1, size=nsurrogates)
+
+    # Permutations of the blocks, excluding the identity
+    perms = np.argsort(rng.rand(nsurrogates, nblocks), axis=-1)
+    identity = np.all(perms == np.arange(nblocks), axis=-1)
+    while np.any(identity):
+        perms[identity] = np.argsort(rng.rand(identity.sum(), nblocks), axis=-1)
+        identity = np.all(perms == np.arange(nblocks), axis=-1)
+    return perms
+
+def surrogate_test(phase, amp, nsurrogates=200, method='circular', nbins=18, nblocks=10,
+                   min_shift=None, nprocs=1, seed=None, return_surrogates=False, mask=None):
+    """ The modulation index of each phase and amplitude band, and its significance against surrogates.
+
+    Parameters:
+    -----------
+    phase: ndarray, (nch x nphase x nsamp)
+        The phases in radians, or the analytic signals (e.g. FilterBank(hilbert=True)) of the phase bands.
+
+    amp: ndarray, (nch x namp x nsamp)
+        The amplitudes, or the analytic signals of the amplitude bands.
+
+    nsurrogates: int (default: 200)
+        The number of surrogates.
+
+    method: str (default: 'circular')
+        'circular' for circular shifts of the amplitude, 'block' for permutations of nblocks
+        blocks of the amplitude. See the module documentation.
+
+    nbins: int (default: 18)
+        The number of phase bins.
+
+    nblocks: int (default: 10)
+        The number of blocks for method='block'. The last nsamp % nblocks samples are not used.
+
+    min_shift: int (default: None)
+        The shortest circular shift for method='circular'. Default: nsamp // 10.
+
+    nprocs: int (default: 1)
+        The number of processes. The phase bands of each channel are distributed over a pool of processes.
+
+    seed: int (default: None)
+        The seed of the random surrogates. The same surrogates are used for all the pairs.
+
+    return_surrogates: bool (default: False)
+        If True, the modulation indices of the surrogates are returned as well.
+
+    mask: ndarray of bool, (nsamp,) (default: None)
+        The samples flagged as artifacts (see FilterBank.analysis). They are left out before the
+        surrogates are drawn: the shifts and the blocks run over the remaining samples, joined.
+
+    Return:
+    -------
+    mi: ndarray, (nch x nphase x namp)
+        The modulation index.
+
+    z: ndarray, (nch x nphase x namp)
+        The z-score of the modulation index against the surrogates.
+
+    pvalue: ndarray, (nch x nphase x namp)
+        The fraction of the surrogates (plus the observation) with an index at least as large.
+
+    surrogates: ndarray, (nch x nphase x namp x nsurrogates)
+        Only if return_surrogates is True.
+    """
+    if method not in ['circular', 'block']:
+        raise ValueError("'method' must be either 'circular' or 'block'! Given method={}".format(method))
+
+    phase, amp = _unmasked(phase, amp, mask)
+    bins = _phase_bins(phase, nbins)
+    amp = _amplitude(amp)
+    nch, nphase, nsamp = bins.shape
+    namp = amp.shape[1]
+    if amp.shape[0] != nch or amp.shape[-1] != nsamp:
+        raise ValueError("The shapes of phase and amp do not match! Given {} and {}".format(bins.shape, amp.shape))
+
+    lags = _draw_lags(nsamp, nsurrogates, method, nblocks, min_shift, np.random.RandomState(seed))
+
+    tasks = [(c, p) for c in range(nch) for p in range(nphase)]
+    data = (bins, amp, nbins, method, lags)
+    if nprocs > 1:
+        pool = mp.Pool(nprocs, initializer=_init_worker, initargs=(data,))
+        try:
+            results = pool.map(_worker, tasks, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        _init_worker(data)
+        results = [_worker(task) for task in tasks]
+
+    mi = np.stack([r[0] for r in results]).reshape(nch, nphase, namp)
+    surr = np.stack([r[1] for r in results]).reshape(nch, nphase, namp, nsurrogates)
+
+    mean, std = surr.mean(axis=-1), surr.std(axis=-1)
+    z = np.divide(mi - mean, std, out=np.zeros(mi.shape), where=std > 0)
+    pvalue = (1 + np.sum(surr >= mi[...,np.newaxis], axis=-1)) / (1 + nsurrogates)
+
+    if return_surrogates:
+        return mi, z, pvalue, surr
+    return mi, z, pvalue
@@ -0,0 +1,275 @@
+from __future__ import division
+""" Recursive per-sample spectral trackers for a handful of target frequencies.
+
+Both trackers estimate, for each channel and target frequency f, the complex amplitude
+
+    Y[n] = 2 / sum(w) * sum_{k=0}^{binsize-1} w[k] x[n-k] exp(j 2 pi f k / sample_rate)
+
+i.e. the DFT of the last 'binsize' samples with the phase referenced to the newest sample.
+For a sinusoid at f, |Y| is its amplitude and angle(Y) its instantaneous phase.
+"""
+# Authors : David C.C. Lu <davidlu89@gmail.com>
+#
+# License : BSD (3-clause)
+import numpy as np
+from scipy.signal import lfilter
+
+# Cosine-sum windows, w[k] = a0 - a1 * cos(2 pi k / binsize), as (a0, a1).
+_windows = {
+    None: (1., 0.),
+    'boxcar': (1., 0.),
+    'hann': (.5, .5),
+    'hamming': (.54, .46),
+}
+
+def _check_freqs(freqs, sample_rate):
+    freqs = np.atleast_1d(np.asarray(freqs, dtype=np.float64))
+    if freqs.ndim != 1:
+        raise ValueError("'freqs' must be a 1d array of target frequencies.")
+
+    if sample_rate is None:
+        raise ValueError("'sample_rate' must be given.")
+
+    if np.any(freqs < 0) or np.any(freqs >= sample_rate / 2.):
+        raise ValueError("The target frequencies must be between 0 and the Nyquist rate.")
+
+    return freqs
+
+class SlidingDFT(object):
+    """ Sliding DFT over the last 'binsize' samples, updated at every sample.
+
+    The state is one complex value per channel and bin, plus the last 'binsize' samples of each
+    channel that leave the window. A block of samples is processed at once with a cumulative
+    sum, so the work per block does not depend on binsize.
+
+    A cosine-sum window ('hann', 'hamming') is applied in the frequency domain by tracking the two
+    neighbouring bins, f -/+ sample_rate / binsize, of each target frequency.
+
+    Parameters:
+    -----------
+    nch: int (default: 1)
+        The number of channels.
+
+    freqs: ndarray, (nfreqs,)
+        The target frequencies. The unit must be consistent with the sample rate.
+
+    sample_rate: int or float
+        The sample rate of the signal.
+
+    binsize: int (default: 1024)
+        The length of the sliding window.
+
+    window: str (default: None)
+        The window, None (or 'boxcar'), 'hann' or 'hamming'.
+    """
+    def __init__(self, nch=1, freqs=None, sample_rate=None, binsize=2**10, window=None):
+
+        if window not in _windows:
+            raise ValueError("'window' must be one of {}.".format(list(_windows.keys())))
+
+        self._nch = nch
+        self._freqs = _check_freqs(freqs, sample_rate)
+        self._sample_rate = sample_rate
+        self._binsize = binsize
+        self._window = window
+
+        a0, a1 = _windows[window]
+        if a1:
+            df = sample_rate / binsize
+            bins = np.concatenate([self._freqs, self._freqs - df, self._freqs + df])
+            self._weights = np.array([a0, -a1/2., -a1/2.])
+        else:
+            bins = self._freqs
+            self._weights = np.array([a0])
+
+        # Normalize such that a sinusoid at a bin frequency has unit amplitude.
+        self._norm = 2. / (a0 * binsize)
+
+        self._omega = 2 * np.pi * bins / sample_rate
+        self._rot = np.exp(1j * self._omega)                        # e^{jw}
+        self._rot_n = np.exp(1j * self._omega * binsize)            # e^{jwN}
+
+        self.reset()
+
+    def reset(self):
+        """ Clear the state, as if the window was filled with zeros.
+        """
+        self._state = np.zeros((self.nch, self._omega.size), dtype=np.complex128)
+        self._history = np.zeros((self.nch, self.binsize), dtype=np.float64)
+
+    def update(self, x):
+        """ Feed a block of samples.
+
+        Parameters:
+        -----------
+        x: ndarray, (nch x nsamp)
+            The new samples.
+
+        Return:
+        -------
+        Y: ndarray, complex, (nch x nfreqs x nsamp)
+            The spectral estimate at each of the new samples.
+        """
+        x = np.atleast_2d(x)
+        nch, nsamp = x.shape
+        if nch != self.nch:
+            raise ValueError("The number of channels does not match! Given x.shape={}".format(x.shape))
+
+        # x[n-N] for each new sample comes from the history, and then from the block itself.
+        _x = np.concatenate([self._history, x], axis=-1)
+        self._history = _x[:,-self.binsize:]
+
+        # Y[n] = e^{jw} Y[n-1] + x[n] - e^{jwN} x[n-N]
+        #      => Y[n0+i] = e^{jwi} (e^{jw} Y[n0-1] + sum_{l<=i} e^{-jwl} d[l])
+        i = np.arange(nsamp)
+        phasor = np.exp(1j * self._omega[:,np.newaxis] * i)                    # (nbins x nsamp)
+        d = _x[:,np.newaxis,self.binsize:] - \
+                self._rot_n[:,np.newaxis] * _x[:,np.newaxis,:nsamp]              # (nch x nbins x nsamp)
+        d *= phasor.conj()
+        Y = np.cumsum(d, axis=-1)
+        Y += (self._rot * self._state)[:,:,np.newaxis]
+        Y *= phasor
+
+        self._state = Y[:,:,-1].copy()
+
+        # Combine the neighbouring bins for the window
+        nfreqs = self.nfreqs
+        Y_ = self._weights[0] * Y[:,:nfreqs,:]
+        for ix in range(1, self._weights.size):
+            Y_ += self._weights[ix] * Y[:,ix*nfreqs:(ix+1)*nfreqs,:]
+
+        return Y_ * self._norm
+
+    @property
+    def nch(self):
+        return self._nch
+
+    @property
+    def freqs(self):
+        return self._freqs
+
+    @property
+    def nfreqs(self):
+        return self._freqs.size
+
+    @property
+    def sample_rate(self):
+        return self._sample_rate
+
+    @property
+    def binsize(self):
+        return self._binsize
+
+    @property
+    def delay(self):
+        """ The group delay of the estimate in samples.
+        """
+        return (self.binsize - 1) / 2.
+
+class Goertzel(object):
+    """ Goertzel algorithm over consecutive, non-overlapping windows of 'binsize' samples.
+
+    Each bin is a second order resonator, s[n] = x[n] + 2 cos(w) s[n-1] - s[n-2], run across blocks
+    with its filter state carried over. An estimate is emitted every time a window of 'binsize'
+    samples is complete. Compared with SlidingDFT, no sample history is kept.
+
+    Parameters:
+    -----------
+    nch: int (default: 1)
+        The number of channels.
+
+    freqs: ndarray, (nfreqs,)
+        The target frequencies. The unit must be consistent with the sample rate.
+
+    sample_rate: int or float
+        The sample rate of the signal.
+
+    binsize: int (default: 1024)
+        The length of each window.
+    """
+    def __init__(self, nch=1, freqs=None, sample_rate=None, binsize=2**10):
+
+        self._nch = nch
+        self._freqs = _check_freqs(freqs, sample_rate)
+        self._sample_rate = sample_rate
+        self._binsize = binsize
+
+        self._omega = 2 * np.pi * self._freqs / sample_rate
+        self._a = [np.array([1., -2 * np.cos(w), 1.]) for w in self._omega]
+        self._rot = np.exp(1j * self._omega)
+
+        self.reset()
+
+    def reset(self):
+        """ Clear the state and restart the current window.
+        """
+        self._zi = np.zeros((self.nfreqs, self.nch, 2), dtype=np.float64)
+        self._s1 = np.zeros((self.nfreqs, self.nch), dtype=np.float64)  # s[n-1]
+        self._count = 0
+
+    def update(self, x):
+        """ Feed a block of samples.
+
+        Parameters:
+        -----------
+        x: ndarray, (nch x nsamp)
+            The new samples.
+
+        Return:
+        -------
+        Y: ndarray, complex, (nch x nfreqs x nwin)
+            The estimates of the windows completed in this block. nwin may be 0.
+        """
+        x = np.atleast_2d(np.asarray(x, dtype=np.float64))
+        nch, nsamp = x.shape
+        if nch != self.nch:
+            raise ValueError("The number of channels does not match! Given x.shape={}".format(x.shape))
+
+        out = []
+        start = 0
+        while start < nsamp:
+            stop = min(nsamp, start + self.binsize - self._count)
+            seg = x[:,start:stop]
+
+            s = np.empty((self.nfreqs, nch, stop - start), dtype=np.float64)
+            for ix, a in enumerate(self._a):
+                s[ix], self._zi[ix] = lfilter([1.], a, seg, axis=-1, zi=self._zi[ix])
+
+            s2 = s[:,:,-2] if s.shape[-1] > 1 else self._s1
+            self._s1 = s[:,:,-1]
+            self._count += stop - start
+
+            if self._count == self.binsize:
+                # y = s[N-1] - e^{-jw} s[N-2] = sum_k x[N-1-k] e^{jwk}
+                y = self._s1 - self._rot.conj()[:,np.newaxis] * s2
+                out += [y.T * (2. / self.binsize)]
+                self._zi[:] = 0
+                self._s1 = np.zeros_like(self._s1)
+                self._count = 0
+
+            start = stop
+
+        if out:
+            return np.stack(out, axis=-1)
+        else:
+            return np.zeros((nch, self.nfreqs, 0), dtype=np.complex128)
+
+    @property
+    def nch(self):
+        return self._nch
+
+    @property
+    def freqs(self):
+        return self._freqs
+
+    @property
+    def nfreqs(self):
+        return self._freqs.size
+
+    @property
+    def sample_rate(self):
+        return self._sample_rate
+
+    @property
+    def binsize(self):
+        return self._binsize
@@ -1,10 +1,20 @@
 # Authors : David C.C. Lu <davidlu89@gmail.com>
 #
 # License : BSD (3-clause)
+import os
+
 import numpy as np
 import matplotlib.pyplot as plt
-from .stft import (stft, istft)
+from scipy.signal import get_window
+from .stft import (STFT, stft, istft, zoom_stft, multires_stft, _get_geometry, _multires_geometry, _zoom_decimation)
+from ..core import (_check_mask, _event_segments, _frames_any)
+from ..filter.resample import Resampler
 from ..viz.spectra_plot import (_plot_spectrogram)
+from ..viz.pyramid import SpectrogramPyramid
+
+# The number of samples of the segments of the events transformed at once
+_events_nelem = 2**22
+
 class Spectrogram(object):
     """ This class represent a time series waveform into spectrogram.
     Note: At the moment, the class only used a Fourier based method.
@@ -26,39 +36,241 @@ class Spectrogram(object):
 
     overlap_factor: float (default: 0.5)
         The ratio of overlapping between chuncks.
+
+    scale, offset: ndarray, (nch,) (default: None)
+        The conversion of the input to physical units, x * scale + offset, for each channel.
+        Integer inputs (e.g. int16) are converted frame by frame along with the window.
+
+    fmin, fmax: float (default: None)
+        If given, only the band [fmin, fmax] is computed, with nbins frequencies (see zoom_stft).
+        Giving one of them is enough, the other one defaults to 0 or the Nyquist rate.
+
+    nbins: int (default: None)
+        The number of frequencies of the band. Default: the resolution sample_rate / binsize.
+
+    resample_by: int (default: 1)
+        If larger than 1, the signal is first decimated by resample_by with an anti-aliasing filter
+        (see pytf.filter.resample.Resampler), and the spectra are computed at sample_rate / resample_by.
+        The nsamp, binsize and hopsize are given at the input rate, and the properties are at the
+        reduced rate.
     """
-    def __init__(self, nch=1, nsamp=2**11, sample_rate=None, binsize=2**14, hopsize=None, overlap_factor=.5):
+    def __init__(self, nch=1, nsamp=2**11, sample_rate=None, binsize=2**14, hopsize=None, overlap_factor=.5,
+                 scale=None, offset=None, fmin=None, fmax=None, nbins=None, resample_by=1):
+
+        self._resampler = None
+        if resample_by > 1:
+            if binsize % resample_by or (hopsize is not None and hopsize % resample_by):
+                raise ValueError("The binsize and the hopsize must be multiples of resample_by. "
+                                 "Given resample_by={}".format(resample_by))
+            self._resampler = Resampler(nch, down=resample_by, sample_rate=sample_rate, scale=scale, offset=offset)
+            sample_rate = self._resampler.sample_rate_
+            nsamp = -(-nsamp // resample_by)
+            binsize = binsize // resample_by
+            hopsize = None if hopsize is None else hopsize // resample_by
 
         self._overlap_factor = overlap_factor
         self._binsize = binsize
         self._hopsize = hopsize
         self._sample_rate = sample_rate
         self._nsamp = nsamp
+        self._scale = scale
+        self._offset = offset
+
+        self._zoom = fmin is not None or fmax is not None
+        self._fmin = 0. if fmin is None else fmin
+        self._fmax = sample_rate / 2. if fmax is None and self._zoom else fmax
+        self._nbins = nbins
+        self._freqs = None
 
         self._istft = None
         self._stft = None
+        self._pyramids = None
+        self._plan = None
 
-    def analysis(self, x, axis=-1):
+    def analysis(self, x, axis=-1, mask=None, fill=np.nan):
         """
         Processing to get the spectra.
 
         Parameters:
         -----------
-        x: ndarray, (nch x nsamp)
-            The input signal.
+        x: ndarray, (... x nch x nsamp)
+            The input signal. Any leading dimensions (e.g. trials) are processed in one pass.
 
         axis: int (default: -1)
-            The processing axis.
+            The processing axis, i.e. the time axis of x.
+
+        mask: ndarray of bool, (nsamp,) or (... x nch x nsamp) (default: None)
+            The samples flagged as artifacts, e.g. from pytf.preprocessing.artifact_mask. The windows
+            covering a flagged sample are not computed (if flagged for all the rows), and are filled.
+
+        fill: float (default: np.nan)
+            The value of the flagged windows, e.g. np.nan or 0.
+
+        Return:
+        -------
+        X: ndarray, (... x nch x nwin x binsize // 2 + 1), or (... x nch x nwin x nbins) with fmin or fmax.
+            See freqs for the frequencies.
         """
+        x = np.moveaxis(np.asarray(x), axis, -1)
+        windows = flagged = None
+        if mask is not None:
+            mask = np.moveaxis(np.asarray(mask, dtype=bool), axis, -1) if np.ndim(mask) > 1 else mask
+            flagged = self._flagged_windows(mask, x.shape)
+            windows = ~flagged.reshape(-1, flagged.shape[-1]).all(axis=0)
+
+        scale, offset = self._scale, self._offset
+        if self._resampler is not None:
+            x = self._resampler.resample(x)
+            scale = offset = None
+        self._pyramids = None
+
+        if self._zoom:
+            self._stft, self._freqs = zoom_stft(x, self._fmin, self._fmax, nbins=self._nbins,
+                                                sample_rate=self.sample_rate,
+                                                binsize=self.binsize,
+                                                overlap_factor=self.overlap_factor,
+                                                hopsize=self.hopsize,
+                                                window='hann',
+                                                scale=scale,
+                                                offset=offset,
+                                                windows=windows)
+            if flagged is not None:
+                np.copyto(self._stft, fill, where=flagged[...,np.newaxis])
+            return self._stft
+
+        self._freqs = np.arange(self.binsize // 2 + 1) * self.sample_rate / self.binsize
+        if x.ndim == 2 and windows is None:
+            self._stft = self._stft_plan(x.shape, scale, offset).forward(x).copy()
+            return self._stft
+
         self._stft = stft(x, binsize = self.binsize,
                                 overlap_factor = self.overlap_factor,
                                 hopsize = self.hopsize,
-                                window = 'hanning',
-                                planner_effort='FFTW_ESTIMATE', axis=axis)
+                                window = 'hann',
+                                scale = scale,
+                                offset = offset,
+                                windows = windows,
+                                planner_effort='FFTW_ESTIMATE', axis=-1)
+        if flagged is not None:
+            np.copyto(self._stft, fill, where=flagged[...,np.newaxis])
 
         return self._stft
 
+    def _stft_plan(self, shape, scale, offset):
+        """ The STFT of the blocks of the given shape, (nch x nsamp), set up at the first call.
+        """
+        if self._plan is None or (self._plan.nch, self._plan.nsamp) != shape:
+            self._plan = STFT(shape[0], shape[1], binsize=self.binsize, overlap_factor=self.overlap_factor,
+                              hopsize=self.hopsize, window='hann', scale=scale, offset=offset)
+        return self._plan
+
+    def _flagged_windows(self, mask, shape):
+        """ The windows covering a flagged sample, (... x nch x nwin), from the mask of the input samples.
+        """
+        R = self.resample_by
+        binsize, hopsize, n_win, padsize = _get_geometry(-(-shape[-1] // R), self.binsize,
+                                                         self.overlap_factor, self.hopsize)
+        mask = _check_mask(mask, shape)
+        return _frames_any(mask, binsize * R, hopsize * R, padsize * R, n_win)
+
+    def _margin(self, binsize, hopsize, padsize):
+        """ The number of samples beyond each end of a window that its spectrum depends on, through the
+        filters of the resampling and of the zoom. At the rate of the spectra.
+        """
+        margin = 0 if self._resampler is None else self._resampler.delay // self.resample_by
+        if self._zoom:
+            _, taps = _zoom_decimation(self.sample_rate, self._fmin, self._fmax, binsize, hopsize, padsize)
+            margin += 0 if taps is None else (taps.size - 1) // 2
+        return margin
+
+    def analyze_events(self, x, event_samples, tmin, tmax, axis=-1):
+        """ The spectra of the windows around events only.
+
+        Each epoch is analysed as a segment of the signal aligned on the hops, with a margin of one
+        window (plus the delays of the resampling and of the zoom filters) on each side, so that the
+        spectra are the ones of analysis on the whole signal. The segments of the events are
+        transformed in batches, and the cost depends on the number of events, not on the length of
+        the signal. The spectra of the last analysis are kept.
+
+        Parameters:
+        -----------
+        x: ndarray, (... x nch x nsamp)
+            The whole recording.
+
+        event_samples: ndarray, (nevents,)
+            The sample indices of the events.
+
+        tmin, tmax: float
+            The start and the end of the epochs relative to the events, in seconds (e.g. -1., 1.).
+            The windows are picked by their centers.
+
+        axis: int (default: -1)
+            The time axis of x.
+
+        Return:
+        -------
+        epochs: ndarray, (nevents x ... x nch x nwin_ x nbins)
+            The windows centered from event + tmin on, nwin_ = (tmax - tmin) * sample_rate // hopsize + 1.
+            The windows beyond the ends of the recording are the ones of the signal extended with zeros.
+            With fmin or fmax, the windows over the ends of the recording keep the response of the
+            zoom filter to the signal (analysis cuts it off at the ends), and differ from analysis.
+        """
+        x = np.moveaxis(np.asarray(x), axis, -1)
+        nsamp = x.shape[-1]
+        events = np.asarray(event_samples, dtype=np.int64).ravel()
+
+        R = self.resample_by
+        nsamp_ = -(-nsamp // R)
+        binsize, hopsize, _, padsize = _get_geometry(nsamp_, self.binsize, self.overlap_factor, self.hopsize)
+        if binsize != self.binsize:
+            raise ValueError("The events cannot be analysed with a single window over the whole signal.")
+
+        rate = self.sample_rate * R
+        n0, n1 = int(np.round(tmin * rate)), int(np.round(tmax * rate))
+        if n1 < n0:
+            raise ValueError("'tmax' must not be before 'tmin'. Given tmin={}, tmax={}".format(tmin, tmax))
+        nwin_ = (n1 - n0) // (hopsize * R) + 1
+
+        margin = self._margin(binsize, hopsize, padsize)
+
+        # The first window of each epoch, and the segments starting q windows before it
+        first = np.ceil((events + n0 - (binsize / 2. - padsize) * R) / (hopsize * R)).astype(np.int64)
+        q = -(-(padsize + margin) // hopsize)
+        starts = (first - q) * hopsize * R
+        length = ((q + nwin_ - 1) * hopsize - padsize + binsize + margin) * R
+
+        scale, offset = self._scale, self._offset
+        nbatch = max(1, _events_nelem // (int(np.prod(x.shape[:-1])) * length))
+
+        epochs = None
+        for ev, segs in _event_segments(x, starts, length, nbatch, scale, offset):
+            if self._resampler is not None:
+                segs = self._resampler.resample(segs, convert=False)
+                # Beyond the ends of the signal, the resampled signal is zero as well
+                for seg, start in zip(segs, starts[ev] // R):
+                    seg[...,:max(0, -start)] = 0
+                    seg[...,max(0, nsamp_ - start):] = 0
+
+            if self._zoom:
+                X, self._freqs = zoom_stft(segs, self._fmin, self._fmax, nbins=self._nbins,
+                                           sample_rate=self.sample_rate, binsize=self.binsize,
+                                           overlap_factor=self.overlap_factor, hopsize=self.hopsize,
+                                           window='hann')
+            else:
+                self._freqs = np.arange(binsize // 2 + 1) * self.sample_rate / binsize
+                X = stft(segs, binsize=self.binsize, overlap_factor=self.overlap_factor, hopsize=self.hopsize,
+                         window='hann', planner_effort='FFTW_ESTIMATE', axis=-1)
+
+            if epochs is None:
+                epochs = np.empty((events.size,) + X.shape[1:-2] + (nwin_, X.shape[-1]), dtype=X.dtype)
+            epochs[ev] = X[...,q:q+nwin_,:]
+
+        return epochs
+
     def synthesis(self, X=None):
+        if self._zoom:
+            raise ValueError("The spectra of a band (fmin, fmax) cannot be inverted.")
+
         if X is None:
             if self._stft is None:
                 raise ValueError("'analysis' method has yet to run.")
@@ -68,7 +280,8 @@ class Spectrogram(object):
         self._istft = istft(X, nsamp=None,
                                binsize=self.binsize,
                                overlap_factor=self.overlap_factor,
-                               hopsize=self.hopsize)
+                               hopsize=self.hopsize,
+                               window='hann')
         return self._istft
 
     def reconstruction_error(self, x):
@@ -77,9 +290,59 @@ class Spectrogram(object):
         else:
             raise ValueError("'synthsis' method has yet to run.")
 
+    def build_pyramid(self, pool='max', factor=2, min_size=256, dirname=None):
+        """ Build the multi-resolution pyramid of the spectrogram of each channel, which is then
+        used by plot_spectra. See pytf.viz.pyramid.SpectrogramPyramid.
+
+        Parameters:
+        -----------
+        pool: str (default: 'max')
+            The pooling of the levels, either 'max' or 'mean'.
+
+        factor: int (default: 2)
+            The pooling factor between consecutive levels.
+
+        min_size: int (default: 256)
+            The levels are built until both dimensions are at most min_size.
+
+        dirname: str (default: None)
+            If given, the levels are memory-mapped in a sub-directory per channel.
+
+        Return:
+        -------
+        pyramids: list of SpectrogramPyramid
+        """
+        if self._stft is None:
+            raise ValueError("'analysis' method has yet to run.")
+
+        spec_ = self._stft.reshape((-1,) + self._stft.shape[-2:])
+        hopsize = self.hopsize if self.hopsize is not None else int(self.binsize * (1 - self.overlap_factor))
+
+        self._pyramids = [SpectrogramPyramid(spec_[i], self.sample_rate, self.binsize, hopsize=hopsize,
+                                             freqs=self.freqs, pool=pool, factor=factor, min_size=min_size,
+                                             dirname=None if dirname is None else os.path.join(dirname, 'ch{}'.format(i)))
+                          for i in range(spec_.shape[0])]
+        return self._pyramids
+
     def plot_spectra(self, ch=None, axs=None, tlim=None, flim=None, figsize=None, norm='db',
                            title=None, label=False, xlabel=False, ylabel=False,
-                           fontsize={'ticks': 15, 'axis': 15, 'title': 20}):
+                           fontsize={'ticks': 15, 'axis': 15, 'title': 20}, width=None):
+        """ Plot the spectrogram of each channel.
+
+        If build_pyramid has been called, each panel is drawn from the level of the pyramid
+        matching tlim, flim and the size of the axes (or 'width' pixels), such that zooming
+        does not depend on the length of the recording.
+        """
+        if self._pyramids is not None:
+            chans = [ch] if ch is not None else range(len(self._pyramids))
+            if axs is None:
+                fig, axs = plt.subplots(1, len(chans), figsize=(4 * len(chans), 5) if figsize is None else figsize)
+            self._axs = np.array(axs).ravel()
+            self._fig = self._axs[0].figure
+
+            for i, ax in zip(chans, self._axs):
+                self._pyramids[i].plot(tlim=tlim, flim=flim, ax=ax, width=width, norm=norm, title=title)
+            return self._fig
 
         spec_ = self._stft[ch,:,:][np.newaxis,:,:] if ch is not None else self._stft
         nch, tbins, fbins = spec_.shape
@@ -99,7 +362,7 @@ class Spectrogram(object):
                 axs=ax, title=title, cmap='jet',
                 srate=self.sample_rate, nsamp=self.nsamp,
                 label=label, xlabel=xlabel, ylabel=ylabel, tlim=tlim, flim=flim, norm=norm,
-                fontsize=fontsize,
+                fontsize=fontsize, freqs=self.freqs if self._zoom else None,
             )
 
     @property
@@ -121,3 +384,183 @@ class Spectrogram(object):
     @property
     def sample_rate(self):
         return self._sample_rate
+
+    @property
+    def resample_by(self):
+        return 1 if self._resampler is None else self._resampler.down
+
+    @property
+    def freqs(self):
+        """ The frequencies of the spectra of the last analysis.
+        """
+        return self._freqs
+
+class MultiResolutionSpectrogram(object):
+    """ Spectrograms of the signal at several binsizes, computed in one pass (see multires_stft).
+
+    The signal is converted and padded once, and the frames of all the resolutions are views of
+    the same buffer. Each resolution has the frames of stft with its binsize and hopsize (see
+    times for their centers). merge() puts the resolutions together into one spectrogram whose
+    resolution depends on the frequency, on the frames of the shortest hopsize.
+
+    Parameters:
+    -----------
+    nch: int
+        The number of channels of the processing signal.
+
+    sample_rate: int
+        Sampling of the input signal.
+
+    binsizes: list of int (default: [256, 1024, 4096])
+        The number of samples of the analysis windows of each resolution.
+
+    overlap_factor: float (default: 0.5)
+        The ratio of overlapping between chuncks, for each resolution.
+
+    hopsize: int (default: None)
+        If given, the same hopsize for all the resolutions, instead of the overlap_factor.
+
+    freq_ranges: list of (fmin, fmax) (default: None)
+        The frequency range computed at each resolution, e.g. the long windows for the low
+        frequencies only. The ranges should not overlap for merge(). Default: all the frequencies.
+
+    window: str (default: 'hann')
+        The window of the STFT.
+
+    scale, offset: ndarray, (nch,) (default: None)
+        The conversion of the input to physical units, x * scale + offset, for each channel.
+    """
+    def __init__(self, nch=1, sample_rate=None, binsizes=[2**8, 2**10, 2**12], overlap_factor=.5, hopsize=None,
+                 freq_ranges=None, window='hann', scale=None, offset=None):
+
+        self._nch = nch
+        self._sample_rate = sample_rate
+        self._binsizes = list(binsizes)
+        self._hopsizes = [hopsize if hopsize is not None else int(b * (1 - overlap_factor)) for b in self._binsizes]
+
+        hop = min(self._hopsizes)
+        if hop < 1 or any(h % hop for h in self._hopsizes):
+            raise ValueError("The hopsizes must be multiples of the shortest one. Given hopsizes={}".format(self._hopsizes))
+
+        self._freq_ranges = freq_ranges
+        self._bins = []
+        self._freqs = []
+        for i, b in enumerate(self._binsizes):
+            lo, hi = 0, b // 2 + 1
+            if freq_ranges is not None and freq_ranges[i] is not None:
+                fmin, fmax = freq_ranges[i]
+                lo, hi = int(np.ceil(fmin * b / sample_rate)), min(hi, int(np.floor(fmax * b / sample_rate)) + 1)
+                if lo >= hi:
+                    raise ValueError("The range {} holds no bin of the binsize {}.".format(freq_ranges[i], b))
+            self._bins += [slice(lo, hi)]
+            self._freqs += [np.arange(lo, hi) * sample_rate / b]
+
+        self._window = window
+        self._scale = scale
+        self._offset = offset
+
+        self._nsamp = None
+        self._stft = None
+
+    def analysis(self, x, axis=-1):
+        """ The spectrograms of each resolution.
+
+        Parameters:
+        -----------
+        x: ndarray, (... x nch x nsamp)
+            The input signal.
+
+        axis: int (default: -1)
+            The time axis of x.
+
+        Return:
+        -------
+        X: list of ndarray, (... x nch x nwin[i] x nbins[i])
+            The frames of the resolution i are centered on times[i], at the frequencies freqs[i].
+        """
+        x = np.moveaxis(np.asarray(x), axis, -1)
+        self._nsamp = x.shape[-1]
+        self._stft = multires_stft(x, self.binsizes, hopsizes=self.hopsizes, window=self._window, bins=self._bins,
+                                   scale=self._scale, offset=self._offset, planner_effort='FFTW_ESTIMATE')
+        return self._stft
+
+    def merge(self, ncycles=8):
+        """ One spectrogram with the resolutions side by side in frequency, on the grid of the shortest hopsize.
+
+        Each frame takes the frame of each resolution with the nearest center (see times). The spectra are
+        scaled by 2 / sum(window), such that a sinusoid of amplitude A at a bin gives a peak of A
+        at every resolution.
+
+        Parameters:
+        -----------
+        ncycles: int (default: 8)
+            Without freq_ranges, each frequency f is taken from the shortest window that holds
+            at least ncycles cycles of f, i.e. binsize >= ncycles * sample_rate / f.
+
+        Return:
+        -------
+        X: ndarray, (... x nch x nwin x nbins)
+
+        freqs: ndarray, (nbins,)
+        """
+        if self._stft is None:
+            raise ValueError("'analysis' method has yet to run.")
+
+        order = np.argsort(self.binsizes)[::-1]
+        if self._freq_ranges is None:
+            # The longest window takes the lowest frequencies, up to where the next one holds ncycles cycles
+            edges = [0.] + [ncycles * self.sample_rate / self.binsizes[i] for i in order[1:]] + [np.inf]
+            picks = [(f >= lo) & (f < hi) for f, lo, hi in zip([self.freqs[i] for i in order], edges[:-1], edges[1:])]
+        else:
+            order = np.argsort([f[0] for f in self.freqs])
+            picks = [np.ones(self.freqs[i].size, dtype=bool) for i in order]
+
+        # The frames of the shortest hopsize
+        centers = self._centers()
+        grid = centers[int(np.argmin(self.hopsizes))]
+
+        X, freqs = [], []
+        for i, pick in zip(order, picks):
+            X_ = self._stft[i]
+            idx = np.floor((grid - centers[i][0]) / self.hopsizes[i] + .5).astype(np.int64)
+            idx = np.clip(idx, 0, X_.shape[-2] - 1)
+            X += [X_[...,idx,:][...,pick] * (2. / get_window(self._window, self.binsizes[i]).sum())]
+            freqs += [self.freqs[i][pick]]
+
+        return np.concatenate(X, axis=-1), np.concatenate(freqs)
+
+    @property
+    def nch(self):
+        return self._nch
+
+    @property
+    def sample_rate(self):
+        return self._sample_rate
+
+    @property
+    def binsizes(self):
+        return self._binsizes
+
+    @property
+    def hopsizes(self):
+        return self._hopsizes
+
+    @property
+    def freqs(self):
+        """ The frequencies of each resolution.
+        """
+        return self._freqs
+
+    @property
+    def times(self):
+        """ The times of the centers of the frames of each resolution, in seconds.
+        """
+        if self._nsamp is None:
+            return None
+        return [c / self.sample_rate for c in self._centers()]
+
+    def _centers(self):
+        """ The centers of the frames of each resolution, in samples, as for stft.
+        """
+        return [np.arange(n_win) * hopsize - padsize + binsize / 2.
+                for binsize, hopsize, n_win, padsize in _multires_geometry(self._nsamp, self.binsizes, self.hopsizes)]
@@ -1,18 +1,26 @@
 import numpy as np
-from numpy.lib import stride_tricks
 
-from scipy.signal import get_window
+from scipy.signal import (get_window, kaiserord, firwin, upfirdn, ZoomFFT)
 
 try:
+    import pyfftw
     import pyfftw.interfaces.numpy_fft as fft
 except ImportError:
+    pyfftw = None
     import scipy.fftpack as fft
 
+from ..core import (frame_segments, _as_frames, _mask_runs)
 from ..reconstruction.overlap import overlap_add
 # Authors : David C.C. Lu <davidlu89@gmail.com>
 #
 # License : BSD (3-clause)
 
+# The number of samples of the blocks of windows processed at once by stft
+_block_nelem = 2**20
+
+# The stopband attenuation in dB of the anti-aliasing filter of zoom_stft
+_zoom_atten = 80.
+
 def _check_winsize(binsize, overlap_factor=None, hopsize=None):
     """ Ensure all parameters for defining the windowing size of the signal aligns.
 
@@ -34,24 +42,94 @@ def _check_winsize(binsize, overlap_factor=None, hopsize=None):
     if overlap_factor is None and hopsize is None:
         raise ValueError("At least one of 'overlap_factor' or 'hopsize' has to have a value.")
 
-    overlap_factor = hopsize / binsize if overlap_factor is None else overlap_factor
+    overlap_factor = 1 - hopsize / binsize if overlap_factor is None else overlap_factor
     hopsize = int(binsize * (1 - overlap_factor)) if hopsize is None else hopsize
 
     if overlap_factor in [0, 1]:
         hopsize = 0 if overlap_factor else binsize
 
-    if np.abs(round(overlap_factor - hopsize / binsize, 3)) >= 5E-2:
+    if np.abs(round(overlap_factor - (1 - hopsize / binsize), 3)) >= 5E-2:
         raise ValueError("The 'overlap_factor' calculated from hopsize/binsize does not match the input.")
 
     return binsize, overlap_factor, hopsize
 
-def stft(x, binsize=1024, overlap_factor=.5, hopsize=None, window='hamming', **kwargs):
+def _get_padsize(binsize, hopsize):
+    """ The number of zeros padded at each end of the signal by stft.
+
+    Every sample of the signal is covered by binsize / hopsize windows, such that the
+    overlap-add adds up the same window-sum at the ends of the signal as in the middle.
+    """
+    return max(binsize // 2, binsize - hopsize)
+
+def _get_nwin(nsamp, binsize, hopsize):
+    """ The number of windows of stft for a signal of nsamp samples.
+    """
+    return (_get_padsize(binsize, hopsize) + nsamp - 1) // hopsize + 1
+
+def _get_geometry(n_samp, binsize, overlap_factor, hopsize):
+    """ The binsize, hopsize, number of windows and padsize of stft for a signal of n_samp samples.
+    """
+    if hopsize is not None:
+        # The hopsize takes precedence over the overlap_factor
+        binsize, overlap_factor, hopsize = _check_winsize(binsize, hopsize=hopsize)
+
+    if overlap_factor in [0, 1] and binsize != hopsize != n_samp:
+        binsize = n_samp
+        hopsize = 0 if overlap_factor else binsize
+    else:
+        hopsize = int(binsize * (1 - overlap_factor)) if hopsize is None else hopsize
+
+    if not hopsize:
+        # A single window over the whole signal
+        n_win, padsize, hopsize = 1, 0, binsize
+    elif not overlap_factor:
+        # Non-overlapping windows, the end may get truncated
+        n_win, padsize = int(n_samp / hopsize), 0
+    else:
+        n_win, padsize = _get_nwin(n_samp, binsize, hopsize), _get_padsize(binsize, hopsize)
+
+    return binsize, hopsize, n_win, padsize
+
+def _scaled_windowing(shape, win_, hopsize, padsize, n_samp, pad_mode, scale, offset):
+    """ The windowing of a block of frames starting at the frame m0, fused with the conversion
+    x * scale + offset to floats.
+
+    The zeros padded by the framing are raw samples, so their offset is removed for pad_mode='zero'.
+    The other pad modes repeat samples of the signal, which the conversion maps consistently.
+    """
+    lead = shape[:-1]
+    scale = np.ones(lead) if scale is None else np.broadcast_to(np.asarray(scale, dtype=np.float64), lead)
+    swin = scale[...,np.newaxis,np.newaxis] * win_
+
+    if offset is None:
+        return lambda frames, m0: np.multiply(frames, swin, dtype=np.float64)
+
+    owin = np.broadcast_to(np.asarray(offset, dtype=np.float64), lead)[...,np.newaxis,np.newaxis] * win_
+    binsize = win_.size
+
+    def _windowing(frames, m0):
+        Y = np.multiply(frames, swin, dtype=np.float64)
+
+        # The samples of the frames, and whether they are within the signal
+        start = (m0 + np.arange(frames.shape[-2])) * hopsize - padsize
+        if pad_mode == 'zero' and (start[0] < 0 or start[-1] + binsize > n_samp):
+            idx = start[:,np.newaxis] + np.arange(binsize)
+            Y += owin * ((idx >= 0) & (idx < n_samp))
+        else:
+            Y += owin
+        return Y
+
+    return _windowing
+
+def stft(x, binsize=1024, overlap_factor=.5, hopsize=None, window='hamming', pad_mode='zero',
+         scale=None, offset=None, windows=None, **kwargs):
     """ STFT, Short-Term Fourier Transform.
 
     Parameters:
     -----------
-    x: 2d-ndarray, (n_ch, n_samp)
-        Multi-channel signal.
+    x: ndarray, (..., n_ch, n_samp)
+        Multi-channel signal. Any leading dimensions (e.g. trials) are processed in the same
+        batched FFT.
 
     binsize: int
         Window size for processing FFT on.
@@ -65,61 +143,456 @@ def stft(x, binsize=1024, overlap_factor=.5, hopsize=None, window='hamming', **k
     window: str (default: 'hamming')
         The window used to create overlapping slices of the time domain signal.
 
+    pad_mode: str (default: 'zero')
+        The padding at the ends of the signal, 'zero', 'reflect' or 'edge'.
+
+    scale, offset: ndarray, (..., n_ch) (default: None)
+        The conversion of the samples to physical units, x * scale + offset, e.g. the gain of
+        each channel of an ADC for int16 samples. The conversion is applied to the frames along
+        with the window, so integer samples are never converted as a whole signal.
+
+    windows: ndarray of bool, (n_win,) (default: None)
+        The windows to compute, e.g. the ones clear of artifacts. The other windows are neither
+        windowed nor transformed, and their spectra are zero. Default: all the windows.
+
     kwargs:
         The key-word arguments for rfft.
 
     Return:
     -------
-    X: ndarray, (n_ch, n_win, binsize // 2)
+    X: ndarray, (..., n_ch, n_win, binsize // 2)
     """
     # Sanity check
     if not np.isrealobj(x):
         raise ValueError("x is not a real valued array.")
 
-    if x.ndim > 2:
-        raise ValueError("The dimension of the ndarray must be less than or equal to 2!")
-
     x = np.atleast_2d(x)
-    n_ch, n_samp = x.shape
+    n_samp = x.shape[-1]
+    n_ch = int(np.prod(x.shape[:-1]))
 
-    if hopsize is not None:
-        _overlap_factor = hopsize / binsize
-        if overlap_factor != _overlap_factor:
-            raise ValueError("The 'overlap_factor' calculated from hopsize/binsize does not match the input.")
+    binsize, hopsize, n_win, padsize = _get_geometry(n_samp, binsize, overlap_factor, hopsize)
 
-    if overlap_factor in [0, 1] and binsize != hopsize != n_samp:
-        binsize = n_samp
-        hopsize = 0 if overlap_factor else binsize
-    else:
-        hopsize = int(binsize * (1 - overlap_factor)) if hopsize is None else hopsize
+    # Process. The windows within the signal are views of x, only the windows overlapping
+    # with the padding are copied. The windowing and the FFT run over blocks of windows,
+    # so that the temporary arrays stay small.
+    win_ = get_window(window, binsize)
+    nblock = max(1, _block_nelem // (n_ch * binsize))
 
-    if hopsize:
-        n_win = n_samp / hopsize
-        n_win = int(n_win + 1) if overlap_factor else int(n_win)
-        length = hopsize
+    if scale is not None or offset is not None or not np.issubdtype(x.dtype, np.floating):
+        _windowing = _scaled_windowing(x.shape, win_, hopsize, padsize, n_samp, pad_mode, scale, offset)
     else:
-        n_win = 1
-        length = binsize
+        _windowing = lambda frames, m0: frames * win_
+
+    X = None
+    _alloc = np.empty if windows is None else np.zeros
+    for win_idx, frames in frame_segments(x, binsize, hopsize, padsize=padsize, nwin=n_win, mode=pad_mode):
+        runs = [(0, frames.shape[-2])] if windows is None else _mask_runs(windows[win_idx])
+        for a, b in runs:
+            for i in range(a, b, nblock):
+                X_ = fft.rfft(_windowing(frames[...,i:min(b, i+nblock),:], win_idx.start + i), **kwargs)
+                if X is None:
+                    X = _alloc(x.shape[:-1] + (n_win, X_.shape[-1]), dtype=X_.dtype)
+                X[...,win_idx.start+i:win_idx.start+i+X_.shape[-2],:] = X_
+
+    if X is None:
+        # None of the windows is computed
+        X = np.zeros(x.shape[:-1] + (n_win, binsize // 2 + 1), dtype=np.complex128)
 
-    if overlap_factor in [0,1]:
-        _x = np.zeros((n_ch, n_win * length))
-    else:
-        _x = np.zeros((n_ch, (n_win + 1) * length))
+    return X
 
-    _x[:,binsize//2:binsize//2+n_samp] = x
+def _zoom_decimation(sample_rate, fmin, fmax, binsize, hopsize, padsize):
+    """ The decimating factor of zoom_stft, and the taps of its anti-aliasing filter.
 
-    # Process
-    win_ = get_window(window, binsize)
-    frames = stride_tricks.as_strided(
-                            _x,
-                            shape=(n_ch, n_win, binsize),
-                            strides=(_x.strides[0], _x.strides[1]*hopsize, _x.strides[1])
-                        )
-    X = fft.rfft(frames * win_, **kwargs)
+    The band, widened by the main lobe of the window on each side, is shifted to DC. The signal is
+    then decimated by the largest factor that divides the binsize, the hopsize and the padsize, such
+    that the images of the band are at least its width away from it.
+    """
+    margin = 2 * sample_rate / binsize
+    width = fmax - fmin + 2 * margin
+
+    dmax = max(1, int(sample_rate // (2 * width)))
+    grid = np.gcd(np.gcd(binsize, hopsize), padsize) if padsize else np.gcd(binsize, hopsize)
+    decimate_by = max(d for d in range(1, min(dmax, grid) + 1) if grid % d == 0)
+    if decimate_by == 1:
+        return 1, None
+
+    # Linear phase, with a delay of a whole number of decimated samples
+    numtaps, beta = kaiserord(_zoom_atten, (sample_rate / decimate_by - width) / (sample_rate / 2))
+    ntaps_ = -(-(numtaps - 1) // (2 * decimate_by))
+    taps = firwin(2 * ntaps_ * decimate_by + 1, sample_rate / (2 * decimate_by), window=('kaiser', beta),
+                  fs=sample_rate)
+    return decimate_by, taps
+
+def _shift_decimate(x, shift, decimate_by, taps, scale=None, offset=None):
+    """ The signal multiplied by exp(-2j * pi * shift * n), low-passed and decimated, in blocks of samples.
+
+    The output sample m is centered on the input sample m * decimate_by. The signal is zero
+    beyond its ends. The shift is moved onto the taps, so the filter runs on the real signal
+    and only the decimated samples are shifted.
+    """
+    lead, n_samp = x.shape[:-1], x.shape[-1]
+    n_ch = int(np.prod(lead))
+    nz = -(-n_samp // decimate_by)
+
+    scale = None if scale is None else np.broadcast_to(np.asarray(scale, dtype=np.float64), lead)[...,np.newaxis]
+    offset = None if offset is None else np.broadcast_to(np.asarray(offset, dtype=np.float64), lead)[...,np.newaxis]
+
+    K = 0 if taps is None else (taps.size - 1) // (2 * decimate_by)
+    step = max(1, _block_nelem // (n_ch * decimate_by))
+
+    if taps is not None:
+        # z[m] = exp(-2j * pi * shift * m * D) * sum_k taps[k] * exp(-2j * pi * shift * (K * D - k)) * x[m * D + K * D - k]
+        taps = taps * np.exp(-2j * np.pi * shift * (K * decimate_by - np.arange(taps.size)))
+
+    z = np.empty(lead + (nz,), dtype=np.complex128)
+    for m0 in range(0, nz, step):
+        m1 = min(nz, m0 + step)
+
+        # The input samples of the block, with the zeros beyond the ends of the signal
+        lo = m0 * decimate_by - K * decimate_by
+        hi = lo + (m1 - m0 - 1) * decimate_by + 2 * K * decimate_by + 1
+        xb = np.zeros(lead + (hi - lo,), dtype=np.float64)
+        a, b = max(lo, 0), min(hi, n_samp)
+        if a < b:
+            xb[...,a-lo:b-lo] = x[...,a:b]
+            if scale is not None:
+                xb[...,a-lo:b-lo] *= scale
+            if offset is not None:
+                xb[...,a-lo:b-lo] += offset
+
+        if taps is None:
+            z[...,m0:m1] = xb * np.exp(-2j * np.pi * shift * np.arange(lo, hi))
+        else:
+            zr = upfirdn(taps.real, xb, down=decimate_by, axis=-1)[...,2*K:2*K+m1-m0]
+            zi = upfirdn(taps.imag, xb, down=decimate_by, axis=-1)[...,2*K:2*K+m1-m0]
+            z[...,m0:m1] = (zr + 1j * zi) * np.exp(-2j * np.pi * shift * decimate_by * np.arange(m0, m1))
+
+    return z
+
+def zoom_stft(x, fmin, fmax, nbins=None, sample_rate=1., binsize=1024, overlap_factor=.5, hopsize=None,
+              window='hamming', scale=None, offset=None, windows=None):
+    """ STFT evaluated only within the band [fmin, fmax].
+
+    The band is shifted to DC, the signal is low-passed and decimated (see _zoom_decimation) and the
+    frames of the decimated signal, of the same duration as the frames of stft, are evaluated at
+    the nbins frequencies with a batched chirp-z transform. The cost and the size of the output drop
+    with the fraction of the spectrum kept. The frames and the phases are the ones of stft, with
+    pad_mode='zero', up to the attenuation of the anti-aliasing filter (80 dB) for windows vanishing
+    at their ends (e.g. 'hann'); the ends of 'hamming' alias to about -60 dB.
+
+    Parameters:
+    -----------
+    x: ndarray, (..., n_ch, n_samp)
+        Multi-channel signal.
+
+    fmin, fmax: float
+        The band, in Hz.
+
+    nbins: int (default: None)
+        The number of frequencies, evenly spaced from fmin to fmax included. Default: the
+        resolution of stft, sample_rate / binsize.
+
+    sample_rate: float (default: 1.)
+        The sample rate of the signal.
+
+    scale, offset: ndarray, (..., n_ch) (default: None)
+        The conversion of the samples to physical units, x * scale + offset. See stft.
+
+    windows: ndarray of bool, (n_win,) (default: None)
+        The windows to evaluate. The other windows are zero. See stft.
+
+    See stft for the other parameters.
+
+    Return:
+    -------
+    X: ndarray, (..., n_ch, n_win, nbins)
+
+    freqs: ndarray, (nbins,)
+        The frequencies of X.
+    """
+    if not np.isrealobj(x):
+        raise ValueError("x is not a real valued array.")
+
+    if not 0 <= fmin < fmax <= sample_rate / 2:
+        raise ValueError("The band must be within 0 and the Nyquist rate. Given fmin={}, fmax={}".format(fmin, fmax))
+
+    x = np.atleast_2d(x)
+    n_samp = x.shape[-1]
+    n_ch = int(np.prod(x.shape[:-1]))
+
+    binsize, hopsize, n_win, padsize = _get_geometry(n_samp, binsize, overlap_factor, hopsize)
+    nbins = int(round((fmax - fmin) * binsize / sample_rate)) + 1 if nbins is None else nbins
+    freqs = np.linspace(fmin, fmax, nbins)
+
+    decimate_by, taps = _zoom_decimation(sample_rate, fmin, fmax, binsize, hopsize, padsize)
+    binsize_, hopsize_, padsize_ = binsize // decimate_by, hopsize // decimate_by, padsize // decimate_by
+
+    fc = (fmin + fmax) / 2.
+    z = _shift_decimate(x, fc / sample_rate, decimate_by, taps, scale=scale, offset=offset)
+
+    # The frequencies relative to fc, at the decimated rate
+    rate_ = sample_rate / decimate_by
+    czt = ZoomFFT(binsize_, [fmin - fc, fmax - fc] if nbins > 1 else [fmin - fc, fmin - fc + 1.],
+                  m=nbins, fs=rate_, endpoint=nbins > 1)
+    win_ = get_window(window, binsize)[::decimate_by] * decimate_by
+
+    # The phase of stft is relative to the start of each frame
+    starts = np.arange(n_win) * hopsize - padsize
+    phase = np.exp(2j * np.pi * fc / sample_rate * starts)[:,np.newaxis]
+
+    nblock = max(1, _block_nelem // (n_ch * binsize_))
+    X = (np.empty if windows is None else np.zeros)(x.shape[:-1] + (n_win, nbins), dtype=np.complex128)
+    for win_idx, frames in frame_segments(z, binsize_, hopsize_, padsize=padsize_, nwin=n_win):
+        runs = [(0, frames.shape[-2])] if windows is None else _mask_runs(windows[win_idx])
+        for a, b in runs:
+            for i in range(a, b, nblock):
+                m0 = win_idx.start + i
+                X_ = czt(frames[...,i:min(b, i+nblock),:] * win_, axis=-1)
+                X[...,m0:m0+X_.shape[-2],:] = X_ * phase[m0:m0+X_.shape[-2]]
+
+    return X, freqs
+
+def _multires_geometry(n_samp, binsizes, hopsizes):
+    """ The binsize, hopsize, number of windows and padsize of stft for each resolution.
+    """
+    return [_get_geometry(n_samp, binsize, None, hopsize) for binsize, hopsize in zip(binsizes, hopsizes)]
+
+def multires_stft(x, binsizes, hopsizes=None, window='hann', bins=None, scale=None, offset=None, **kwargs):
+    """ The STFT of the signal at several binsizes, from a single padded copy of the signal.
+
+    The signal is converted and padded with zeros once, by the largest padsize of the resolutions.
+    The frames of every resolution are strided views of this buffer, with the geometry of stft: the
+    frame m of the resolution i starts at the sample m * hopsizes[i] - padsize[i], and each
+    resolution has the windows and the spectra of stft (pad_mode='zero'). The windowing and the FFTs
+    run over blocks of frames.
+
+    Parameters:
+    -----------
+    x: ndarray, (..., n_ch, n_samp)
+        Multi-channel signal.
+
+    binsizes: list of int
+        The window size of each resolution.
+
+    hopsizes: list of int (default: None)
+        The hopsize of each resolution. Default: half of each binsize.
+
+    window: str (default: 'hann')
+        The window, scaled to each binsize.
+
+    bins: list of slice (default: None)
+        The bins of the FFT kept for each resolution, e.g. the bins of a frequency range. Default: all.
+
+    scale, offset: ndarray, (..., n_ch) (default: None)
+        The conversion of the samples to physical units, x * scale + offset. See stft.
+
+    kwargs:
+        The key-word arguments for rfft.
+
+    Return:
+    -------
+    X: list of ndarray, (..., n_ch, n_win[i], n_bins[i])
+        The spectra of each resolution, with the n_win[i] windows of stft.
+    """
+    if not np.isrealobj(x):
+        raise ValueError("x is not a real valued array.")
+
+    x = np.atleast_2d(x)
+    lead, n_samp = x.shape[:-1], x.shape[-1]
+    hopsizes = [b // 2 for b in binsizes] if hopsizes is None else hopsizes
+    bins = [slice(None)] * len(binsizes) if bins is None else bins
+    if min(hopsizes) < 1:
+        raise ValueError("The hopsizes must be positive. Given hopsizes={}".format(hopsizes))
+
+    geometry = _multires_geometry(n_samp, binsizes, hopsizes)
+
+    # The padded signal, shared by all the resolutions
+    l_pad = max(padsize for _, _, _, padsize in geometry)
+    r_pad = max(max(0, (n_win - 1) * hopsize - padsize + binsize - n_samp) for binsize, hopsize, n_win, padsize in geometry)
+    xp = np.zeros(lead + (l_pad + n_samp + r_pad,), dtype=np.float64)
+    xp[...,l_pad:l_pad+n_samp] = x
+    if scale is not None:
+        xp[...,l_pad:l_pad+n_samp] *= np.broadcast_to(np.asarray(scale, dtype=np.float64), lead)[...,np.newaxis]
+    if offset is not None:
+        xp[...,l_pad:l_pad+n_samp] += np.broadcast_to(np.asarray(offset, dtype=np.float64), lead)[...,np.newaxis]
+
+    n_ch = int(np.prod(lead))
+    X = []
+    for (binsize, hopsize, n_win, padsize), bins_ in zip(geometry, bins):
+        frames = _as_frames(xp[...,l_pad-padsize:], binsize, hopsize, n_win)
+        win_ = get_window(window, binsize)
+
+        nblock = max(1, _block_nelem // (n_ch * binsize))
+        X_ = None
+        for i in range(0, n_win, nblock):
+            Y = fft.rfft(frames[...,i:i+nblock,:] * win_, **kwargs)[...,bins_]
+            if X_ is None:
+                X_ = np.empty(lead + (n_win, Y.shape[-1]), dtype=Y.dtype)
+            X_[...,i:i+Y.shape[-2],:] = Y
+        X += [X_]
 
     return X
 
-def istft(X, nsamp=None, binsize=1024, overlap_factor=.5, hopsize=None):
+class STFT(object):
+    """ A reusable STFT of blocks of nch x nsamp samples, e.g. the chunks of a stream.
+
+    The geometry, the window, the padded buffer of the signal, the frames and the spectra are
+    set up once, along with the FFT plans (pyfftw.FFTW, or numpy.fft without pyfftw). A call of
+    forward copies the block into the padded buffer, applies the window into the input of the
+    plan and runs the FFT, without any allocation. The frames and the spectra are the ones of
+    stft (pad_mode='zero'), and inverse is the one of istft with the window.
+
+    The arrays returned by forward and inverse are buffers of the object, overwritten by the
+    next call: copy them to keep them.
+
+    Parameters:
+    -----------
+    nch: int (default: 1)
+        The number of channels.
+
+    nsamp: int (default: 1024)
+        The number of samples of the blocks.
+
+    binsize, overlap_factor, hopsize, window:
+        See stft.
+
+    dtype: numpy dtype (default: np.float64)
+        The precision of the transforms, np.float64 or np.float32. The spectra are complex of
+        the same precision.
+
+    scale, offset: ndarray, (nch,) (default: None)
+        The conversion of the blocks to physical units, x * scale + offset, e.g. for int16 samples.
+
+    planner_effort: str (default: 'FFTW_ESTIMATE')
+        The planner effort of pyfftw.
+
+    threads: int (default: 1)
+        The number of threads of the FFTs.
+    """
+    def __init__(self, nch=1, nsamp=1024, binsize=256, overlap_factor=.5, hopsize=None, window='hamming',
+                 dtype=np.float64, scale=None, offset=None, planner_effort='FFTW_ESTIMATE', threads=1):
+
+        self._nch = nch
+        self._nsamp = nsamp
+        self._binsize, self._hopsize, self._nwin, self._padsize = _get_geometry(nsamp, binsize, overlap_factor, hopsize)
+        self._window = window
+        self._win = get_window(window, self.binsize).astype(dtype)
+
+        self._scale = None if scale is None else np.asarray(scale, dtype=dtype).reshape(nch, 1)
+        self._offset = None if offset is None else np.asarray(offset, dtype=dtype).reshape(nch, 1)
+
+        ctype = np.result_type(dtype, np.complex64)
+        _empty = np.empty if pyfftw is None else pyfftw.empty_aligned
+        nbins = self.binsize // 2 + 1
+
+        # The padded signal, whose padding stays zero, and its frames as a view
+        length = (self.nwin - 1) * self.hopsize + self.binsize
+        self._padded = np.zeros((nch, max(length, self.padsize + nsamp)), dtype=dtype)
+        self._frames = _as_frames(self._padded, self.binsize, self.hopsize, self.nwin)
+        self._block = self._padded[:,self.padsize:self.padsize+nsamp]
+
+        self._in = _empty((nch, self.nwin, self.binsize), dtype=dtype)
+        self._spec = _empty((nch, self.nwin, nbins), dtype=ctype)
+        self._ispec = _empty((nch, self.nwin, nbins), dtype=ctype)
+        self._iframes = _empty((nch, self.nwin, self.binsize), dtype=dtype)
+        self._ola = np.zeros((nch, length), dtype=dtype)
+
+        if pyfftw is not None:
+            flags = (planner_effort,)
+            self._rfft = pyfftw.FFTW(self._in, self._spec, axes=(-1,), direction='FFTW_FORWARD',
+                                     flags=flags, threads=threads)
+            self._irfft = pyfftw.FFTW(self._ispec, self._iframes, axes=(-1,), direction='FFTW_BACKWARD',
+                                      flags=flags + ('FFTW_DESTROY_INPUT',), threads=threads)
+        else:
+            self._rfft = lambda: np.copyto(self._spec, np.fft.rfft(self._in, axis=-1), casting='unsafe')
+            self._irfft = lambda: np.copyto(self._iframes, np.fft.irfft(self._ispec, n=self.binsize, axis=-1),
+                                            casting='unsafe')
+
+    def forward(self, x):
+        """ The STFT of a block.
+
+        Parameters:
+        -----------
+        x: ndarray, (nch x nsamp)
+            The block. Integer types are converted with scale and offset.
+
+        Return:
+        -------
+        X: ndarray, (nch x nwin x binsize // 2 + 1)
+            A buffer of the object, overwritten by the next call.
+        """
+        if np.shape(x) != self._block.shape:
+            raise ValueError("The shape of x does not match! Given x.shape={}".format(np.shape(x)))
+
+        self._block[...] = x
+        if self._scale is not None:
+            self._block *= self._scale
+        if self._offset is not None:
+            self._block += self._offset
+
+        np.multiply(self._frames, self._win, out=self._in)
+        self._rfft()
+        return self._spec
+
+    def inverse(self, X):
+        """ The signal from its STFT, by overlap-add normalized by the window-sum. See istft.
+
+        Parameters:
+        -----------
+        X: ndarray, (nch x nwin x binsize // 2 + 1)
+
+        Return:
+        -------
+        x: ndarray, (nch x nsamp)
+            A buffer of the object, overwritten by the next call.
+        """
+        self._ispec[...] = X
+        self._irfft()
+
+        self._ola.fill(0)
+        hop, binsize = self.hopsize, self.binsize
+        if binsize % hop == 0:
+            # The frames added hop by hop, see overlap_add
+            ratio = binsize // hop
+            ola = self._ola.reshape(self.nch, self.nwin + ratio - 1, hop)
+            for r in range(ratio):
+                ola[:,r:r+self.nwin,:] += self._iframes[:,:,r*hop:(r+1)*hop]
+        else:
+            for m in range(self.nwin):
+                self._ola[:,m*hop:m*hop+binsize] += self._iframes[:,m,:]
+
+        self._ola /= np.sum(self._win) / hop
+        return self._ola[:,self.padsize:self.padsize+self.nsamp]
+
+    @property
+    def nch(self):
+        return self._nch
+
+    @property
+    def nsamp(self):
+        return self._nsamp
+
+    @property
+    def binsize(self):
+        return self._binsize
+
+    @property
+    def hopsize(self):
+        return self._hopsize
+
+    @property
+    def nwin(self):
+        return self._nwin
+
+    @property
+    def padsize(self):
+        return self._padsize
+
+    @property
+    def window(self):
+        return self._window
+
+def istft(X, nsamp=None, binsize=1024, overlap_factor=.5, hopsize=None, window=None):
     """ Inverse STFT.
 
     Parameters:
@@ -135,6 +608,10 @@ def istft(X, nsamp=None, binsize=1024, overlap_factor=.5, hopsize=None):
     hopsize: int
         The sample size required to jump to the next row.
 
+    window: str (default: None)
+        The window used by stft. If given, the output is normalized by the window-sum of the
+        overlap-add.
+
     Return:
     -------
     x: ndarray, (n_ch, n_fr, n_samp)
@@ -149,16 +626,18 @@ def istft(X, nsamp=None, binsize=1024, overlap_factor=.5, hopsize=None):
     if (X.shape[-1]-1)*2 != binsize:
         raise ValueError("The 'binsize' must match the length of X.shape[-1].")
 
-    hopsize = binsize * (1 - overlap_factor) if hopsize is None else hopsize
+    hopsize = int(binsize * (1 - overlap_factor)) if hopsize is None else hopsize
+    win_ = get_window(window, binsize) if window is not None else None
 
     # Process
     x_ = fft.irfft(X, n=binsize, axis=-1, planner_effort='FFTW_ESTIMATE')
 
     # Reconstructing the signal using overlap-add
-    x = overlap_add(x_, binsize=binsize, overlap_factor=overlap_factor)
+    x = overlap_add(x_, binsize=binsize, hopsize=hopsize, window=win_)
 
     # Clean up the signal
     if nsamp is not None:
-        x = x[:,:,binsize//2:nsamp+binsize//2]
+        padsize = _get_padsize(binsize, hopsize)
+        x = x[:,:,padsize:nsamp+padsize]
 
     return x
@@ -0,0 +1,179 @@
+from __future__ import division
+""" Morlet wavelet transform in the frequency domain.
+
+The signal goes through a single forward FFT. Each wavelet is a Gaussian in the frequency domain,
+which is truncated to its effective support, so that only the bins of the support are multiplied
+and inverse transformed, as the bands of the FilterBank. The bins of the support are placed at
+their index modulo the length of the inverse FFT: with a shorter inverse FFT, the output is
+decimated without aliasing, since the spectrum is zero outside of the support.
+"""
+# Authors : David C.C. Lu <davidlu89@gmail.com>
+#
+# License : BSD (3-clause)
+from collections import OrderedDict
+
+import numpy as np
+from scipy.fftpack import next_fast_len
+
+try:
+    import pyfftw.interfaces.numpy_fft as fft
+except ImportError:
+    import numpy.fft as fft
+
+# The truncation of the Gaussians, in standard deviations
+_nstd = 5.
+
+# The wavelet spectra of the last calls, see _morlet_bank()
+_cache = OrderedDict()
+_cache_size = 8
+
+def _check_freqs(freqs, n_cycles, sample_rate):
+    freqs = np.atleast_1d(np.asarray(freqs, dtype=np.float64))
+    if freqs.ndim != 1:
+        raise ValueError("'freqs' must be a 1d array of frequencies.")
+
+    if np.any(freqs <= 0) or np.any(freqs >= sample_rate / 2.):
+        raise ValueError("The frequencies must be between 0 and the Nyquist rate.")
+
+    n_cycles = np.broadcast_to(np.asarray(n_cycles, dtype=np.float64), freqs.shape)
+    return freqs, n_cycles
+
+def _morlet_bank(nsamp, sample_rate, freqs, n_cycles, decimate):
+    """ The spectra of the wavelets, truncated to their support, for a signal of nsamp samples.
+
+    The results are cached per (nsamp, sample_rate, freqs, n_cycles, decimate).
+
+    Return:
+    -------
+    nfft: int
+        The length of the FFT of the signal, padded by the longest half-support in time.
+
+    groups: list of (fidx, decimate_by, idx, pos, values)
+        The wavelets sharing the same decimating factor: their indices in freqs, the factor, and
+        the bins (nfreqs_ x width) of their supports, the positions of the bins in the inverse
+        FFT of nfft // decimate_by, and the values of the spectra (zero beyond each support).
+    """
+    key = (nsamp, float(sample_rate), freqs.tobytes(), n_cycles.tobytes(), decimate)
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key]
+
+    sigma_f = freqs / n_cycles
+    sigma_t = 1. / (2 * np.pi * sigma_f)
+
+    # The zero padding takes the wrap-around of the circular convolution
+    nfft_ = nsamp + int(np.ceil(_nstd * sigma_t.max() * sample_rate))
+
+    lo = np.maximum(np.ceil((freqs - _nstd * sigma_f) * nfft_ / sample_rate), 0)
+    hi = np.floor((freqs + _nstd * sigma_f) * nfft_ / sample_rate)
+    width_ = (hi - lo + 1).astype(np.int64)
+
+    # The largest decimating factor, a power of 2 dividing nfft
+    dmax = 1
+    if decimate:
+        while nfft_ // (2 * dmax) >= width_.min():
+            dmax *= 2
+    nfft = dmax * next_fast_len(-(-nfft_ // dmax))
+
+    df = sample_rate / nfft
+    lo = np.maximum(np.ceil((freqs - _nstd * sigma_f) / df), 0).astype(np.int64)
+    hi = np.minimum(np.floor((freqs + _nstd * sigma_f) / df), nfft // 2).astype(np.int64)
+    width = hi - lo + 1
+
+    steps = np.ones(freqs.size, dtype=np.int64)
+    if decimate:
+        while True:
+            grow = (2 * steps <= dmax) & (nfft // (2 * steps) >= width)
+            if not np.any(grow):
+                break
+            steps[grow] *= 2
+
+    groups = []
+    for step in np.unique(steps):
+        fidx = np.where(steps == step)[0]
+        w = width[fidx].max()
+
+        k = lo[fidx,np.newaxis] + np.arange(w)
+        valid = k <= hi[fidx,np.newaxis]
+        pos = k % (nfft // step)
+        idx = np.minimum(k, nfft // 2)
+
+        # Peak of 2: the magnitude of a sinusoid at f is its amplitude. 1 / step: the shorter inverse FFT.
+        f = k * df
+        values = 2. / step * np.exp(-(f - freqs[fidx,np.newaxis])**2 / (2 * sigma_f[fidx,np.newaxis]**2)) * valid
+
+        groups += [(fidx, int(step), idx, pos, values)]
+
+    _cache[key] = (nfft, groups)
+    if len(_cache) > _cache_size:
+        _cache.popitem(last=False)
+
+    return _cache[key]
+
+def cwt_morlet(x, freqs, sample_rate, n_cycles=7., decimate=False, dtype=np.complex128):
+    """ The complex Morlet wavelet transform of each channel.
+
+    The wavelet of frequency f has a Gaussian envelope of standard deviation n_cycles / (2 pi f) in
+    time, i.e. f / n_cycles in frequency. Its spectrum has a peak of 2, such that the magnitude of the
+    output is the amplitude of a sinusoid at f, and the angle its phase.
+
+    Parameters:
+    -----------
+    x: ndarray, (... x nch x nsamp)
+        The signal. Any leading dimensions (e.g. trials) are processed in one pass.
+
+    freqs: ndarray, (nfreqs,)
+        The frequencies of the wavelets.
+
+    sample_rate: float
+        The sample rate of the signal.
+
+    n_cycles: float or ndarray, (nfreqs,) (default: 7.)
+        The number of cycles of each wavelet.
+
+    decimate: bool (default: False)
+        If True, the output of each frequency is decimated by the largest power of 2 that its
+        bandwidth allows, which saves memory and the time of the inverse FFTs.
+
+    dtype: numpy dtype (default: np.complex128)
+        The type of the output.
+
+    Return:
+    -------
+    W: ndarray, (... x nch x nfreqs x nsamp)
+        If decimate is True, a list over the frequencies of (... x nch x nsamp // decimate_by[i]) ndarrays.
+
+    decimate_by: ndarray, (nfreqs,)
+        Only if decimate is True. The decimating factor of each frequency: W[i][..., m] is at the
+        sample m * decimate_by[i].
+    """
+    x = np.asarray(x)
+    nsamp = x.shape[-1]
+    freqs, n_cycles = _check_freqs(freqs, n_cycles, sample_rate)
+
+    nfft, groups = _morlet_bank(nsamp, sample_rate, freqs, n_cycles, decimate)
+
+    X = fft.rfft(x, n=nfft, axis=-1)
+
+    W = np.empty(x.shape[:-1] + (freqs.size, nsamp), dtype=dtype) if not decimate else [None] * freqs.size
+    decimate_by = np.ones(freqs.size, dtype=np.int64)
+    for fidx, step, idx, pos, values in groups:
+        n = nfft // step
+        rows = np.arange(fidx.size)[:,np.newaxis]
+
+        # The bins of the supports, (... x nch x nfreqs_ x width), placed into the inverse FFTs
+        Y = np.zeros(x.shape[:-1] + (fidx.size, n), dtype=np.complex128)
+        Y[...,rows,pos] = X[...,idx] * values
+
+        y = fft.ifft(Y, axis=-1)[...,:-(-nsamp // step)]
+        if not decimate:
+            W[...,fidx,:] = y
+            continue
+
+        for i, ix in enumerate(fidx):
+            W[ix] = y[...,i,:].astype(dtype)
+        decimate_by[fidx] = step
+
+    if decimate:
+        return W, decimate_by
+    return W
@@ -0,0 +1,209 @@
+from __future__ import division
+""" Selection of the parameters of the FilterBank for the local machine.
+
+Example:
+--------
+    tuning = autotune(nch=64, nsamp=2**14, sample_rate=1000, freq_bands=fois,
+                      latency_budget=.5, filename='filterbank_tuning.json')
+    bank = FilterBank.from_tuning('filterbank_tuning.json')
+"""
+# Authors : David C.C. Lu <davidlu89@gmail.com>
+#
+# License : BSD (3-clause)
+import json
+import time
+import platform
+import multiprocessing as mp
+
+import numpy as np
+
+try:
+    import pyfftw
+    _planner_efforts = ['FFTW_ESTIMATE', 'FFTW_MEASURE']
+except ImportError:
+    _planner_efforts = ['FFTW_ESTIMATE']
+
+from .filter.filterbank import (FilterBank, _factor)
+
+def check_frequency_resolution(binsize, sample_rate, freq_bands, decimate_by=1):
+    """ Check that the bands can be shifted by the FilterBank with the given binsize.
+
+    These are the conditions for the indices of FilterBank._get_indices_for_frequency_shifts: each
+    band spans at least one bin, and the bins of the bands fall within the (decimated) spectrum.
+    The bands must have the same width, as for the FilterBank: a ValueError is raised otherwise.
+
+    Return:
+    -------
+    reason: str or None
+        Why the binsize is not valid, or None if it is valid.
+    """
+    cf, bw, _ = FilterBank.get_all_frequencies(fois=np.asarray(freq_bands, dtype=np.float64))
+
+    interval_per_hz = binsize / sample_rate
+    width = int((bw * _factor) * 2 * interval_per_hz)
+    l_width = int(interval_per_hz * bw * _factor)
+    if width < 1:
+        return "The bandwidth spans less than one bin."
+
+    cf_ix = np.asarray(np.ravel(cf) * interval_per_hz, dtype=np.int32)
+    if cf_ix.min() - l_width < 0:
+        return "The lowest band extends below DC."
+
+    if cf_ix.max() - l_width + width > (binsize // decimate_by) // 2:
+        return "The highest band extends beyond the Nyquist rate of the output."
+
+    return None
+
+def _candidate_nprocs():
+    nprocs, n = [1], 2
+    while n <= mp.cpu_count():
+        nprocs += [n]
+        n *= 2
+    return nprocs
+
+def _benchmark(params, x, repeat):
+    """ The minimum time of analysis over the repeats, after a warm-up call.
+    """
+    bank = FilterBank(**params)
+    try:
+        bank.analysis(x)
+        elapsed = []
+        for _ in range(repeat):
+            t0 = time.time()
+            bank.analysis(x)
+            elapsed += [time.time() - t0]
+    finally:
+        bank.kill()
+
+    return min(elapsed)
+
+def autotune(nch, nsamp, sample_rate, freq_bands, latency_budget=None, binsizes=None, nprocs=None,
+             planner_efforts=None, order=None, repeat=3, filename=None, verbose=False, **kwargs):
+    """ Benchmark FilterBank configurations on this machine and pick the fastest one.
+
+    The candidates are all the combinations of binsizes, number of processes (1 runs serially,
+    more runs the Parallel backend) and FFT planner efforts. The binsizes that do not resolve the
+    bands (see check_frequency_resolution) or that are shorter than the filter order are skipped.
+
+    Parameters:
+    -----------
+    nch, nsamp: int
+        The number of channels and the number of samples of each call of analysis.
+
+    sample_rate: int
+        The sample rate of the signal.
+
+    freq_bands: ndarray, (nfreqs x 2)
+        The frequency bands of interest.
+
+    latency_budget: float (default: None)
+        The largest latency in seconds, i.e. the length of the window (binsize / sample_rate)
+        plus the time of a call of analysis. If None, the latency is not constrained.
+
+    binsizes: list of int (default: None)
+        The candidate binsizes. Default: the powers of 2 from 2**7 to 2**15.
+
+    nprocs: list of int (default: None)
+        The candidate numbers of processes. Default: 1, 2, 4, ... up to the number of cores.
+
+    planner_efforts: list of str (default: None)
+        The candidate planner efforts. Default: 'FFTW_ESTIMATE', and 'FFTW_MEASURE' with pyfftw.
+
+    order: int (default: None)
+        The order of the prototype filter, the same for all the candidates. Default: half of
+        the smallest valid binsize.
+
+    repeat: int (default: 3)
+        The number of timed calls of each candidate.
+
+    filename: str (default: None)
+        If given, the result is saved into this JSON file. See load_tuning.
+
+    kwargs:
+        The other parameters of FilterBank, e.g. hilbert, overlap_factor or decimate_by.
+
+    Return:
+    -------
+    tuning: dict
+        'params': the parameters of the fastest FilterBank, see FilterBank.from_tuning.
+        'time': its time per call of analysis in seconds.
+        'latency': its latency in seconds.
+        'candidates': the parameters, the time and the latency of all the candidates, or
+            the reason why they were skipped.
+        'host': the name of the machine.
+    """
+    binsizes = [2**n for n in range(7, 16)] if binsizes is None else binsizes
+    nprocs = _candidate_nprocs() if nprocs is None else nprocs
+    planner_efforts = _planner_efforts if planner_efforts is None else planner_efforts
+
+    freq_bands = np.asarray(freq_bands, dtype=np.float64)
+    decimate_by = kwargs.get('decimate_by', 1)
+
+    candidates = []
+    valid = []
+    for binsize in binsizes:
+        reason = check_frequency_resolution(binsize, sample_rate, freq_bands, decimate_by=decimate_by)
+        if reason is None and binsize > nsamp:
+            reason = "The binsize is longer than the number of samples."
+        if reason is None and order is not None and order > binsize:
+            reason = "The binsize is shorter than the filter order."
+        if reason is not None:
+            candidates += [{'binsize': binsize, 'skipped': reason}]
+        else:
+            valid += [binsize]
+
+    if not valid:
+        raise ValueError("None of the binsizes resolves the frequency bands.")
+
+    order = valid[0] // 2 if order is None else order
+
+    x = np.random.randn(nch, nsamp)
+    best = None
+    for binsize in valid:
+        for n in nprocs:
+            for effort in planner_efforts:
+                params = dict(kwargs, nch=nch, nsamp=nsamp, sample_rate=sample_rate, freq_bands=freq_bands,
+                              binsize=binsize, order=order, nprocs=n, mprocs=n > 1, planner_effort=effort)
+                candidate = {'binsize': binsize, 'nprocs': n, 'planner_effort': effort}
+
+                try:
+                    elapsed = _benchmark(params, x, repeat)
+                except ValueError as error:
+                    candidates += [dict(candidate, skipped=str(error))]
+                    continue
+
+                latency = binsize / sample_rate + elapsed
+                candidate.update({'time': elapsed, 'latency': latency})
+                if latency_budget is not None and latency > latency_budget:
+                    candidate['skipped'] = "The latency exceeds the budget."
+                elif best is None or elapsed < best[1]['time']:
+                    best = (params, candidate)
+                candidates += [candidate]
+
+                if verbose:
+                    print(candidate)
+
+    if best is None:
+        raise ValueError("No configuration meets the latency budget of {} s.".format(latency_budget))
+
+    params, candidate = best
+    params = dict(params, freq_bands=freq_bands.tolist())
+    tuning = {'params': params, 'time': candidate['time'], 'latency': candidate['latency'],
+              'candidates': candidates, 'host': platform.node()}
+
+    if filename is not None:
+        save_tuning(tuning, filename)
+
+    return tuning
+
+def save_tuning(tuning, filename):
+    """ Save the result of autotune into a JSON file.
+    """
+    with open(filename, 'w') as f:
+        json.dump(tuning, f, indent=2)
+
+def load_tuning(filename):
+    """ Load the result of autotune from a JSON file.
+    """
+    with open(filename, 'r') as f:
+        return json.load(f)
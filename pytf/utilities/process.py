@@ -31,7 +31,7 @@ class Serial(object):
     def __init__(self, func, *args, **kwargs):
 
         self.f_name = func.__name__
-        self.function[self.f_name] = func
+        self.function = {self.f_name: func} # per instance, as several objects may wrap methods of the same name
         self.kwargs = kwargs
 
         self.del_opt = None
@@ -56,7 +56,7 @@ class Parallel(object):
         self.nprocs = nprocs
         self.kwargs = kwargs
         self.f_name = func.__name__
-        self.function[self.f_name] = func
+        self.function = {self.f_name: func}
 
         self.axis = axis
 
@@ -135,9 +135,9 @@ class Parallel(object):
 
         out_idx = [slice(None)] * len(self.out_shape)
         out_idx[self.axis] = self.slices[proc_i]
-        tmp2 = in2[idx_]
-        tmp3 = in3[idx_]
-        tmp4 = in4[idx_]
+        tmp2 = in2[tuple(idx_)]
+        tmp3 = in3[tuple(idx_)]
+        tmp4 = in4[tuple(idx_)]
         tmp1 = in1
 
         while in_counter.value() >= 0:
@@ -145,7 +145,7 @@ class Parallel(object):
                 time.sleep(0.001)
 
             if in_counter.value() >= 0:
-                out[out_idx] = self.function[self.f_name](tmp1, tmp2, tmp3, tmp4, slices_idx=out_idx, **kwargs)
+                out[tuple(out_idx)] = self.function[self.f_name](tmp1, tmp2, tmp3, tmp4, slices_idx=out_idx, **kwargs)
                 out_counter.increment()
 
     def result(self, *args, **kwargs):
@@ -0,0 +1,282 @@
+from __future__ import division
+""" A ring buffer in shared memory for publishing blocks of arrays (e.g. the outputs of
+FilterBank.analysis) to other processes.
+
+The producer copies each block once into a slot of the ring, and the consumers read the slots
+as numpy views of the shared memory, without pickling or copying. Each block gets a sequence
+number. A consumer that falls more than 'nslots' blocks behind detects the overrun.
+
+Example:
+--------
+    # Producer
+    pub = RingPublisher('pytf_bank', shape=(nch, nfreqs, nsamp), dtype=np.complex64, nslots=16)
+    pub.publish(bank.analysis(x))
+
+    # Consumer, in another process
+    sub = RingSubscriber('pytf_bank')
+    seq, y = sub.get(timeout=1.)
+    ...                                 # use the view y
+    if not sub.valid(seq):              # the slot was overwritten while in use
+        ...
+    del y                               # the views must be dropped before sub.close()
+
+Requires Python 3.8 or later (multiprocessing.shared_memory).
+"""
+# Authors : David C.C. Lu <davidlu89@gmail.com>
+#
+# License : BSD (3-clause)
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from . import share_utilities as sh
+
+# Header layout: int64 fields, then the dtype string, then (seq, length) of each slot.
+_NFIELDS = 16
+_MAXDIM = 8
+_SEQ, _NSLOTS, _NDIM, _SHAPE = 0, 1, 2, 3
+_DTYPE_OFFSET = _NFIELDS * 8
+_DTYPE_SIZE = 32
+_SLOTS_OFFSET = _DTYPE_OFFSET + _DTYPE_SIZE
+_ALIGN = 64
+
+# The names of the shared memory created by the publishers of this process
+_published = set()
+
+def _data_offset(nslots):
+    n = _SLOTS_OFFSET + nslots * 2 * 8
+    return -(-n // _ALIGN) * _ALIGN
+
+class BufferOverrun(RuntimeError):
+    """ Raised by RingSubscriber when blocks were overwritten before being read.
+    """
+    def __init__(self, missed):
+        super(BufferOverrun, self).__init__("{} blocks were overwritten before being read.".format(missed))
+        self.missed = missed
+
+class _RingBuffer(object):
+
+    def _map(self):
+        buf = self._shm.buf
+        self._fields = sh.shared_memory_to_np(buf, (_NFIELDS,), dtype=np.int64)
+        nslots = int(self._fields[_NSLOTS])
+        self._slots = sh.shared_memory_to_np(buf, (nslots, 2), dtype=np.int64, offset=_SLOTS_OFFSET)
+        self._data = sh.shared_memory_to_np(buf, (nslots,) + self.shape, dtype=self.dtype,
+                                            offset=_data_offset(nslots))
+
+    def close(self):
+        """ Release the shared memory.
+
+        The views returned by get() keep the shared memory mapped, so they must be dropped (del)
+        before closing. Otherwise BufferError is raised, the views stay usable and close() can be
+        called again once they are dropped.
+        """
+        # The internal arrays export the buffer as well
+        self._fields = self._slots = self._data = None
+        try:
+            self._shm.close()
+        except BufferError:
+            raise BufferError("The views of the blocks must be dropped before closing the ring buffer.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    @property
+    def nslots(self):
+        return int(self._fields[_NSLOTS])
+
+    @property
+    def shape(self):
+        return self._shape
+
+    @property
+    def dtype(self):
+        return self._dtype
+
+    @property
+    def seq(self):
+        """ The sequence number of the next block to be published.
+        """
+        return int(self._fields[_SEQ])
+
+class RingPublisher(_RingBuffer):
+    """ The producer side of the ring buffer. It creates the shared memory.
+
+    Parameters:
+    -----------
+    name: str (default: None)
+        The name of the shared memory, used by the subscribers. If None, a name is generated (see name).
+
+    shape: tuple
+        The largest shape of the blocks, e.g. (nch, nfreqs, nsamp). The blocks may be shorter along
+        the last axis.
+
+    dtype: numpy dtype (default: np.float32)
+        The type of the blocks.
+
+    nslots: int (default: 16)
+        The number of blocks kept in the ring.
+    """
+    def __init__(self, name=None, shape=None, dtype=np.float32, nslots=16):
+
+        shape = tuple(int(n) for n in shape)
+        if len(shape) > _MAXDIM:
+            raise ValueError("The blocks have at most {} dimensions. Given shape={}".format(_MAXDIM, shape))
+
+        self._shape = shape
+        self._dtype = np.dtype(dtype)
+
+        nbytes = _data_offset(nslots) + nslots * int(np.prod(shape)) * self._dtype.itemsize
+        self._shm = shared_memory.SharedMemory(name=name, create=True, size=nbytes)
+        _published.add(self._shm.name)
+
+        fields = sh.shared_memory_to_np(self._shm.buf, (_NFIELDS,), dtype=np.int64)
+        fields[:] = 0
+        fields[_NSLOTS] = nslots
+        fields[_NDIM] = len(shape)
+        fields[_SHAPE:_SHAPE+len(shape)] = shape
+
+        dtype_str = self._dtype.str.encode('ascii')
+        self._shm.buf[_DTYPE_OFFSET:_DTYPE_OFFSET+_DTYPE_SIZE] = dtype_str.ljust(_DTYPE_SIZE, b'\0')
+
+        self._map()
+        self._slots[:] = -1
+
+    def publish(self, x):
+        """ Copy a block into the next slot and publish it.
+
+        Parameters:
+        -----------
+        x: ndarray
+            The block, of the shape of the ring buffer, or shorter along the last axis.
+
+        Return:
+        -------
+        seq: int
+            The sequence number of the block.
+        """
+        x = np.asarray(x)
+        if x.shape[:-1] != self.shape[:-1] or x.shape[-1] > self.shape[-1]:
+            raise ValueError("The shape of the block does not fit the buffer! Given x.shape={}".format(x.shape))
+
+        seq = self.seq
+        slot = seq % self.nslots
+
+        # The slot is marked as being written, such that the readers can tell a torn read.
+        self._slots[slot, 0] = -1
+        self._data[slot, ..., :x.shape[-1]] = x
+        self._slots[slot, 1] = x.shape[-1]
+        self._slots[slot, 0] = seq
+        self._fields[_SEQ] = seq + 1
+
+        return seq
+
+    def unlink(self):
+        """ Remove the shared memory, once the publisher and the subscribers are closed.
+        """
+        self._shm.unlink()
+        _published.discard(self._shm.name)
+
+class RingSubscriber(_RingBuffer):
+    """ The consumer side of the ring buffer. Any number of subscribers can attach to a publisher.
+
+    Parameters:
+    -----------
+    name: str
+        The name of the shared memory of the publisher.
+
+    start: str (default: 'latest')
+        'latest' to start from the next block published, 'oldest' from the oldest block in the ring.
+    """
+    def __init__(self, name, start='latest'):
+
+        if start not in ['latest', 'oldest']:
+            raise ValueError("'start' must be either 'latest' or 'oldest'! Given start={}".format(start))
+
+        self._shm = shared_memory.SharedMemory(name=name, create=False)
+        if self._shm.name not in _published:
+            _untrack(self._shm)
+
+        fields = sh.shared_memory_to_np(self._shm.buf, (_NFIELDS,), dtype=np.int64)
+        self._shape = tuple(int(n) for n in fields[_SHAPE:_SHAPE+int(fields[_NDIM])])
+        dtype_str = bytes(self._shm.buf[_DTYPE_OFFSET:_DTYPE_OFFSET+_DTYPE_SIZE]).rstrip(b'\0')
+        self._dtype = np.dtype(dtype_str.decode('ascii'))
+        del fields
+
+        self._map()
+        self._next = self.seq if start == 'latest' else max(0, self.seq - self.nslots)
+
+    def poll(self):
+        """ The number of blocks published and not read yet.
+        """
+        return self.seq - self._next
+
+    def get(self, timeout=None):
+        """ The next block.
+
+        Parameters:
+        -----------
+        timeout: float (default: None)
+            The time in seconds to wait for a new block. If None, wait forever. If 0, do not wait.
+
+        Return:
+        -------
+        seq: int
+            The sequence number of the block.
+
+        x: ndarray
+            A read-only view of the block in the shared memory. It stays valid until the publisher
+            wraps around the ring, see valid(seq).
+
+        Raise:
+        ------
+        BufferOverrun: if the blocks between the last one read and the oldest one in the ring were
+            overwritten. The subscriber then skips to the oldest block.
+
+        TimeoutError: if no block is published within the timeout.
+        """
+        t0 = time.time()
+        while self.seq <= self._next:
+            if timeout is not None and time.time() - t0 >= timeout:
+                raise TimeoutError("No block was published within {} s.".format(timeout))
+            time.sleep(0.001)
+
+        missed = self.seq - self.nslots - self._next
+        if missed > 0:
+            self._next += missed
+            raise BufferOverrun(missed)
+
+        seq = self._next
+        slot = seq % self.nslots
+        if self._slots[slot, 0] != seq:
+            # Overwritten since seq was read
+            self._next += 1
+            raise BufferOverrun(1)
+
+        x = self._data[slot, ..., :int(self._slots[slot, 1])]
+        x.flags.writeable = False
+        self._next += 1
+
+        return seq, x
+
+    def valid(self, seq):
+        """ Whether the view of the block seq is still intact, i.e. its slot was not reused by the publisher.
+        """
+        return int(self._slots[seq % self.nslots, 0]) == seq
+
+def _untrack(shm):
+    """ The subscribers do not own the shared memory, which must not be removed when they exit.
+    """
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except (ImportError, AttributeError, KeyError):
+        pass
@@ -20,3 +20,14 @@ def shared_ndarray_base(shape, dtype=np.float32):
         mysize *= 2
     shared_ndarray_base = mp.Array(ctypes.c_float, mysize)
     return shared_ndarray_base
+
+def shared_memory_to_np(buf, shape, dtype=np.float32, offset=0):
+    """
+    A numpy array on a buffer of shared memory (e.g. multiprocessing.shared_memory.SharedMemory.buf),
+    without copying.
+
+    The array (and any view of it) holds an export of the buffer, so the shared memory cannot be
+    closed under it: SharedMemory.close() raises BufferError instead of unmapping live memory.
+    """
+    count = int(np.prod(shape))
+    return np.frombuffer(buf, dtype=dtype, count=count, offset=offset).reshape(shape)
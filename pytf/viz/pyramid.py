@@ -0,0 +1,280 @@
+from __future__ import division
+""" A multi-resolution pyramid of a spectrogram, for zoomable display of long recordings.
+
+Level 0 is the power of the spectrogram. Each following level pools the previous one by
+'factor' along time, and along frequency while it has more than 'min_size' bins, with either
+the maximum (which keeps short transients visible) or the mean. Displaying a time-frequency
+window picks the coarsest level that still has at least one bin per pixel, so the amount of
+data read and drawn only depends on the size of the figure, not on the length of the recording.
+"""
+# Authors : David C.C. Lu <davidlu89@gmail.com>
+#
+# License : BSD (3-clause)
+import os
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from ..time_frequency.stft import _get_padsize
+
+# The number of rows (windows) pooled at a time when building the levels
+_block_rows = 2**14
+
+def _pool(x, factor, axis, pool):
+    """ Pool x by blocks of 'factor' along the axis. The last block may be shorter.
+    """
+    if factor == 1:
+        return x
+
+    n = x.shape[axis]
+    idx = np.arange(0, n, factor)
+    if pool == 'max':
+        return np.maximum.reduceat(x, idx, axis=axis)
+
+    shape = [1] * x.ndim
+    shape[axis] = -1
+    counts = np.diff(np.append(idx, n)).reshape(shape)
+    return np.add.reduceat(x, idx, axis=axis, dtype=np.float64) / counts
+
+class SpectrogramPyramid(object):
+    """ Create the pyramid of a single channel spectrogram.
+
+    Parameters:
+    -----------
+    spectra: ndarray, (nwin x nfreqs)
+        The output of stft for one channel. If complex, the power |X|**2 is used, otherwise
+        spectra is taken as the power. It can be a memory-mapped array.
+
+    sample_rate: int
+        The sample rate of the signal.
+
+    binsize: int
+        The window size of stft.
+
+    hopsize: int (default: None)
+        The hopsize of stft. Default: binsize // 2.
+
+    freqs: ndarray (default: None)
+        The evenly spaced frequencies of the spectra, e.g. of a band from zoom_stft. Default: the bins of stft.
+
+    pool: str (default: 'max')
+        The pooling of the levels, either 'max' or 'mean'.
+
+    factor: int (default: 2)
+        The pooling factor between consecutive levels.
+
+    min_size: int (default: 256)
+        The levels are built until both dimensions are at most min_size.
+
+    dirname: str (default: None)
+        If given, the levels are stored as memory-mapped .npy files in the directory,
+        otherwise they are kept in memory.
+    """
+    def __init__(self, spectra, sample_rate, binsize, hopsize=None, freqs=None, pool='max', factor=2,
+                 min_size=256, dirname=None):
+
+        if pool not in ['max', 'mean']:
+            raise ValueError("'pool' must be either 'max' or 'mean'! Given pool={}".format(pool))
+
+        if factor < 2:
+            raise ValueError("'factor' must be at least 2. Given factor={}".format(factor))
+
+        self._sample_rate = sample_rate
+        self._binsize = binsize
+        self._hopsize = binsize // 2 if hopsize is None else hopsize
+        self._pool = pool
+        self._factor = factor
+        self._min_size = min_size
+        self._dirname = dirname
+
+        if dirname is not None and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+
+        # The time of the center of the window m is t0 + m * dt, and the frequency of the bin k is f0 + k * df.
+        padsize = _get_padsize(binsize, self.hopsize) if self.hopsize < binsize else 0
+        self._t0 = (binsize / 2. - padsize) / sample_rate
+        self._dt = self.hopsize / sample_rate
+        self._f0 = 0. if freqs is None else float(freqs[0])
+        self._df = sample_rate / binsize if freqs is None or len(freqs) < 2 else float(freqs[1] - freqs[0])
+
+        self._levels = []
+        self._steps = [] # The number of windows and bins of level 0 pooled in a bin of each level
+        self._build(spectra)
+
+    def _new_level(self, shape):
+        if self._dirname is None:
+            return np.empty(shape, dtype=np.float32)
+
+        filename = os.path.join(self._dirname, 'level_{}.npy'.format(len(self._levels)))
+        return np.lib.format.open_memmap(filename, mode='w+', dtype=np.float32, shape=shape)
+
+    def _build(self, spectra):
+        nwin, nfreqs = spectra.shape
+
+        level = self._new_level((nwin, nfreqs))
+        vmin, vmax = np.inf, -np.inf
+        for r0 in range(0, nwin, _block_rows):
+            block = spectra[r0:r0+_block_rows]
+            block = np.abs(block)**2 if np.iscomplexobj(block) else block
+            level[r0:r0+_block_rows] = block
+            vmin, vmax = min(vmin, block.min()), max(vmax, block.max())
+
+        self._levels += [level]
+        self._steps += [(1, 1)]
+        self._range = (float(vmin), float(vmax))
+
+        while True:
+            src = self._levels[-1]
+            nt, nf = src.shape
+            ft = self.factor if nt > self.min_size else 1
+            ff = self.factor if nf > self.min_size else 1
+            if ft == ff == 1:
+                break
+
+            level = self._new_level((-(-nt // ft), -(-nf // ff)))
+
+            # The blocks start on multiples of the factor, so the pooling is the same as in one pass.
+            rows = _block_rows * ft
+            for r0 in range(0, nt, rows):
+                block = _pool(_pool(src[r0:r0+rows], ft, 0, self.pool), ff, 1, self.pool)
+                level[r0//ft:r0//ft+block.shape[0]] = block
+
+            step = self._steps[-1]
+            self._levels += [level]
+            self._steps += [(step[0] * ft, step[1] * ff)]
+
+        if self._dirname is not None:
+            for level in self._levels:
+                level.flush()
+
+    def select(self, tlim=None, flim=None, width=1000, height=None):
+        """ Pick the coarsest level with at least width x height bins in the window.
+
+        Parameters:
+        -----------
+        tlim: tuple (default: None)
+            The (start, stop) time in seconds. If None, the whole recording.
+
+        flim: tuple (default: None)
+            The (low, high) frequencies. If None, all frequencies.
+
+        width, height: int (default: 1000, None)
+            The number of pixels of the display in time and frequency. If height is None, the
+            frequency resolution is not constrained.
+
+        Return:
+        -------
+        tile: ndarray, (ntimes x nfreqs)
+            The power in the window, a view into the level.
+
+        extent: tuple
+            The (left, right, bottom, top) of the tile in seconds and Hz, as for imshow.
+
+        level: int
+            The index of the selected level.
+        """
+        nwin, nfreqs = self._levels[0].shape
+        tlim = (self.times[0], self.times[-1]) if tlim is None else tlim
+        flim = (self.freqs[0], self.freqs[-1]) if flim is None else flim
+
+        # The level 0 indices of the window
+        w0 = int(np.clip(np.floor((tlim[0] - self._t0) / self._dt), 0, nwin - 1))
+        w1 = int(np.clip(np.ceil((tlim[1] - self._t0) / self._dt) + 1, w0 + 1, nwin))
+        k0 = int(np.clip(np.floor((flim[0] - self._f0) / self._df), 0, nfreqs - 1))
+        k1 = int(np.clip(np.ceil((flim[1] - self._f0) / self._df) + 1, k0 + 1, nfreqs))
+
+        for ix in range(self.nlevels - 1, -1, -1):
+            st, sf = self._steps[ix]
+            i0, i1 = w0 // st, -(-w1 // st)
+            j0, j1 = k0 // sf, -(-k1 // sf)
+            if i1 - i0 >= width and (height is None or j1 - j0 >= height):
+                break
+
+        extent = (self._t0 + (i0 * st - .5) * self._dt, self._t0 + (min(i1 * st, nwin) - .5) * self._dt,
+                  self._f0 + (j0 * sf - .5) * self._df, self._f0 + (min(j1 * sf, nfreqs) - .5) * self._df)
+
+        return self._levels[ix][i0:i1, j0:j1], extent, ix
+
+    def plot(self, tlim=None, flim=None, ax=None, width=None, height=None, norm='db', cmap='jet',
+             title=None, figsize=None, colorbar=True, **kwargs):
+        """ Display a time-frequency window from the appropriate level.
+
+        Parameters:
+        -----------
+        width, height: int (default: None)
+            The number of pixels of the display. By default, the size of the axes.
+
+        norm: str (default: 'db')
+            'db' for decibels, otherwise the power is displayed.
+
+        See select() for the other parameters.
+        """
+        if ax is None:
+            _fig, ax = plt.subplots(1, 1, figsize=(4, 5) if figsize is None else figsize)
+        else:
+            _fig = ax.figure
+
+        if width is None:
+            bbox = ax.get_window_extent()
+            width, height = int(bbox.width), int(bbox.height) if height is None else height
+
+        tile, extent, _ = self.select(tlim=tlim, flim=flim, width=width, height=height)
+
+        vmin, vmax = self._range
+        if norm == 'db':
+            tile = 10. * np.log10(np.maximum(tile, np.finfo(np.float32).tiny) / 1e-10)
+            vmin, vmax = [10. * np.log10(max(v, np.finfo(np.float32).tiny) / 1e-10) for v in (vmin, vmax)]
+
+        ima = ax.imshow(np.asarray(tile).T, origin='lower', aspect='auto', cmap=cmap, extent=extent,
+                        vmin=vmin, vmax=vmax, interpolation='nearest', **kwargs)
+
+        ax.set_xlim(tlim if tlim is not None else extent[:2])
+        ax.set_ylim(flim if flim is not None else extent[2:])
+
+        if title is not None:
+            ax.set_title(title)
+
+        if colorbar:
+            _fig.colorbar(ima, ax=ax)
+
+        return _fig
+
+    @property
+    def levels(self):
+        return self._levels
+
+    @property
+    def nlevels(self):
+        return len(self._levels)
+
+    @property
+    def times(self):
+        return self._t0 + np.arange(self._levels[0].shape[0]) * self._dt
+
+    @property
+    def freqs(self):
+        return self._f0 + np.arange(self._levels[0].shape[1]) * self._df
+
+    @property
+    def sample_rate(self):
+        return self._sample_rate
+
+    @property
+    def binsize(self):
+        return self._binsize
+
+    @property
+    def hopsize(self):
+        return self._hopsize
+
+    @property
+    def pool(self):
+        return self._pool
+
+    @property
+    def factor(self):
+        return self._factor
+
+    @property
+    def min_size(self):
+        return self._min_size
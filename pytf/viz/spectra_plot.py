@@ -7,18 +7,22 @@ from .utils.normalization import (logscale_normalization)
 def _plot_spectrogram(spectra, axs=None, figsize=None, title=None, cmap='jet',
                       srate=None, nsamp=None,
                       label=False, xlabel=False, ylabel=False, tlim=None, flim=None, norm='db',
-                      fontsize={'ticks': 15, 'axis': 15, 'title': 20}, **kwargs):
+                      fontsize={'ticks': 15, 'axis': 15, 'title': 20}, freqs=None, **kwargs):
     """ Plot spectrogram of a given spectra.
 
     Parameters:
     -----------
     spectra: ndarray (n_win x nsamp)
         n_win is the length of the time indices, and nsamp is the length of the frequency indices in this case.
+
+    freqs: ndarray (default: None)
+        The frequencies of the spectra, e.g. of a band from zoom_stft. Default: the bins of the rfft.
     """
     xlabel = True if label else xlabel
     ylabel = True if label else ylabel
 
     spec_, freq = logscale_normalization(spectra, factor=1, srate=srate)
+    freq = freq if freqs is None else np.asarray(freqs)
     if norm is 'db':
         spec_ = 20. * np.log10(np.abs(spec_)/10e-6) # amplitude to decibel
     else:
@@ -11,6 +11,9 @@ setup(
     version=0.1,
     packages=find_packages(),
     install_requires=['numpy', 'scipy'],
+    entry_points={
+        'console_scripts': ['pytf = pytf.cli:main'],
+    },
     author="David Lu",
     author_email="davidlu89@gmail.com",
     description="pytf is a tool for time-frequency analysis",
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from pytf.basic import reshape_data
+from pytf.filter.filterbank import FilterBank
+from pytf.time_frequency.spectrogram import Spectrogram
+from pytf.time_frequency.stft import stft
+
+SAMPLE_RATE = 1000.
+
+def _trials(ntrials=3, nch=2, nsamp=4096):
+    return np.random.RandomState(0).randn(ntrials, nch, nsamp)
+
+def test_reshape_data_moves_the_time_axis_last():
+    x = _trials()
+    np.testing.assert_array_equal(reshape_data(np.moveaxis(x, -1, 0), axis=0), x)
+    assert reshape_data(np.zeros(10)).shape == (1, 10)
+
+def test_stft_batch_matches_trials():
+    x = _trials()
+    X = stft(x, binsize=256, hopsize=64)
+    assert X.shape[:2] == x.shape[:2]
+    for k in range(x.shape[0]):
+        np.testing.assert_allclose(X[k], stft(x[k], binsize=256, hopsize=64), atol=1e-9)
+
+@pytest.mark.parametrize('nprocs', [1, 2])
+def test_filterbank_batch_matches_trials(nprocs):
+    x = _trials()
+    bank = FilterBank(nch=2, nsamp=x.shape[-1], binsize=512, sample_rate=SAMPLE_RATE,
+                      center_freqs=np.array([20., 40.]), bandwidth=8., order=129, hilbert=True, nprocs=nprocs)
+    try:
+        y = bank.analysis(x)
+        assert y.shape == (3, 2, 2, x.shape[-1])
+        for k in range(x.shape[0]):
+            np.testing.assert_allclose(y[k], bank.analysis(x[k]), rtol=1e-5, atol=1e-6)
+    finally:
+        bank.kill()
+
+def test_spectrogram_batch_matches_trials():
+    x = _trials()
+    spec = Spectrogram(nch=2, nsamp=x.shape[-1], sample_rate=SAMPLE_RATE, binsize=256, hopsize=128)
+    X = spec.analysis(x)
+    assert X.shape[:2] == x.shape[:2]
+    for k in range(x.shape[0]):
+        np.testing.assert_allclose(X[k], spec.analysis(x[k]), rtol=1e-6, atol=1e-9)
+
+    # The time axis may be given
+    np.testing.assert_allclose(spec.analysis(np.moveaxis(x, -1, 0), axis=0), X, rtol=1e-6, atol=1e-9)
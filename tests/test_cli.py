@@ -0,0 +1,115 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from pytf.cli import analyze, build_engine, load_bank_config, main
+from pytf.filter.filterbank import FilterBank
+from pytf.time_frequency.spectrogram import Spectrogram
+
+FB_CONFIG = {'type': 'FilterBank', 'sample_rate': 1000., 'binsize': 256, 'order': 65,
+             'center_freqs': [20., 40., 60.], 'bandwidth': 8., 'hilbert': True}
+
+SPEC_CONFIG = {'type': 'Spectrogram', 'sample_rate': 1000., 'binsize': 128, 'hopsize': 64}
+
+ZOOM_CONFIG = dict(SPEC_CONFIG, binsize=256, fmin=50., fmax=100., nbins=40)
+
+FB_RESAMPLED_CONFIG = dict(FB_CONFIG, binsize=512, center_freqs=[20., 40.], resample_by=4)
+
+SPEC_RESAMPLED_CONFIG = dict(SPEC_CONFIG, resample_by=2)
+
+CONFIGS = [FB_CONFIG, SPEC_CONFIG, ZOOM_CONFIG, FB_RESAMPLED_CONFIG, SPEC_RESAMPLED_CONFIG]
+CONFIG_IDS = ['filterbank', 'spectrogram', 'zoom', 'filterbank-resampled', 'spectrogram-resampled']
+
+def _recordings(dirname, nch=3, nsamp=5000, nfiles=2):
+    rng = np.random.RandomState(0)
+    os.makedirs(dirname)
+    x = [rng.randn(nch, nsamp) for _ in range(nfiles)]
+    for i, x_ in enumerate(x):
+        np.save(os.path.join(dirname, 'rec{}.npy'.format(i)), x_)
+    return x
+
+def _config_file(tmpdir, config):
+    filename = os.path.join(str(tmpdir), 'config.json')
+    with open(filename, 'w') as f:
+        json.dump(config, f)
+    return filename
+
+def _one_shot(tmpdir, config, x):
+    engine = build_engine(load_bank_config(_config_file(tmpdir, config)), nch=x.shape[0], nsamp=x.shape[-1])
+    return engine.analysis(x)
+
+@pytest.mark.parametrize('config', CONFIGS, ids=CONFIG_IDS)
+def test_analyze_matches_one_shot(tmpdir, config):
+    in_dir, out_dir = os.path.join(str(tmpdir), 'in'), os.path.join(str(tmpdir), 'out')
+    x = _recordings(in_dir, nsamp=5003)
+
+    assert main(['analyze', '--bank', _config_file(tmpdir, config), '--block-size', '1024',
+                 '--quiet', in_dir, out_dir]) == 0
+
+    for i, x_ in enumerate(x):
+        y = np.load(os.path.join(out_dir, 'rec{}.npy'.format(i)))
+        expected = _one_shot(tmpdir, config, x_)
+        assert y.shape == expected.shape
+        np.testing.assert_allclose(y, expected, rtol=1e-4, atol=1e-4 * np.abs(expected).max())
+    assert not [f for f in os.listdir(out_dir) if f.endswith('.partial')]
+
+def test_failed_runs_leave_no_partial_output(tmpdir, monkeypatch):
+    in_dir, out_dir = os.path.join(str(tmpdir), 'in'), os.path.join(str(tmpdir), 'out')
+    _recordings(in_dir, nfiles=1)
+
+    def _fail(self, x, **kwargs):
+        raise RuntimeError("analysis failed")
+
+    monkeypatch.setattr(FilterBank, 'analysis', _fail)
+    with pytest.raises(RuntimeError):
+        analyze(load_bank_config(_config_file(tmpdir, FB_CONFIG)), in_dir, out_dir, block_size=1024, verbose=False)
+    assert os.listdir(out_dir) == []
+
+def test_analyze_skips_existing_outputs(tmpdir):
+    in_dir, out_dir = os.path.join(str(tmpdir), 'in'), os.path.join(str(tmpdir), 'out')
+    _recordings(in_dir)
+
+    stats = analyze(dict(SPEC_CONFIG), in_dir, out_dir, block_size=1024, verbose=False)
+    assert (stats['processed'], stats['skipped']) == (2, 0)
+
+    stats = analyze(dict(SPEC_CONFIG), in_dir, out_dir, block_size=1024, verbose=False)
+    assert (stats['processed'], stats['skipped']) == (0, 2)
+
+def test_analyze_jobs(tmpdir):
+    in_dir = os.path.join(str(tmpdir), 'in')
+    _recordings(in_dir)
+
+    out1, out2 = os.path.join(str(tmpdir), 'out1'), os.path.join(str(tmpdir), 'out2')
+    analyze(dict(SPEC_CONFIG), in_dir, out1, jobs=1, block_size=1024, verbose=False)
+    analyze(dict(SPEC_CONFIG), in_dir, out2, jobs=2, block_size=1024, verbose=False)
+
+    for f in os.listdir(out1):
+        np.testing.assert_array_equal(np.load(os.path.join(out1, f)), np.load(os.path.join(out2, f)))
+
+def test_build_engine_nprocs(tmpdir):
+    config = load_bank_config(_config_file(tmpdir, dict(FB_CONFIG, nprocs=2)))
+    bank = build_engine(config, nch=3, nsamp=2048)
+    try:
+        assert isinstance(bank, FilterBank)
+        assert bank.nprocs == 2
+    finally:
+        bank.kill()
+
+    with pytest.raises(ValueError):
+        build_engine(dict(SPEC_CONFIG, nprocs=2))
+    assert isinstance(build_engine(dict(SPEC_CONFIG)), Spectrogram)
+
+def test_analyze_nprocs(tmpdir):
+    in_dir, out_dir = os.path.join(str(tmpdir), 'in'), os.path.join(str(tmpdir), 'out')
+    x = _recordings(in_dir, nfiles=1)
+    config = load_bank_config(_config_file(tmpdir, dict(FB_CONFIG, nprocs=2)))
+
+    analyze(config, in_dir, out_dir, block_size=1024, verbose=False)
+    expected = _one_shot(tmpdir, FB_CONFIG, x[0])
+    np.testing.assert_allclose(np.load(os.path.join(out_dir, 'rec0.npy')), expected,
+                               rtol=1e-4, atol=1e-4 * np.abs(expected).max())
+
+    with pytest.raises(ValueError):
+        analyze(config, in_dir, os.path.join(str(tmpdir), 'out2'), jobs=2, verbose=False)
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from pytf.connectivity.spectral import (CrossSpectra, coherence, csd, plv)
+from pytf.time_frequency.stft import stft
+
+def _analytic(nch=4, nfreqs=3, ntimes=500, seed=0):
+    rs = np.random.RandomState(seed)
+    return rs.randn(nch, nfreqs, ntimes) + 1j * rs.randn(nch, nfreqs, ntimes)
+
+def _reference(X):
+    """ The spectra of each pair in a loop, for X of shape (nch x nfreqs x ntimes).
+    """
+    nch = X.shape[0]
+    S, C, P = [], [], []
+    for i in range(nch):
+        for j in range(i + 1, nch):
+            sij = np.mean(X[i] * X[j].conj(), axis=-1)
+            sii = np.mean(np.abs(X[i])**2, axis=-1)
+            sjj = np.mean(np.abs(X[j])**2, axis=-1)
+            S += [sij]
+            C += [np.abs(sij)**2 / (sii * sjj)]
+            P += [np.abs(np.mean(np.exp(1j * (np.angle(X[i]) - np.angle(X[j]))), axis=-1))]
+    return np.array(S), np.array(C), np.array(P)
+
+def test_pairs_match_a_loop():
+    X = _analytic()
+    S, C, P = _reference(X)
+    np.testing.assert_allclose(csd(X), S, atol=1e-12)
+    np.testing.assert_allclose(coherence(X), C, atol=1e-12)
+    np.testing.assert_allclose(plv(X), P, atol=1e-12)
+
+def test_chunks_match_one_pass():
+    X = _analytic()
+    cs = CrossSpectra(4, 3)
+    for t0 in range(0, X.shape[-1], 77):
+        cs.update(X[...,t0:t0+77])
+    assert cs.count == X.shape[-1]
+
+    S, C, P = _reference(X)
+    np.testing.assert_allclose(cs.csd(), S, atol=1e-12)
+    np.testing.assert_allclose(cs.coherence(), C, atol=1e-12)
+    np.testing.assert_allclose(cs.plv(), P, atol=1e-12)
+
+    cs.reset()
+    assert cs.count == 0 and not np.any(cs.csd())
+
+def test_mask_drops_the_flagged_times():
+    X = _analytic()
+    mask = np.zeros(X.shape[-1], dtype=bool)
+    mask[100:250] = True
+
+    cs = CrossSpectra(4, 3)
+    cs.update(X, mask=mask)
+    np.testing.assert_allclose(cs.csd(), _reference(X[...,~mask])[0], atol=1e-12)
+
+    with pytest.raises(ValueError):
+        cs.update(X, mask=mask[:10])
+
+def test_stft_time_axis():
+    x = np.random.RandomState(1).randn(3, 4000)
+    X = stft(x, binsize=128, hopsize=64)
+    S, C, _ = _reference(np.swapaxes(X, 1, 2))
+    np.testing.assert_allclose(csd(X, time_axis=-2), S, atol=1e-9)
+    np.testing.assert_allclose(coherence(X, time_axis=-2), C, atol=1e-9)
+
+def test_coherent_channels():
+    X = _analytic(nch=1)
+    X = np.concatenate([X, 2 * X * np.exp(1j * .5)], axis=0)
+    np.testing.assert_allclose(coherence(X), 1.)
+    np.testing.assert_allclose(plv(X), 1.)
+
+def test_to_matrix_is_hermitian():
+    X = _analytic()
+    cs = CrossSpectra(4, 3)
+    cs.update(X)
+    M = cs.to_matrix(cs.csd(), diagonal=cs.psd())
+    assert M.shape == (4, 4, 3)
+    np.testing.assert_allclose(M, np.conj(np.swapaxes(M, 0, 1)))
+    full = np.einsum('ift,jft->ijf', X, X.conj()) / X.shape[-1]
+    np.testing.assert_allclose(M, full, atol=1e-12)
+
+def test_invalid_inputs():
+    cs = CrossSpectra(4, 3)
+    with pytest.raises(ValueError):
+        cs.update(np.abs(_analytic()))
+    with pytest.raises(ValueError):
+        cs.update(_analytic(nch=3))
+    with pytest.raises(ValueError):
+        CrossSpectra(4, 3, time_axis=0)
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from pytf.core import _grid_size
+from pytf.filter.filterbank import FilterBank
+from pytf.time_frequency.spectrogram import Spectrogram
+from pytf.time_frequency.stft import _get_padsize
+
+SAMPLE_RATE = 1000.
+NSAMP = 20000
+
+def _signal(nch=2):
+    return np.random.RandomState(0).randn(nch, NSAMP)
+
+def _zero_extended(x, pad):
+    return np.pad(x, [(0, 0), (pad, pad)])
+
+def _close(y, expected):
+    np.testing.assert_allclose(y, expected, rtol=1e-4, atol=1e-5 * np.abs(expected).max())
+
+@pytest.mark.parametrize('kwargs', [dict(), dict(decimate_by=2), dict(resample_by=2), dict(hilbert=False)])
+def test_filterbank_epochs_match_analysis(kwargs):
+    x = _signal()
+    params = dict(nch=2, nsamp=NSAMP, binsize=512, hopsize=128, sample_rate=SAMPLE_RATE,
+                  center_freqs=np.array([20., 40.]), bandwidth=8., order=129, hilbert=True)
+    params.update(kwargs)
+    bank = FilterBank(**params)
+    R, dec = bank.resample_by, bank.decimate_by
+    step = R * dec
+
+    tmin, tmax = -.3, .5
+    ntimes = int(round((tmax - tmin) * SAMPLE_RATE)) // step + 1
+    first = lambda event, pad=0: -(-(event + pad + int(round(tmin * SAMPLE_RATE))) // step)
+
+    # The epochs within the recording
+    y = bank.analysis(x)
+    events = np.array([400, 5003, 12345, NSAMP - 600])
+    epochs = bank.analyze_events(x, events, tmin, tmax)
+    assert epochs.shape == (events.size, 2, 2, ntimes)
+    for epoch, event in zip(epochs, events):
+        _close(epoch, y[...,first(event):first(event)+ntimes])
+
+    # Over the ends, the signal is extended with zeros
+    if R == 1:
+        pad = 4 * _grid_size(bank.binsize, bank.hopsize)
+        y = bank.analysis(_zero_extended(x, pad))
+        events = np.array([100, NSAMP - 200])
+        for epoch, event in zip(bank.analyze_events(x, events, tmin, tmax), events):
+            k = first(event, pad)
+            _close(epoch, y[...,k:k+ntimes])
+
+@pytest.mark.parametrize('kwargs', [dict(), dict(resample_by=2), dict(fmin=50., fmax=100.)])
+def test_spectrogram_epochs_match_analysis(kwargs):
+    x = _signal()
+    spec = Spectrogram(nch=2, nsamp=NSAMP, sample_rate=SAMPLE_RATE, binsize=256, hopsize=64, **kwargs)
+    R = spec.resample_by
+    binsize, hopsize = spec.binsize, spec.hopsize
+    X = spec.analysis(x)
+
+    tmin, tmax = -.2, .3
+    events = np.array([3001, 9876, 15000])
+    epochs = spec.analyze_events(x, events, tmin, tmax)
+
+    nwin = int(round((tmax - tmin) * SAMPLE_RATE)) // (hopsize * R) + 1
+    assert epochs.shape == (events.size, 2, nwin, X.shape[-1])
+
+    # The windows centered from event + tmin on
+    center0 = (binsize / 2. - _get_padsize(binsize, hopsize)) * R
+    for epoch, event in zip(epochs, events):
+        first = int(np.ceil((event + tmin * SAMPLE_RATE - center0) / (hopsize * R)))
+        _close(epoch, X[:,first:first+nwin])
+
+def test_spectrogram_epochs_at_the_ends():
+    x = _signal()
+    spec = Spectrogram(nch=2, nsamp=NSAMP, sample_rate=SAMPLE_RATE, binsize=256, hopsize=64)
+    pad = 16 * 256
+    X = spec.analysis(_zero_extended(x, pad))
+
+    events = np.array([50, NSAMP - 10])
+    epochs = spec.analyze_events(x, events, -.2, .2)
+    center0 = 128. - _get_padsize(256, 64)
+    for epoch, event in zip(epochs, events):
+        first = int(np.ceil((event + pad - 200 - center0) / 64))
+        _close(epoch, X[:,first:first+epoch.shape[-2]])
+
+def test_invalid_epochs():
+    bank = FilterBank(nch=1, nsamp=NSAMP, binsize=512, sample_rate=SAMPLE_RATE, center_freqs=np.array([40.]),
+                      bandwidth=8., order=129)
+    with pytest.raises(ValueError):
+        bank.analyze_events(_signal(1), [1000], .5, -.5)
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from pytf.filter.filterbank import FilterBank
+
+SAMPLE_RATE = 1000.
+
+def _bank(**kwargs):
+    params = dict(nch=1, nsamp=2**14, binsize=1024, sample_rate=SAMPLE_RATE, center_freqs=np.array([40.]),
+                  bandwidth=8., order=257, hilbert=True)
+    params.update(kwargs)
+    return FilterBank(**params)
+
+def _sinusoid(nsamp, f=40., phase=.3):
+    t = np.arange(nsamp) / SAMPLE_RATE
+    return np.cos(2 * np.pi * f * t + phase)[np.newaxis], 2 * np.pi * f * t + phase
+
+@pytest.mark.parametrize('hopsize', [256, 512, 768, 1023])
+def test_hopsize_length_and_alignment(hopsize):
+    nsamp = 2**14
+    x, phase = _sinusoid(nsamp)
+    bank = _bank(nsamp=nsamp, hopsize=hopsize)
+    assert bank.hopsize == hopsize
+
+    y = bank.analysis(x)
+    assert y.shape == (1, 1, nsamp)
+
+    # The output is in phase with the input, away from the ends
+    mid = slice(2048, nsamp - 2048)
+    assert np.abs(np.median(np.angle(y[0,0,mid] * np.exp(-1j * phase[mid])))) < .05
+
+@pytest.mark.parametrize('kwargs', [dict(hopsize=1024), dict(hopsize=2048), dict(overlap_factor=0.)])
+def test_hopsize_without_overlap_is_rejected(kwargs):
+    with pytest.raises(ValueError):
+        _bank(**kwargs)
+
+def _reference_bands(bank, X):
+    """ The band spectra of the fancy-index kernel, X_[:,:,idx2,idx1] = X[:,:,idx1] * filts[fidx],
+    on the bins within the spectra.
+    """
+    idx1, idx2, fidx = bank._idx1, bank._idx2, bank._fidx
+    valid = (idx1 >= 0) & (idx1 < min(X.shape[-1], bank._binsize_ // 2))
+    gains = bank._filts[fidx] * np.where(idx1 > 0, 1 + bank.hilbert, 1)
+
+    X_ = np.zeros(X.shape[:2] + (bank.nfreqs, bank._binsize_ // 2), dtype=np.complex64)
+    X_[:,:,idx2[valid],idx1[valid]] = X[:,:,idx1[valid]] * gains[valid]
+    return X_
+
+@pytest.mark.parametrize('binsize', [256, 1024])
+@pytest.mark.parametrize('hilbert', [True, False])
+def test_band_gains_match_the_fancy_index_kernel(binsize, hilbert):
+    # The lowest band reaches below DC
+    bank = _bank(nch=2, binsize=binsize, order=binsize // 4 + 1, center_freqs=np.array([2., 40., 120., 300.]),
+                 hilbert=hilbert, domain='freq')
+    rng = np.random.RandomState(5)
+    X = (rng.randn(2, 7, binsize // 2 + 1) + 1j * rng.randn(2, 7, binsize // 2 + 1)).astype(np.complex64)
+
+    X_ = bank._fft_procs(X, bank._idx1, bank._idx2, bank._fidx, filts=bank._gains, nfreqs=bank.nfreqs)
+    np.testing.assert_allclose(X_, _reference_bands(bank, X), rtol=1e-6)
+
+def test_band_gains_of_the_processes():
+    x, _ = _sinusoid(2**13)
+    kwargs = dict(nsamp=2**13, center_freqs=np.array([20., 40., 60., 80.]))
+    expected = _bank(**kwargs).analysis(x)
+
+    bank = _bank(nprocs=2, **kwargs)
+    try:
+        np.testing.assert_allclose(bank.analysis(x), expected, rtol=1e-5, atol=1e-6)
+    finally:
+        bank.kill()
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from pytf.filter.iirbank import IIRFilterBank
+
+SAMPLE_RATE = 1000.
+
+def _bank(**kwargs):
+    params = dict(nch=2, center_freqs=np.array([20., 60.]), bandwidth=8., sample_rate=SAMPLE_RATE, hilbert=True)
+    params.update(kwargs)
+    return IIRFilterBank(**params)
+
+def test_chunks_match_one_call():
+    x = np.random.RandomState(0).randn(2, 3000)
+    y = _bank().analysis(x)
+
+    bank = _bank()
+    y_ = np.concatenate([bank.analysis(x[:,i:i+317]) for i in range(0, 3000, 317)], axis=-1)
+    np.testing.assert_allclose(y_, y, rtol=1e-4, atol=1e-5)
+
+    bank.reset()
+    np.testing.assert_allclose(bank.analysis(x), y)
+
+def test_decimated_chunks_match_one_call():
+    x = np.random.RandomState(1).randn(2, 3000)
+    y = _bank().analysis(x)
+
+    bank = _bank(decimate_by=4)
+    y_ = np.concatenate([bank.analysis(x[:,i:i+301]) for i in range(0, 3000, 301)], axis=-1)
+    np.testing.assert_allclose(y_, y[:,:,::4], rtol=1e-4, atol=1e-5)
+
+def test_sinusoid_in_and_out_of_band():
+    t = np.arange(4000) / SAMPLE_RATE
+    x = np.cos(2 * np.pi * 20. * t)[np.newaxis].repeat(2, axis=0)
+
+    bank = _bank()
+    y = bank.analysis(x)
+    assert y.shape == (2, 2, 4000) and y.dtype == np.complex64
+
+    # The envelope of the band at 20 Hz, and the rejection of the band at 60 Hz
+    np.testing.assert_allclose(np.abs(y[:,0,1000:]), 1., atol=.01)
+    assert np.abs(y[:,1,1000:]).max() < .01
+
+    # At the center of the band, the lowpass at DC does not shift the phase
+    np.testing.assert_allclose(np.angle(y[:,0,1000:] * np.exp(-2j * np.pi * 20. * t[1000:])), 0., atol=.01)
+
+    real = _bank(hilbert=False).analysis(x)
+    assert real.dtype == np.float32
+    np.testing.assert_allclose(real, y.real, atol=1e-5)
+
+def test_channel_mismatch():
+    with pytest.raises(ValueError):
+        _bank().analysis(np.zeros((3, 10)))
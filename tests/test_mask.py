@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+
+from pytf.filter.filterbank import FilterBank
+from pytf.preprocessing.artifact_detection import artifact_mask
+from pytf.time_frequency.spectrogram import Spectrogram
+from pytf.time_frequency.stft import (_get_nwin, _get_padsize)
+
+SAMPLE_RATE = 1000.
+NSAMP = 16384
+
+def _signal(shape=(2, NSAMP)):
+    return np.random.RandomState(0).randn(*shape)
+
+def _mask():
+    return artifact_mask([slice(1000, 1300), slice(5000, 9000), slice(NSAMP - 50, NSAMP)], NSAMP)
+
+def test_artifact_mask():
+    mask = artifact_mask([slice(2, 4), slice(6, 7)], 10)
+    np.testing.assert_array_equal(mask, [0, 0, 1, 1, 0, 0, 1, 0, 0, 0])
+
+@pytest.mark.parametrize('kwargs', [dict(), dict(decimate_by=4), dict(resample_by=2), dict(max_memory=True)])
+def test_filterbank_keeps_the_unflagged_samples(kwargs):
+    x = _signal()
+    mask = _mask()
+    params = dict(nch=2, nsamp=NSAMP, binsize=512, hopsize=128, sample_rate=SAMPLE_RATE,
+                  center_freqs=np.array([20., 40.]), bandwidth=8., order=129, hilbert=True)
+    params.update(kwargs)
+    split = params.pop('max_memory', False)
+
+    bank = FilterBank(**params)
+    expected = bank.analysis(x)
+    if split:
+        bank.max_memory = expected.nbytes + bank.estimate_memory() // 4
+
+    y = bank.analysis(x, mask=mask)
+    step = bank.resample_by * bank.decimate_by
+    flagged = mask[::step][:y.shape[-1]]
+    assert np.all(np.isnan(y[...,flagged]))
+    np.testing.assert_allclose(y[...,~flagged], expected[...,~flagged], rtol=1e-5, atol=1e-6 * np.abs(expected).max())
+
+    y = bank.analysis(x, mask=mask, fill=0.)
+    assert not np.any(y[...,flagged])
+
+def test_filterbank_mask_per_row():
+    x = _signal()
+    mask = np.zeros(x.shape, dtype=bool)
+    mask[0,2000:6000] = True
+    bank = FilterBank(nch=2, nsamp=NSAMP, binsize=512, sample_rate=SAMPLE_RATE, center_freqs=np.array([20., 40.]),
+                      bandwidth=8., order=129, hilbert=True)
+    expected = bank.analysis(x)
+    y = bank.analysis(x, mask=mask)
+
+    assert np.all(np.isnan(y[0,:,2000:6000]))
+    np.testing.assert_allclose(y[0,:,:2000], expected[0,:,:2000], rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(y[1], expected[1], rtol=1e-5, atol=1e-6)
+
+@pytest.mark.parametrize('kwargs', [dict(), dict(fmin=50., fmax=100.), dict(resample_by=2)])
+def test_spectrogram_fills_the_flagged_windows(kwargs):
+    x = _signal()
+    mask = _mask()
+    spec = Spectrogram(nch=2, nsamp=NSAMP, sample_rate=SAMPLE_RATE, binsize=256, hopsize=64, **kwargs)
+    expected = spec.analysis(x)
+    X = spec.analysis(x, mask=mask)
+
+    # The windows covering a flagged sample
+    R, binsize, hopsize = spec.resample_by, spec.binsize, spec.hopsize
+    padsize = _get_padsize(binsize, hopsize)
+    nwin = _get_nwin(-(-NSAMP // R), binsize, hopsize)
+    flagged = np.array([mask[max(0, (m * hopsize - padsize) * R):max(0, (m * hopsize - padsize + binsize) * R)].any()
+                        for m in range(nwin)])
+
+    assert X.shape == expected.shape
+    assert np.all(np.isnan(X[:,flagged]))
+    np.testing.assert_allclose(X[:,~flagged], expected[:,~flagged], rtol=1e-6, atol=1e-9 * np.abs(expected).max())
+
+@pytest.mark.parametrize('shape', [(NSAMP - 1,), (3, NSAMP), (2, 2, NSAMP)])
+def test_bad_masks_are_rejected(shape):
+    x = _signal()
+    mask = np.zeros(shape, dtype=bool)
+    bank = FilterBank(nch=2, nsamp=NSAMP, binsize=512, sample_rate=SAMPLE_RATE, center_freqs=np.array([20.]),
+                      bandwidth=8., order=129)
+    with pytest.raises(ValueError, match='mask'):
+        bank.analysis(x, mask=mask)
+
+    spec = Spectrogram(nch=2, nsamp=NSAMP, sample_rate=SAMPLE_RATE, binsize=256)
+    with pytest.raises(ValueError, match='mask'):
+        spec.analysis(x, mask=mask)
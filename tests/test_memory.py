@@ -0,0 +1,64 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from pytf.filter.filterbank import FilterBank
+
+SAMPLE_RATE = 1000.
+
+def _bank(**kwargs):
+    params = dict(nch=3, nsamp=2**14, binsize=512, sample_rate=SAMPLE_RATE, center_freqs=np.array([20., 40., 80.]),
+                  bandwidth=8., order=129, hilbert=True)
+    params.update(kwargs)
+    return FilterBank(**params)
+
+def _signal(shape=(3, 2**14)):
+    return np.random.RandomState(0).randn(*shape)
+
+# The Python objects and the FFT plans, which the estimate leaves out
+_OVERHEAD = 2**16
+
+def _traced_peak(func, *args):
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+@pytest.mark.parametrize('kwargs', [dict(), dict(hilbert=False), dict(hopsize=128), dict(decimate_by=4)])
+@pytest.mark.parametrize('shape', [(3, 2**14), (2, 3, 2**14)])
+def test_estimate_bounds_the_allocations(kwargs, shape):
+    bank = _bank(**kwargs)
+    x = _signal(shape)
+    bank.analysis(x)
+
+    peak = _traced_peak(bank.analysis, x)
+    assert peak <= bank.estimate_memory(nrows=x.size // x.shape[-1]) + _OVERHEAD
+
+    # The estimate scales with the rows and the samples
+    assert bank.estimate_memory(nrows=6) > 1.9 * bank.estimate_memory()
+    assert bank.estimate_memory(nsamp=2**15) > 1.9 * bank.estimate_memory()
+
+@pytest.mark.parametrize('kwargs', [dict(), dict(hopsize=128), dict(decimate_by=4), dict(hilbert=False)])
+# The rows are split with a quarter of the estimate, and the time as well with a sixteenth
+@pytest.mark.parametrize('fraction', [4, 16])
+def test_max_memory_splits_match_one_pass(kwargs, fraction):
+    x = _signal((2, 3, 2**14))
+    expected = _bank(**kwargs).analysis(x)
+
+    bank = _bank(**kwargs)
+    bank.max_memory = expected.nbytes + bank.estimate_memory(nrows=6) // fraction
+    y = bank.analysis(x)
+    assert y.shape == expected.shape
+    np.testing.assert_allclose(y, expected, rtol=1e-4, atol=1e-5 * np.abs(expected).max())
+
+    # The splits fit in max_memory
+    assert _traced_peak(bank.analysis, x) <= bank.max_memory
+
+def test_max_memory_too_small():
+    bank = _bank()
+    bank.max_memory = 1000
+    with pytest.raises(ValueError):
+        bank.analysis(_signal())
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from scipy.signal import get_window
+
+from pytf.time_frequency.spectrogram import MultiResolutionSpectrogram
+from pytf.time_frequency.stft import (_get_padsize, multires_stft, stft)
+
+SAMPLE_RATE = 1000.
+
+def _signal(shape=(2, 3001)):
+    return np.random.RandomState(0).randn(*shape)
+
+@pytest.mark.parametrize('binsizes, hopsizes', [([64, 256, 1024], None), ([64, 256], [16, 64]),
+                                                ([100, 256], [30, 256]), ([64, 128], [32, 32])])
+def test_levels_match_stft(binsizes, hopsizes):
+    x = _signal()
+    X = multires_stft(x, binsizes, hopsizes=hopsizes)
+    hopsizes = [b // 2 for b in binsizes] if hopsizes is None else hopsizes
+
+    for X_, b, h in zip(X, binsizes, hopsizes):
+        expected = stft(x, binsize=b, hopsize=h, window='hann')
+        assert X_.shape == expected.shape
+        np.testing.assert_allclose(X_, expected, atol=1e-9)
+
+def test_bins_and_batch():
+    x = _signal((3, 2, 2000))
+    X = multires_stft(x, [64, 256], bins=[slice(2, 10), slice(None, 5)])
+    np.testing.assert_allclose(X[0], stft(x, binsize=64, hopsize=32, window='hann')[...,2:10], atol=1e-9)
+    np.testing.assert_allclose(X[1], stft(x, binsize=256, hopsize=128, window='hann')[...,:5], atol=1e-9)
+
+def test_times_are_the_centers_of_the_stft_windows():
+    x = _signal()
+    spec = MultiResolutionSpectrogram(nch=2, sample_rate=SAMPLE_RATE, binsizes=[64, 256], hopsize=32)
+    X = spec.analysis(x)
+    for X_, t, b in zip(X, spec.times, spec.binsizes):
+        assert t.size == X_.shape[-2]
+        np.testing.assert_allclose(t, (np.arange(t.size) * 32 - _get_padsize(b, 32) + b / 2.) / SAMPLE_RATE)
+
+def test_merge_takes_the_nearest_frames():
+    x = _signal()
+    spec = MultiResolutionSpectrogram(nch=2, sample_rate=SAMPLE_RATE, binsizes=[64, 256],
+                                      freq_ranges=[(100., 500.), (0., 90.)])
+    X = spec.analysis(x)
+    M, freqs = spec.merge()
+
+    times = spec.times
+    assert M.shape == (2, times[0].size, freqs.size)
+    np.testing.assert_allclose(freqs, np.concatenate([spec.freqs[1], spec.freqs[0]]))
+
+    # The long windows for the low frequencies, at the nearest center (the later one on ties)
+    n_low = spec.freqs[1].size
+    dist = np.round(np.abs(times[0][:,np.newaxis] - times[1][np.newaxis,:]) * SAMPLE_RATE, 6)
+    idx = times[1].size - 1 - np.argmin(dist[:,::-1], axis=-1)
+    gain = 2. / get_window('hann', 256).sum()
+    np.testing.assert_allclose(M[...,:n_low], X[1][:,idx] * gain)
+    np.testing.assert_allclose(M[...,n_low:], X[0] * 2. / get_window('hann', 64).sum())
+
+def test_merge_amplitude_of_a_sinusoid():
+    t = np.arange(8000) / SAMPLE_RATE
+    x = 3. * np.cos(2 * np.pi * 125. * t)[np.newaxis]
+    spec = MultiResolutionSpectrogram(nch=1, sample_rate=SAMPLE_RATE, binsizes=[64, 256, 1024])
+    spec.analysis(x)
+    M, freqs = spec.merge()
+    k = np.argmin(np.abs(freqs - 125.))
+    np.testing.assert_allclose(np.abs(M[0,10:-10,k]), 3., rtol=1e-6)
+
+def test_invalid():
+    with pytest.raises(ValueError):
+        MultiResolutionSpectrogram(binsizes=[64, 256], hopsize=None, overlap_factor=.3)
+    with pytest.raises(ValueError):
+        MultiResolutionSpectrogram(sample_rate=SAMPLE_RATE).merge()
+    with pytest.raises(ValueError):
+        multires_stft(_signal(), [64], hopsizes=[0])
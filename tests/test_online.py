@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+
+from pytf.stats.online import (OnlineStats, QuantileSketch)
+
+def _outputs(nch=2, nfreqs=3, nsamp=5000, seed=0):
+    rs = np.random.RandomState(seed)
+    return rs.lognormal(size=(nch, nfreqs, nsamp)) * np.exp(1j * rs.uniform(-np.pi, np.pi, (nch, nfreqs, nsamp)))
+
+def _chunks(nsamp, size=731):
+    return [slice(t0, t0 + size) for t0 in range(0, nsamp, size)]
+
+def test_chunks_match_numpy():
+    y = _outputs()
+    stats = OnlineStats(2, 3)
+    for sl in _chunks(y.shape[-1]):
+        stats.update(y[...,sl])
+
+    env = np.abs(y)
+    assert stats.count == y.shape[-1]
+    np.testing.assert_allclose(stats.mean(), env.mean(axis=-1), rtol=1e-10)
+    np.testing.assert_allclose(stats.var(), env.var(axis=-1), rtol=1e-10)
+    np.testing.assert_allclose(stats.var(ddof=1), env.var(axis=-1, ddof=1), rtol=1e-10)
+    np.testing.assert_array_equal(stats.min(), env.min(axis=-1))
+    np.testing.assert_array_equal(stats.max(), env.max(axis=-1))
+
+    z = stats.zscore(y[...,:10])
+    np.testing.assert_allclose(z, (env[...,:10] - env.mean(axis=-1, keepdims=True)) / env.std(axis=-1, keepdims=True))
+
+    # In place for real inputs
+    x = env[...,:10].copy()
+    assert stats.zscore(x, out=x) is x
+    np.testing.assert_allclose(x, z)
+
+def test_mask_leaves_out_the_flagged_samples():
+    y = np.abs(_outputs())
+    mask = np.zeros(y.shape[-1], dtype=bool)
+    mask[1000:1800] = True
+    y[...,mask] = np.nan
+
+    stats = OnlineStats(2, 3)
+    for sl in _chunks(y.shape[-1]):
+        stats.update(y[...,sl], mask=mask[sl])
+
+    kept = y[...,~mask]
+    assert stats.count == kept.shape[-1]
+    np.testing.assert_allclose(stats.mean(), kept.mean(axis=-1), rtol=1e-10)
+    np.testing.assert_allclose(stats.var(), kept.var(axis=-1), rtol=1e-10)
+
+@pytest.mark.parametrize('masked', [False, True])
+def test_decay_matches_exponential_weights(masked):
+    y = np.abs(_outputs())
+    nsamp = y.shape[-1]
+    mask = np.zeros(nsamp, dtype=bool)
+    if masked:
+        mask[4000:4731] = True  # a whole chunk is flagged
+
+    decay = 500.
+    stats = OnlineStats(2, 3, decay=decay)
+    for sl in _chunks(nsamp):
+        stats.update(y[...,sl], mask=mask[sl])
+
+    w = np.exp(-np.arange(nsamp - 1, -1, -1) / decay)
+    w[mask] = 0
+    mean = np.dot(y, w) / w.sum()
+    var = np.dot((y - mean[...,np.newaxis])**2, w) / w.sum()
+    np.testing.assert_allclose(stats.mean(), mean, rtol=1e-8)
+    np.testing.assert_allclose(stats.var(), var, rtol=1e-8)
+
+def test_masked_chunk_decays_the_quantiles():
+    # 1 for a chunk, a fully flagged chunk, then 10 for a chunk
+    nsamp, decay = 500, 500.
+    y = np.concatenate([np.ones(nsamp), np.full(nsamp, np.nan), np.full(nsamp, 10.)])[np.newaxis,np.newaxis]
+    mask = np.isnan(y[0,0])
+
+    stats = OnlineStats(1, 1, decay=decay, quantiles=True)
+    for sl in _chunks(y.shape[-1], size=nsamp):
+        stats.update(y[...,sl], mask=mask[sl])
+
+    w = np.exp(-np.arange(y.shape[-1] - 1, -1, -1) / decay)
+    expected = QuantileSketch(1, 1)
+    expected.update(y[...,~mask], weights=w[~mask])
+    np.testing.assert_allclose(stats.quantile([.05, .2, .5]), expected.quantile([.05, .2, .5]))
+
+    # The ones weigh e**-2 of the tens: they are below the 0.2 quantile once the flagged chunk has passed
+    np.testing.assert_allclose(stats.quantile([.05, .2]), [[[1., 10.]]], rtol=.01)
+
+def test_quantiles_within_the_accuracy():
+    y = _outputs(nsamp=20000)
+    stats = OnlineStats(2, 3, quantiles=True, accuracy=.01)
+    for sl in _chunks(y.shape[-1]):
+        stats.update(y[...,sl])
+
+    q = stats.quantile([.1, .5, .9])
+    assert q.shape == (2, 3, 3)
+    np.testing.assert_allclose(q, np.quantile(np.abs(y), [.1, .5, .9], axis=-1).transpose(1, 2, 0), rtol=.02)
+    np.testing.assert_allclose(stats.quantile(.5), q[...,1])
+
+def test_weighted_sketch():
+    x = np.tile(np.array([1., 10.]), (1, 1, 50))
+    sketch = QuantileSketch(1, 1)
+    sketch.update(x, weights=np.tile([3., 1.], 50))
+    np.testing.assert_allclose(sketch.quantile(.7), 1., rtol=.01)
+    np.testing.assert_allclose(sketch.quantile(.8), 10., rtol=.01)
+    assert np.isnan(QuantileSketch(1, 1).quantile(.5)).all()
+
+    sketch.decay(.5)
+    np.testing.assert_allclose(sketch._counts.sum(), 100.)
+
+def test_invalid_inputs():
+    stats = OnlineStats(2, 3, envelope=False)
+    with pytest.raises(ValueError):
+        stats.update(_outputs())
+    with pytest.raises(ValueError):
+        stats.update(np.ones((3, 3, 10)))
+    with pytest.raises(ValueError):
+        stats.update(np.ones((2, 3, 10)), mask=np.zeros(5, dtype=bool))
+    with pytest.raises(ValueError):
+        stats.quantile(.5)
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from pytf.stats.pac import (_draw_lags, modulation_index, surrogate_test)
+
+def _coupled(nch=2, nsamp=3000, seed=0):
+    """ Two phase bands and three amplitude bands; the first amplitude follows the first phase.
+    """
+    rs = np.random.RandomState(seed)
+    phase = rs.uniform(-np.pi, np.pi, (nch, 2, nsamp))
+    amp = rs.rand(nch, 3, nsamp)
+    amp[:,0] += 2 * (1 + np.cos(phase[:,0]))
+    return phase, amp
+
+def _reference_mi(phase, amp, nbins=18):
+    """ The modulation index of one phase and one amplitude, bin by bin.
+    """
+    edges = np.linspace(-np.pi, np.pi, nbins + 1)
+    mean = np.array([amp[(phase >= edges[j]) & (phase < edges[j+1])].mean() for j in range(nbins)])
+    p = mean / mean.sum()
+    return 1 + np.sum(p * np.log(p)) / np.log(nbins)
+
+def test_modulation_index_matches_the_bins():
+    phase, amp = _coupled()
+    mi = modulation_index(phase, amp)
+    assert mi.shape == (2, 2, 3)
+    for c in range(2):
+        for p in range(2):
+            for a in range(3):
+                assert mi[c,p,a] == pytest.approx(_reference_mi(phase[c,p], amp[c,a]), rel=1e-10)
+
+    # Analytic signals give the same index
+    np.testing.assert_allclose(modulation_index(np.exp(1j * phase), amp * np.exp(1j * .3)), mi, rtol=1e-10)
+
+@pytest.mark.parametrize('method', ['circular', 'block'])
+def test_surrogates_match_brute_force(method):
+    phase, amp = _coupled(nch=1, nsamp=1000)
+    nsurr, nblocks = 20, 7
+    mi, z, pvalue, surr = surrogate_test(phase, amp, nsurrogates=nsurr, method=method, nblocks=nblocks, seed=3,
+                                         return_surrogates=True)
+    lags = _draw_lags(1000, nsurr, method, nblocks, None, np.random.RandomState(3))
+
+    L = 1000 // nblocks
+    for s in range(nsurr):
+        for p in range(2):
+            for a in range(3):
+                if method == 'circular':
+                    ph, am = phase[0,p], np.roll(amp[0,a], lags[s])
+                else:
+                    ph = phase[0,p,:nblocks * L]
+                    am = amp[0,a,:nblocks * L].reshape(nblocks, L)[lags[s]].ravel()
+                assert surr[0,p,a,s] == pytest.approx(_reference_mi(ph, am), rel=1e-8, abs=1e-12)
+
+    np.testing.assert_allclose(z, (mi - surr.mean(axis=-1)) / surr.std(axis=-1))
+    np.testing.assert_allclose(pvalue, (1 + np.sum(surr >= mi[...,np.newaxis], axis=-1)) / (1 + nsurr))
+
+def test_lags():
+    lags = _draw_lags(1000, 500, 'circular', None, 100, np.random.RandomState(0))
+    assert lags.min() >= 100 and lags.max() <= 900
+    perms = _draw_lags(1000, 500, 'block', 3, None, np.random.RandomState(0))
+    assert not np.any(np.all(perms == np.arange(3), axis=-1))
+    np.testing.assert_array_equal(np.sort(perms, axis=-1), np.tile(np.arange(3), (500, 1)))
+
+def test_coupling_is_significant():
+    phase, amp = _coupled()
+    _, z, pvalue = surrogate_test(phase, amp, nsurrogates=100, seed=0)
+    assert np.all(pvalue[:,0,0] < .02) and np.all(z[:,0,0] > 5)
+    assert np.all(pvalue[:,1,:] > .02)
+
+def test_processes_and_mask():
+    phase, amp = _coupled()
+    expected = surrogate_test(phase, amp, nsurrogates=30, seed=1)
+    for r, e in zip(surrogate_test(phase, amp, nsurrogates=30, seed=1, nprocs=2), expected):
+        np.testing.assert_allclose(r, e)
+
+    mask = np.zeros(phase.shape[-1], dtype=bool)
+    mask[500:900] = True
+    masked = surrogate_test(phase, amp, nsurrogates=30, seed=1, mask=mask)
+    kept = surrogate_test(phase[...,~mask], amp[...,~mask], nsurrogates=30, seed=1)
+    for r, e in zip(masked, kept):
+        np.testing.assert_allclose(r, e)
+
+def test_invalid_inputs():
+    phase, amp = _coupled()
+    with pytest.raises(ValueError):
+        surrogate_test(phase, amp, method='shuffle')
+    with pytest.raises(ValueError):
+        surrogate_test(phase, amp[...,:100])
+    with pytest.raises(ValueError):
+        surrogate_test(phase, amp, min_shift=1500)
@@ -0,0 +1,64 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from pytf.filter.filterbank import FilterBank
+from pytf.filter.pipeline import FilterBankPipeline
+
+def _bank():
+    return FilterBank(nch=2, nsamp=2048, binsize=256, sample_rate=1000., center_freqs=np.array([20., 40.]),
+                      bandwidth=8., order=65, hilbert=True)
+
+def _chunks(nchunks=5):
+    rs = np.random.RandomState(0)
+    return [rs.randn(2, 2048) for _ in range(nchunks)]
+
+def test_outputs_match_analysis_in_order():
+    bank = _bank()
+    chunks = _chunks()
+    pipe = FilterBankPipeline(bank, maxsize=1)
+
+    async def acquire():
+        for x in chunks:
+            await pipe.submit(x)
+        await pipe.close()
+
+    async def consume():
+        return [y async for y in pipe.results()]
+
+    async def main():
+        return (await asyncio.gather(acquire(), consume()))[1]
+
+    outputs = asyncio.run(main())
+    assert len(outputs) == len(chunks)
+    for x, y in zip(chunks, outputs):
+        np.testing.assert_allclose(y, bank.analysis(x), rtol=1e-6, atol=1e-9)
+
+def test_stage_errors_reach_the_consumer():
+    bank = _bank()
+    failures = [ValueError('first chunk')]
+    filter_stage = bank._filter_stage
+
+    def _filter_stage(X):
+        if failures:
+            raise failures.pop()
+        return filter_stage(X)
+
+    bank._filter_stage = _filter_stage
+    pipe = FilterBankPipeline(bank)
+
+    async def main():
+        async with pipe:
+            await pipe.submit(_chunks(1)[0])
+            await pipe.submit(_chunks(1)[0])
+        with pytest.raises(ValueError):
+            await pipe.get()
+        y = await pipe.get()
+        with pytest.raises(StopAsyncIteration):
+            await pipe.get()
+        with pytest.raises(RuntimeError):
+            await pipe.submit(_chunks(1)[0])
+        return y
+
+    assert asyncio.run(main()).shape == (2, 2, 2048)
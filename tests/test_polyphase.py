@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+import pytf.filter.polyphase as polyphase
+from pytf.filter.polyphase import PolyphaseFilterBank
+
+SAMPLE_RATE = 1000.
+
+def _error_db(y, x, margin=2000):
+    s = slice(margin, x.shape[-1] - margin)
+    return 10 * np.log10(np.sum((y[...,s] - x[...,s])**2) / np.sum(x[...,s]**2))
+
+@pytest.mark.parametrize('nbands, oversampling, max_error', [(16, 1, -25), (64, 1, -25), (64, 2, -45)])
+def test_synthesis_reconstructs_white_noise(nbands, oversampling, max_error):
+    x = np.random.RandomState(0).randn(2, 2**14)
+    bank = PolyphaseFilterBank(nch=2, nbands=nbands, sample_rate=SAMPLE_RATE, oversampling=oversampling)
+
+    y = bank.synthesis(bank.analysis(x), nsamp=x.shape[-1])
+    assert y.shape == x.shape
+    assert _error_db(y, x) < max_error
+
+    # The gain is one
+    s = slice(2000, -2000)
+    assert abs(np.sum(y[:,s] * x[:,s]) / np.sum(x[:,s]**2) - 1) < .01
+
+@pytest.mark.parametrize('oversampling', [1, 2])
+def test_unit_gain_at_the_band_centers(oversampling):
+    nbands = 32
+    bank = PolyphaseFilterBank(nch=1, nbands=nbands, sample_rate=SAMPLE_RATE, oversampling=oversampling)
+    t = np.arange(2**13) / SAMPLE_RATE
+
+    for k in [1, 5, 11]:
+        f = k * SAMPLE_RATE / nbands
+        x = np.cos(2 * np.pi * f * t + .7)[np.newaxis]
+        y_ = bank.analysis(x)
+
+        # The band k holds the analytic signal of the sinusoid, decimated
+        np.testing.assert_allclose(np.abs(y_[0,k,50:-50]), 1., atol=.01)
+        phase = 2 * np.pi * f * t[::bank.decimate_by] + .7
+        np.testing.assert_allclose(np.angle(y_[0,k,50:-50] * np.exp(-1j * phase[50:-50])), 0., atol=.01)
+
+        y = bank.synthesis(y_, nsamp=x.shape[-1])
+        assert _error_db(y, x, margin=1000) < -40
+
+def test_blocks_match_one_pass(monkeypatch):
+    x = np.random.RandomState(1).randn(3, 5000)
+    bank = PolyphaseFilterBank(nch=3, nbands=16, sample_rate=SAMPLE_RATE)
+    y_ = bank.analysis(x)
+    y = bank.synthesis(y_, nsamp=x.shape[-1])
+
+    monkeypatch.setattr(polyphase, '_block_nelem', 1000)
+    np.testing.assert_allclose(bank.analysis(x), y_, rtol=1e-6, atol=1e-6)
+    np.testing.assert_allclose(bank.synthesis(y_, nsamp=x.shape[-1]), y, atol=1e-10)
+
+def test_leading_dimensions():
+    x = np.random.RandomState(2).randn(2, 3, 1000)
+    bank = PolyphaseFilterBank(nch=3, nbands=16, sample_rate=SAMPLE_RATE)
+
+    y = bank.analysis(x)
+    assert y.shape == (2, 3, bank.nfreqs, int(np.ceil(1000 / bank.decimate_by)))
+    np.testing.assert_array_equal(y[1], bank.analysis(x[1]))
+    assert bank.synthesis(y, nsamp=1000).shape == x.shape
+
+def test_synthesis_requires_analytic_signals():
+    bank = PolyphaseFilterBank(nbands=16, sample_rate=SAMPLE_RATE, hilbert=False)
+    with pytest.raises(ValueError):
+        bank.synthesis(bank.analysis(np.zeros((1, 100))))
+
+    with pytest.raises(ValueError):
+        PolyphaseFilterBank(nbands=15, sample_rate=SAMPLE_RATE)
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+import matplotlib.pyplot as plt
+
+import pytf.viz.pyramid as pyramid
+from pytf.time_frequency.spectrogram import Spectrogram
+from pytf.time_frequency.stft import _get_padsize
+from pytf.viz.pyramid import SpectrogramPyramid
+
+def _power(nwin=1000, nfreqs=129):
+    return np.random.RandomState(0).rand(nwin, nfreqs).astype(np.float32)
+
+def _reference_pool(x, ft, ff, pool):
+    """ Pool each ft x ff block of x, the last ones may be shorter.
+    """
+    reduce = np.max if pool == 'max' else np.mean
+    return np.array([[reduce(x[i:i+ft, j:j+ff]) for j in range(0, x.shape[1], ff)]
+                     for i in range(0, x.shape[0], ft)])
+
+@pytest.mark.parametrize('pool', ['max', 'mean'])
+def test_levels_match_pooling_of_level_zero(pool):
+    power = _power()
+    pyr = SpectrogramPyramid(power, 1000., 256, hopsize=64, pool=pool, factor=2, min_size=50)
+
+    np.testing.assert_array_equal(pyr.levels[0], power)
+    for level in pyr.levels[1:]:
+        assert level.shape[0] > 0 and level.shape[1] > 0
+    last = pyr.levels[-1]
+    assert max(last.shape) <= 50
+
+    # Each level pools level 0 over its steps
+    for level, (st, sf) in zip(pyr.levels, pyr._steps):
+        np.testing.assert_allclose(level, _reference_pool(power, st, sf, pool), rtol=1e-5)
+
+def test_complex_spectra_give_the_power():
+    X = np.random.RandomState(1).randn(300, 65) + 1j * np.random.RandomState(2).randn(300, 65)
+    pyr = SpectrogramPyramid(X, 1000., 128, min_size=64)
+    np.testing.assert_allclose(pyr.levels[0], np.abs(X)**2, rtol=1e-6)
+
+def test_blocks_and_memmap_match(monkeypatch, tmpdir):
+    power = _power()
+    expected = SpectrogramPyramid(power, 1000., 256, min_size=50)
+
+    monkeypatch.setattr(pyramid, '_block_rows', 7)
+    pyr = SpectrogramPyramid(power, 1000., 256, min_size=50, dirname=str(tmpdir.join('levels')))
+    assert pyr.nlevels == expected.nlevels
+    for level, ref in zip(pyr.levels, expected.levels):
+        assert isinstance(level, np.memmap)
+        np.testing.assert_allclose(level, ref, rtol=1e-6)
+    np.testing.assert_array_equal(np.load(str(tmpdir.join('levels', 'level_1.npy'))), expected.levels[1])
+
+def test_select_picks_the_coarsest_sufficient_level():
+    power = _power(nwin=4000)
+    pyr = SpectrogramPyramid(power, 1000., 256, hopsize=64, min_size=16)
+
+    # The whole recording over 100 pixels
+    tile, extent, ix = pyr.select(width=100)
+    assert tile.shape[0] >= 100
+    assert ix < pyr.nlevels - 1 and pyr.levels[ix + 1].shape[0] < 100
+    assert extent[0] < pyr.times[0] and extent[1] > pyr.times[-1]
+
+    # A short window falls back to level 0
+    tlim = (pyr.times[100], pyr.times[150])
+    tile, extent, ix = pyr.select(tlim=tlim, width=200)
+    assert ix == 0
+    np.testing.assert_array_equal(tile, power[100:151])
+    assert extent[0] <= tlim[0] and extent[1] >= tlim[1]
+
+def test_times_are_the_window_centers():
+    binsize, hopsize, fs = 256, 64, 1000.
+    pyr = SpectrogramPyramid(_power(nwin=50), fs, binsize, hopsize=hopsize)
+    padsize = _get_padsize(binsize, hopsize)
+    np.testing.assert_allclose(pyr.times, (np.arange(50) * hopsize - padsize + binsize / 2.) / fs)
+    np.testing.assert_allclose(pyr.freqs, np.arange(129) * fs / binsize)
+
+def test_invalid_parameters():
+    with pytest.raises(ValueError):
+        SpectrogramPyramid(_power(), 1000., 256, pool='median')
+    with pytest.raises(ValueError):
+        SpectrogramPyramid(_power(), 1000., 256, factor=1)
+
+def test_spectrogram_plots_from_the_pyramid():
+    x = np.random.RandomState(3).randn(2, 20000)
+    spec = Spectrogram(nch=2, nsamp=x.shape[-1], sample_rate=1000., binsize=256, hopsize=128)
+    with pytest.raises(ValueError):
+        spec.build_pyramid()
+
+    X = spec.analysis(x)
+    pyrs = spec.build_pyramid(min_size=32)
+    assert len(pyrs) == 2
+    np.testing.assert_allclose(pyrs[1].levels[0], np.abs(X[1])**2, rtol=1e-5)
+
+    fig = spec.plot_spectra(tlim=(2., 5.), flim=(10., 100.), width=100)
+    plt.close(fig)
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from pytf.io.quantized import (QuantizedReader, QuantizedWriter, load_quantized, save_quantized)
+
+def _analytic(nch=2, nfreqs=3, nsamp=1000, seed=0):
+    rng = np.random.RandomState(seed)
+    amp = 1. + rng.rand(nch, nfreqs, nsamp)
+    return amp * np.exp(1j * rng.uniform(-np.pi, np.pi, (nch, nfreqs, nsamp)))
+
+def test_roundtrip_analytic(tmpdir):
+    x = _analytic()
+    save_quantized(str(tmpdir), x, chunk_size=128)
+
+    y = load_quantized(str(tmpdir))
+    assert y.shape == x.shape
+    # 16 bits over the range of each band, and 16 bits of phase
+    np.testing.assert_allclose(np.abs(y), np.abs(x), atol=2. / 2**16)
+    np.testing.assert_allclose(np.angle(y / x), 0, atol=2 * np.pi / 2**16)
+
+def test_roundtrip_real(tmpdir):
+    x = np.random.RandomState(0).randn(2, 3, 1000)
+    save_quantized(str(tmpdir), x, chunk_size=100)
+
+    y = load_quantized(str(tmpdir))
+    span = x.max(axis=-1) - x.min(axis=-1)
+    assert np.all(np.abs(y - x) <= span[...,np.newaxis] / 2**16)
+
+    with pytest.raises(ValueError):
+        load_quantized(str(tmpdir), output='phase')
+
+def test_read_window_and_subset(tmpdir):
+    x = _analytic(nch=3, nfreqs=4)
+    save_quantized(str(tmpdir), x, chunk_size=64)
+
+    reader = QuantizedReader(str(tmpdir))
+    full = reader.read()
+    assert reader.shape == x.shape
+
+    y = reader.read(start=100, stop=300, chans=[2, 0], bands=[1, 3])
+    np.testing.assert_array_equal(y, full[[2, 0]][:,[1, 3],100:300])
+
+    np.testing.assert_allclose(reader.read(start=10, stop=20, output='amplitude'), np.abs(full[...,10:20]), rtol=1e-6)
+    np.testing.assert_allclose(reader.read(start=10, stop=20, output='phase'), np.angle(full[...,10:20]), atol=1e-6)
+
+def test_writer_blocks(tmpdir):
+    x = _analytic(nsamp=1000)
+    limits = np.stack([np.abs(x).min(axis=-1), np.abs(x).max(axis=-1)], axis=-1)
+
+    with QuantizedWriter(str(tmpdir.join('blocks')), 2, 3, 1000, limits, chunk_size=128) as writer:
+        for start in range(0, 1000, 300):
+            writer.write(x[...,start:start+300])
+        with pytest.raises(ValueError):
+            writer.write(x[...,:1])
+
+    save_quantized(str(tmpdir.join('once')), x, chunk_size=128)
+    np.testing.assert_array_equal(load_quantized(str(tmpdir.join('blocks'))), load_quantized(str(tmpdir.join('once'))))
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from pytf.filter.filterbank import FilterBank
+from pytf.filter.resample import Resampler
+
+SAMPLE_RATE = 1000.
+
+def _signal(nch=2, nsamp=3001, seed=0):
+    return np.random.RandomState(seed).randn(nch, nsamp)
+
+@pytest.mark.parametrize('down', [2, 3, 8])
+def test_streaming_matches_one_shot(down):
+    x = _signal()
+    expected = Resampler(2, down=down, sample_rate=SAMPLE_RATE).process(x)
+    assert expected.shape == (2, -(-x.shape[-1] // down))
+
+    resampler = Resampler(2, down=down, sample_rate=SAMPLE_RATE)
+    edges = [0, 1, 7, 100, 101, 1500, 2999, x.shape[-1]]
+    y = np.concatenate([resampler.process(x[:,a:b]) for a, b in zip(edges[:-1], edges[1:])], axis=-1)
+    np.testing.assert_allclose(y, expected, atol=1e-12)
+
+    # After a reset, the stream starts over
+    resampler.reset()
+    np.testing.assert_allclose(resampler.process(x), expected, atol=1e-12)
+
+@pytest.mark.parametrize('down', [2, 5])
+def test_streaming_is_the_delayed_resample(down):
+    x = _signal()
+    resampler = Resampler(2, down=down, sample_rate=SAMPLE_RATE)
+    y = resampler.process(x)
+    z = resampler.resample(x)
+    assert z.shape == y.shape
+
+    K = resampler.delay // down
+    np.testing.assert_allclose(y[:,K:], z[:,:-K], atol=1e-12)
+
+def test_passband_and_conversion():
+    t = np.arange(8000) / SAMPLE_RATE
+    x = np.cos(2 * np.pi * 30. * t)[np.newaxis]
+    resampler = Resampler(1, down=4, sample_rate=SAMPLE_RATE, order=129)
+    z = resampler.resample(x)
+    np.testing.assert_allclose(z[0,100:-100], x[0,::4][100:-100], atol=1e-2)
+
+    scaled = Resampler(1, down=4, sample_rate=SAMPLE_RATE, order=129, scale=[2.], offset=[1.])
+    np.testing.assert_allclose(scaled.resample(x), resampler.resample(2 * x + 1), atol=1e-12)
+    np.testing.assert_allclose(scaled.resample(x, convert=False), z, atol=1e-12)
+
+def test_sample_rate_is_required():
+    with pytest.raises(ValueError):
+        Resampler(1, down=2)
+    with pytest.raises(ValueError):
+        Resampler(1, down=2, cutoff=100.)
+    with pytest.raises(ValueError):
+        Resampler(1, down=0, sample_rate=SAMPLE_RATE)
+
+@pytest.mark.parametrize('order, delay', [(257, 128), (128, 63)])
+@pytest.mark.parametrize('resample_by', [1, 2])
+def test_delay_of_the_prototype(order, delay, resample_by):
+    bank = FilterBank(nch=1, nsamp=2**12, binsize=1024 * resample_by, sample_rate=SAMPLE_RATE * resample_by,
+                      center_freqs=np.array([40.]), bandwidth=8., order=(order - 1) * resample_by + 1,
+                      resample_by=resample_by)
+    assert bank.delayed_samples() == delay
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from pytf.utilities.ring_buffer import (BufferOverrun, RingPublisher, RingSubscriber)
+
+@pytest.fixture
+def publisher():
+    pub = RingPublisher(shape=(2, 3, 16), dtype=np.complex64, nslots=4)
+    yield pub
+    pub.close()
+    pub.unlink()
+
+def _block(k, nsamp=16):
+    return np.full((2, 3, nsamp), k + 1j * k, dtype=np.complex64)
+
+def test_blocks_in_order(publisher):
+    sub = RingSubscriber(publisher.name, start='latest')
+    assert sub.shape == (2, 3, 16) and sub.dtype == np.complex64 and sub.nslots == 4
+
+    for k in range(3):
+        assert publisher.publish(_block(k, nsamp=16 - k)) == k
+    assert sub.poll() == 3
+
+    for k in range(3):
+        seq, y = sub.get(timeout=0)
+        assert seq == k and sub.valid(seq)
+        np.testing.assert_array_equal(y, _block(k, nsamp=16 - k))
+        assert not y.flags.writeable
+    del y
+
+    with pytest.raises(TimeoutError):
+        sub.get(timeout=0)
+    sub.close()
+
+def test_overrun_skips_to_the_oldest_block(publisher):
+    sub = RingSubscriber(publisher.name)
+    for k in range(6):
+        publisher.publish(_block(k))
+
+    with pytest.raises(BufferOverrun) as info:
+        sub.get(timeout=0)
+    assert info.value.missed == 2
+
+    seq, y = sub.get(timeout=0)
+    assert seq == 2
+    np.testing.assert_array_equal(y, _block(2))
+
+    # The slot of y is reused
+    for k in range(6, 10):
+        publisher.publish(_block(k))
+    assert not sub.valid(seq)
+    del y
+    sub.close()
+
+def test_close_with_a_view_held(publisher):
+    sub = RingSubscriber(publisher.name, start='oldest')
+    publisher.publish(_block(1))
+    seq, y = sub.get(timeout=0)
+
+    # The view keeps the memory mapped
+    with pytest.raises(BufferError):
+        sub.close()
+    np.testing.assert_array_equal(y, _block(1))
+
+    del y
+    sub.close()
+
+def test_invalid_blocks(publisher):
+    with pytest.raises(ValueError):
+        publisher.publish(np.zeros((2, 3, 17), dtype=np.complex64))
+    with pytest.raises(ValueError):
+        publisher.publish(np.zeros((3, 3, 16), dtype=np.complex64))
+    with pytest.raises(ValueError):
+        RingSubscriber(publisher.name, start='first')
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from pytf.filter.filterbank import FilterBank
+from pytf.time_frequency.spectrogram import Spectrogram
+from pytf.time_frequency.stft import (multires_stft, stft, zoom_stft)
+
+SAMPLE_RATE = 1000.
+SCALE = np.array([.5, 2e-3, 1.])
+OFFSET = np.array([-3., 10., 0.])
+
+def _int16(shape=(3, 4096)):
+    return np.random.RandomState(0).randint(-2**15, 2**15, size=shape).astype(np.int16)
+
+def _physical(x):
+    return x * SCALE[:,np.newaxis] + OFFSET[:,np.newaxis]
+
+def _close(y, expected, rtol=1e-5):
+    np.testing.assert_allclose(y, expected, rtol=rtol, atol=rtol * np.abs(expected).max())
+
+@pytest.mark.parametrize('mode', ['zero', 'reflect', 'edge'])
+def test_stft(mode):
+    x = _int16()
+    X = stft(x, binsize=256, hopsize=64, pad_mode=mode, scale=SCALE, offset=OFFSET)
+    _close(X, stft(_physical(x), binsize=256, hopsize=64, pad_mode=mode), rtol=1e-9)
+
+def test_stft_batch():
+    x = _int16((2, 3, 4096))
+    X = stft(x, binsize=256, hopsize=128, scale=SCALE, offset=OFFSET)
+    _close(X, stft(_physical(x), binsize=256, hopsize=128), rtol=1e-9)
+
+def test_zoom_and_multires():
+    x = _int16()
+    Z, freqs = zoom_stft(x, 50., 150., sample_rate=SAMPLE_RATE, binsize=256, hopsize=64, scale=SCALE, offset=OFFSET)
+    expected, expected_freqs = zoom_stft(_physical(x), 50., 150., sample_rate=SAMPLE_RATE, binsize=256, hopsize=64)
+    _close(Z, expected, rtol=1e-9)
+    np.testing.assert_array_equal(freqs, expected_freqs)
+
+    M = multires_stft(x, [64, 256], scale=SCALE, offset=OFFSET)
+    for X, expected in zip(M, multires_stft(_physical(x), [64, 256])):
+        _close(X, expected, rtol=1e-9)
+
+@pytest.mark.parametrize('kwargs', [dict(), dict(hilbert=False), dict(resample_by=2), dict(max_memory=True)])
+def test_filterbank(kwargs):
+    x = _int16()
+    params = dict(nch=3, nsamp=4096, binsize=512, sample_rate=SAMPLE_RATE, center_freqs=np.array([20., 40.]),
+                  bandwidth=8., order=129, hilbert=True)
+    params.update(kwargs)
+    split = params.pop('max_memory', False)
+
+    expected = FilterBank(**params).analysis(_physical(x))
+
+    bank = FilterBank(scale=SCALE, offset=OFFSET, **params)
+    if split:
+        bank.max_memory = expected.nbytes + bank.estimate_memory() // 4
+    _close(bank.analysis(x), expected)
+
+def test_spectrogram():
+    x = _int16()
+    spec = Spectrogram(nch=3, nsamp=4096, sample_rate=SAMPLE_RATE, binsize=256, hopsize=128, scale=SCALE, offset=OFFSET)
+    expected = Spectrogram(nch=3, nsamp=4096, sample_rate=SAMPLE_RATE, binsize=256, hopsize=128).analysis(_physical(x))
+    _close(spec.analysis(x), expected)
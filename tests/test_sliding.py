@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from scipy.signal import get_window
+
+from pytf.time_frequency.sliding import (Goertzel, SlidingDFT)
+
+def _brute_force(x, freqs, sample_rate, binsize, window=None):
+    """ Y[n] = 2 / sum(w) * sum_k w[k] x[n-k] exp(j 2 pi f k / sample_rate), with zeros before the signal.
+    """
+    w = np.ones(binsize) if window is None else get_window(window, binsize)
+    nch, nsamp = x.shape
+    xp = np.concatenate([np.zeros((nch, binsize - 1)), x], axis=-1)
+    k = np.arange(binsize)
+    Y = np.empty((nch, freqs.size, nsamp), dtype=np.complex128)
+    for n in range(nsamp):
+        seg = xp[:,n + binsize - 1 - k]
+        Y[:,:,n] = np.dot(seg * w, np.exp(2j * np.pi * np.outer(k, freqs) / sample_rate))
+    return Y * 2. / w.sum()
+
+@pytest.mark.parametrize('window', [None, 'hann', 'hamming'])
+def test_sliding_dft_matches_brute_force(window):
+    rng = np.random.RandomState(0)
+    freqs, sample_rate, binsize = np.array([50., 125.]), 1000., 64
+    x = rng.randn(2, 300)
+
+    sdft = SlidingDFT(2, freqs, sample_rate, binsize=binsize, window=window)
+    Y = np.concatenate([sdft.update(x[:,i:i+70]) for i in range(0, 300, 70)], axis=-1)
+    np.testing.assert_allclose(Y, _brute_force(x, freqs, sample_rate, binsize, window), atol=1e-9)
+
+def test_sliding_dft_sinusoid_and_reset():
+    sample_rate, binsize, f = 1000., 100, 50.
+    t = np.arange(1000) / sample_rate
+    x = 3. * np.cos(2 * np.pi * f * t + .4)[np.newaxis]
+
+    sdft = SlidingDFT(1, [f], sample_rate, binsize=binsize, window='hann')
+    Y = sdft.update(x)[0,0,binsize:]
+    np.testing.assert_allclose(np.abs(Y), 3., rtol=1e-9)
+    np.testing.assert_allclose(np.angle(Y * np.exp(-1j * (2 * np.pi * f * t[binsize:] + .4))), 0, atol=1e-9)
+
+    sdft.reset()
+    np.testing.assert_allclose(sdft.update(x)[0,0,binsize:], Y)
+
+    with pytest.raises(ValueError):
+        sdft.update(np.zeros((2, 10)))
+
+def test_goertzel_matches_windows_of_dft():
+    rng = np.random.RandomState(1)
+    freqs, sample_rate, binsize = np.array([40., 110.]), 1000., 50
+    x = rng.randn(3, 260)
+
+    g = Goertzel(3, freqs, sample_rate, binsize=binsize)
+    Y = np.concatenate([g.update(x[:,i:i+37]) for i in range(0, 260, 37)], axis=-1)
+    assert Y.shape == (3, 2, 260 // binsize)
+
+    expected = _brute_force(x, freqs, sample_rate, binsize)[:,:,binsize-1::binsize]
+    np.testing.assert_allclose(Y, expected, atol=1e-9)
+
+def test_check_freqs():
+    with pytest.raises(ValueError):
+        SlidingDFT(1, [600.], 1000.)
+    with pytest.raises(ValueError):
+        Goertzel(1, [10.], None)
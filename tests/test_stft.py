@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from scipy.signal import get_window
+
+import pytf.time_frequency.stft as stft_module
+from pytf.core import (frame, frame_segments)
+from pytf.time_frequency.stft import (STFT, _get_nwin, _get_padsize, istft, stft)
+
+def _padded_frames(x, binsize, hopsize, padsize, nwin, mode='zero'):
+    """ The frames of the signal padded as a whole, the reference of frame_segments.
+    """
+    r_pad = max(0, (nwin - 1) * hopsize - padsize + binsize - x.shape[-1])
+    pad_mode = {'zero': 'constant', 'reflect': 'reflect', 'edge': 'edge'}[mode]
+    xp = np.pad(x, [(0, 0)] * (x.ndim - 1) + [(padsize, r_pad)], mode=pad_mode)
+    return np.stack([xp[...,m*hopsize:m*hopsize+binsize] for m in range(nwin)], axis=-2)
+
+def _reference_stft(x, binsize, hopsize, window='hamming', mode='zero'):
+    padsize = _get_padsize(binsize, hopsize)
+    nwin = _get_nwin(x.shape[-1], binsize, hopsize)
+    return np.fft.rfft(_padded_frames(x, binsize, hopsize, padsize, nwin, mode) * get_window(window, binsize), axis=-1)
+
+@pytest.mark.parametrize('mode', ['zero', 'reflect', 'edge'])
+@pytest.mark.parametrize('binsize, hopsize, nsamp', [(64, 32, 1000), (64, 16, 1000), (100, 30, 257), (64, 32, 40)])
+def test_frame_segments_match_padded_frames(mode, binsize, hopsize, nsamp):
+    x = np.random.RandomState(0).randn(2, nsamp)
+    padsize = _get_padsize(binsize, hopsize)
+    nwin = _get_nwin(nsamp, binsize, hopsize)
+
+    expected = _padded_frames(x, binsize, hopsize, padsize, nwin, mode)
+    np.testing.assert_array_equal(frame(x, binsize, hopsize, padsize=padsize, nwin=nwin, mode=mode), expected)
+
+    segments = frame_segments(x, binsize, hopsize, padsize=padsize, nwin=nwin, mode=mode)
+    assert segments[0][0].start == 0 and segments[-1][0].stop == nwin
+    for win_idx, frames in segments:
+        np.testing.assert_array_equal(frames, expected[:,win_idx])
+
+def test_frames_within_the_signal_are_views():
+    x = np.random.RandomState(0).randn(2, 1000)
+    segments = frame_segments(x, 64, 32, padsize=32, nwin=_get_nwin(1000, 64, 32))
+    assert any(np.shares_memory(frames, x) for _, frames in segments)
+
+@pytest.mark.parametrize('mode', ['zero', 'reflect', 'edge'])
+@pytest.mark.parametrize('binsize, hopsize', [(128, 64), (128, 32), (100, 30)])
+def test_stft_matches_padded_reference(monkeypatch, mode, binsize, hopsize):
+    x = np.random.RandomState(1).randn(3, 2000)
+    expected = _reference_stft(x, binsize, hopsize, mode=mode)
+
+    X = stft(x, binsize=binsize, hopsize=hopsize, pad_mode=mode)
+    np.testing.assert_allclose(X, expected, atol=1e-9)
+
+    # Blocks of windows give the same spectra
+    monkeypatch.setattr(stft_module, '_block_nelem', 3 * binsize * 5)
+    np.testing.assert_allclose(stft(x, binsize=binsize, hopsize=hopsize, pad_mode=mode), expected, atol=1e-9)
+
+def test_istft_reconstructs():
+    x = np.random.RandomState(2).randn(2, 3000)
+    X = stft(x, binsize=256, hopsize=64, window='hann')
+    y = istft(X, nsamp=x.shape[-1], binsize=256, hopsize=64, window='hann')
+    np.testing.assert_allclose(y[:,0], x, atol=1e-5)
+
+@pytest.mark.parametrize('binsize, hopsize, nsamp', [(256, 128, 2048), (256, 64, 1000), (100, 30, 257)])
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+def test_plan_matches_stft_and_istft(binsize, hopsize, nsamp, dtype):
+    x = np.random.RandomState(3).randn(2, nsamp)
+    plan = STFT(nch=2, nsamp=nsamp, binsize=binsize, hopsize=hopsize, dtype=dtype)
+    atol = 1e-9 if dtype == np.float64 else 1e-3
+
+    # The plan is reused: every block gives the spectra of stft
+    for x_ in [x, x[:,::-1].copy()]:
+        X = plan.forward(x_)
+        assert X.dtype == np.result_type(dtype, np.complex64)
+        np.testing.assert_allclose(X, stft(x_, binsize=binsize, hopsize=hopsize), atol=atol)
+
+    expected = istft(X.copy(), nsamp=nsamp, binsize=binsize, hopsize=hopsize, window='hamming')
+    # istft runs in single precision
+    np.testing.assert_allclose(plan.inverse(X), expected[:,0], atol=max(atol, 1e-5))
+
+def test_plan_scale_and_offset():
+    x = np.random.RandomState(4).randint(-2**15, 2**15, (3, 1024)).astype(np.int16)
+    scale, offset = np.array([1e-3, 2e-3, 5e-4]), np.array([0., 1., -2.])
+    plan = STFT(nch=3, nsamp=1024, binsize=128, scale=scale, offset=offset)
+
+    expected = stft(x * scale[:,np.newaxis] + offset[:,np.newaxis], binsize=128)
+    np.testing.assert_allclose(plan.forward(x), expected, atol=1e-9)
+
+    with pytest.raises(ValueError):
+        plan.forward(x[:,:512])
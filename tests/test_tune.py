@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from pytf.filter.filterbank import FilterBank
+from pytf.tune import (_factor, autotune, check_frequency_resolution, load_tuning)
+
+SAMPLE_RATE = 1000.
+FOIS = np.array([[16., 24.], [36., 44.]])
+
+def test_frequency_resolution():
+    assert check_frequency_resolution(512, SAMPLE_RATE, FOIS) is None
+    assert 'one bin' in check_frequency_resolution(32, SAMPLE_RATE, FOIS)
+    assert 'DC' in check_frequency_resolution(1024, SAMPLE_RATE, np.array([[0., 10.]]))
+    assert 'Nyquist' in check_frequency_resolution(512, SAMPLE_RATE, FOIS, decimate_by=16)
+
+def test_frequency_resolution_of_one_band():
+    assert check_frequency_resolution(256, SAMPLE_RATE, FOIS[:1]) is None
+    assert 'one bin' in check_frequency_resolution(16, SAMPLE_RATE, FOIS[:1])
+
+def test_mixed_widths_are_rejected():
+    fois = np.array([[16., 24.], [30., 50.]])
+    with pytest.raises(ValueError):
+        check_frequency_resolution(512, SAMPLE_RATE, fois)
+    with pytest.raises(ValueError):
+        autotune(nch=1, nsamp=2048, sample_rate=SAMPLE_RATE, freq_bands=fois, binsizes=[512], nprocs=[1],
+                 planner_efforts=['FFTW_ESTIMATE'], order=65, repeat=1)
+
+def test_autotune_one_band():
+    tuning = autotune(nch=1, nsamp=2048, sample_rate=SAMPLE_RATE, freq_bands=FOIS[:1], binsizes=[256, 512],
+                      nprocs=[1], planner_efforts=['FFTW_ESTIMATE'], order=65, repeat=1)
+    assert tuning['params']['binsize'] in [256, 512]
+    assert tuning['params']['freq_bands'] == FOIS[:1].tolist()
+
+    bank = FilterBank.from_tuning(tuning)
+    assert (bank.nfreqs, bank.bandwidth) == (1, 8.)
+
+def test_band_width_matches_the_bank():
+    for binsize in [128, 256, 512, 1024]:
+        assert check_frequency_resolution(binsize, SAMPLE_RATE, FOIS) is None
+        bank = FilterBank(nch=1, nsamp=4096, binsize=binsize, sample_rate=SAMPLE_RATE, freq_bands=FOIS, order=65)
+        assert bank._factor == _factor
+        assert bank._fidx.shape[-1] == int(bank.bandwidth * _factor * 2 * bank.interval_per_hz)
+
+def test_autotune_round_trip(tmpdir):
+    filename = str(tmpdir.join('tuning.json'))
+    tuning = autotune(nch=2, nsamp=2048, sample_rate=SAMPLE_RATE, freq_bands=FOIS, binsizes=[32, 256, 512],
+                      nprocs=[1], planner_efforts=['FFTW_ESTIMATE'], order=65, repeat=1, filename=filename,
+                      hilbert=True)
+
+    assert tuning['params']['binsize'] in [256, 512]
+    assert tuning['latency'] == pytest.approx(tuning['params']['binsize'] / SAMPLE_RATE + tuning['time'])
+    assert [c['binsize'] for c in tuning['candidates'] if 'skipped' in c] == [32]
+    assert load_tuning(filename) == tuning
+
+    x = np.random.RandomState(0).randn(2, 2048)
+    bank = FilterBank.from_tuning(filename)
+    expected = FilterBank.from_tuning(tuning)
+    np.testing.assert_allclose(bank.analysis(x), expected.analysis(x), rtol=1e-6, atol=1e-9)
+
+def test_autotune_budget():
+    with pytest.raises(ValueError):
+        autotune(nch=1, nsamp=2048, sample_rate=SAMPLE_RATE, freq_bands=FOIS, binsizes=[512], nprocs=[1],
+                 planner_efforts=['FFTW_ESTIMATE'], order=65, repeat=1, latency_budget=.1)
+    with pytest.raises(ValueError):
+        autotune(nch=1, nsamp=2048, sample_rate=SAMPLE_RATE, freq_bands=FOIS, binsizes=[16, 32], nprocs=[1])
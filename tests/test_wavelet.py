@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from pytf.time_frequency.wavelet import cwt_morlet
+
+SAMPLE_RATE = 500.
+FREQS = np.array([8., 20., 45., 110.])
+
+def _signal(shape=(2, 3000), seed=0):
+    return np.random.RandomState(seed).randn(*shape)
+
+def _convolve(x, f, n_cycles):
+    """ The convolution with the Morlet wavelet in time, whose spectrum is 2 exp(-(f' - f)**2 / (2 sigma_f**2)).
+    """
+    sigma_f = f / n_cycles
+    sigma_t = 1. / (2 * np.pi * sigma_f)
+    t = np.arange(-int(8 * sigma_t * SAMPLE_RATE), int(8 * sigma_t * SAMPLE_RATE) + 1) / SAMPLE_RATE
+    h = 2 * sigma_f * np.sqrt(2 * np.pi) * np.exp(-t**2 / (2 * sigma_t**2)) * np.exp(2j * np.pi * f * t) / SAMPLE_RATE
+    return np.array([np.convolve(x_, h, mode='same') for x_ in x])
+
+@pytest.mark.parametrize('n_cycles', [7., np.array([6., 5., 7., 10.])])
+def test_matches_convolution_in_time(n_cycles):
+    x = _signal()
+    W = cwt_morlet(x, FREQS, SAMPLE_RATE, n_cycles=n_cycles)
+    assert W.shape == (2, 4, 3000)
+
+    n_cycles = np.broadcast_to(n_cycles, FREQS.shape)
+    for i, f in enumerate(FREQS):
+        expected = _convolve(x, f, n_cycles[i])
+        np.testing.assert_allclose(W[:,i], expected, atol=1e-4 * np.abs(expected).max())
+
+def test_amplitude_and_phase_of_a_sinusoid():
+    t = np.arange(5000) / SAMPLE_RATE
+    x = 3. * np.cos(2 * np.pi * 20. * t + .4)
+    W = cwt_morlet(x[np.newaxis], [20.], SAMPLE_RATE)[0,0]
+
+    mid = slice(1000, 4000)
+    np.testing.assert_allclose(np.abs(W[mid]), 3., rtol=1e-3)
+    np.testing.assert_allclose(np.angle(W[mid] * np.exp(-1j * (2 * np.pi * 20. * t[mid] + .4))), 0., atol=1e-3)
+
+def test_decimated_outputs_are_samples_of_the_full_rate():
+    x = _signal((3, 2, 4000))
+    W = cwt_morlet(x, FREQS, SAMPLE_RATE)
+    Wd, decimate_by = cwt_morlet(x, FREQS, SAMPLE_RATE, decimate=True, dtype=np.complex64)
+
+    assert decimate_by[0] > decimate_by[-1] >= 1
+    for i, d in enumerate(decimate_by):
+        assert Wd[i].dtype == np.complex64
+        assert Wd[i].shape == (3, 2, -(-4000 // d))
+        np.testing.assert_allclose(Wd[i], W[...,i,::d], rtol=1e-4, atol=1e-5 * np.abs(W[...,i,:]).max())
+
+def test_batch_matches_trials():
+    x = _signal((3, 2, 1000))
+    W = cwt_morlet(x, FREQS, SAMPLE_RATE)
+    for k in range(3):
+        np.testing.assert_allclose(W[k], cwt_morlet(x[k], FREQS, SAMPLE_RATE), atol=1e-12)
+
+@pytest.mark.parametrize('freqs', [[0., 10.], [10., 250.], [[10., 20.]]])
+def test_invalid_frequencies(freqs):
+    with pytest.raises(ValueError):
+        cwt_morlet(_signal(), freqs, SAMPLE_RATE)